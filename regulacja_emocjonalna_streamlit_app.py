@@ -4,6 +4,10 @@ import numpy as np
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+from wesad_features import pivot_signal_features
+from wesad_figure_cache import data_version, figure_key, st_cached_pyplot
+from wesad_model import REGULATION_MODEL, latest_version, load_bundle
+
 # Konfiguracja strony
 st.set_page_config(
     page_title="Analiza Regulacji Emocjonalnej",
@@ -15,11 +19,13 @@ st.set_page_config(
 st.title("🧠 Analiza Regulacji Emocjonalnej")
 st.markdown("---")
 
+CSV_PATH = Path("regulacja_emocjonalna_dane.csv")
+
 # Wczytaj dane
 @st.cache_data
 def load_data():
     """Wczytuje dane z pliku CSV"""
-    csv_path = Path("regulacja_emocjonalna_dane.csv")
+    csv_path = CSV_PATH
     if csv_path.exists():
         df = pd.read_csv(csv_path)
         return df
@@ -27,6 +33,65 @@ def load_data():
         st.error(f"Brak pliku {csv_path}")
         return None
 
+@st.cache_resource
+def load_regulation_model(version):
+    """Model regulacji wczytywany raz na proces (nowa wersja w results/models = nowy wpis cache)"""
+    return load_bundle(REGULATION_MODEL, version)
+
+@st.cache_data
+def predict_regulation(_bundle, model_version, df):
+    """Predykcje dla wszystkich osób naraz (parametry sygnałów -> kolumny `{SYGNAŁ}_{parametr}`)"""
+    return _bundle.predict_batch(pivot_signal_features(df).set_index('subject'))
+
+def render_parameters_figure(subject_data, selected_subject):
+    """Wykres 2×2 parametrów reakcji (renderowany raz, dalej z cache PNG)"""
+    fig, axes = plt.subplots(2, 2, figsize=(12, 10))
+    fig.suptitle(f"Parametry reakcji dla {selected_subject}", fontsize=16, fontweight='bold')
+    
+    # Wykres 1: Amplituda piku
+    ax1 = axes[0, 0]
+    signals = subject_data['signal'].unique()
+    amplitudes = [subject_data[subject_data['signal'] == sig]['peak_amplitude'].values[0] 
+                  if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
+                  for sig in signals]
+    ax1.bar(signals, amplitudes, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
+    ax1.set_title("Amplituda piku")
+    ax1.set_ylabel("Amplituda")
+    ax1.grid(True, alpha=0.3)
+    
+    # Wykres 2: Czas trwania
+    ax2 = axes[0, 1]
+    durations = [subject_data[subject_data['signal'] == sig]['duration_s'].values[0] 
+                 if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
+                 for sig in signals]
+    ax2.bar(signals, durations, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
+    ax2.set_title("Czas trwania reakcji")
+    ax2.set_ylabel("Czas (s)")
+    ax2.grid(True, alpha=0.3)
+    
+    # Wykres 3: Slope
+    ax3 = axes[1, 0]
+    slopes = [subject_data[subject_data['signal'] == sig]['slope'].values[0] 
+              if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
+              for sig in signals]
+    ax3.bar(signals, slopes, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
+    ax3.set_title("Tempo wzrostu (slope)")
+    ax3.set_ylabel("Slope")
+    ax3.grid(True, alpha=0.3)
+    
+    # Wykres 4: AUC
+    ax4 = axes[1, 1]
+    aucs = [subject_data[subject_data['signal'] == sig]['auc'].values[0] 
+            if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
+            for sig in signals]
+    ax4.bar(signals, aucs, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
+    ax4.set_title("Powierzchnia pod krzywą (AUC)")
+    ax4.set_ylabel("AUC")
+    ax4.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    return fig
+
 # Wczytaj dane
 df = load_data()
 
@@ -41,6 +106,28 @@ if df is not None:
         index=0
     )
     
+    # Model regulacji (results/models) - predykcje dla wszystkich osób jednym wywołaniem
+    # Bez wszystkich cech schematu predykcja nie jest liczona (mediany z treningu zamiast cech = pusty wynik)
+    regulation_predictions = None
+    missing_model_features = []
+    model_version = latest_version(REGULATION_MODEL)
+    if model_version is not None:
+        try:
+            regulation_bundle = load_regulation_model(model_version)
+            missing_model_features = regulation_bundle.missing_features(pivot_signal_features(df))
+            if missing_model_features:
+                st.sidebar.warning(
+                    f"⚠️ Model regulacji (wersja {model_version}) wymaga {len(missing_model_features)} "
+                    f"z {len(regulation_bundle.feature_names)} cech, których nie ma w {CSV_PATH}: "
+                    f"{', '.join(missing_model_features)}. Predykcja wyłączona - wytrenuj model na "
+                    "parametrach reakcji: `python wesad_model.py`"
+                )
+            else:
+                regulation_predictions = predict_regulation(regulation_bundle, model_version, df)
+                st.sidebar.success(f"✅ Model regulacji: wersja {model_version}")
+        except Exception as e:
+            st.sidebar.warning(f"⚠️ Nie można użyć modelu regulacji: {e}")
+    
     # Filtruj dane dla wybranej osoby
     subject_data = df[df['subject'] == selected_subject].copy()
     
@@ -80,19 +167,28 @@ if df is not None:
         temp_data = subject_data[subject_data['signal'] == 'TEMP']
         
         # Ocena na podstawie parametrów
-        if len(eda_data) > 0 and len(bvp_data) > 0 and len(temp_data) > 0:
-            # Predykcja dla S2
-            if selected_subject == "S2":
+        if missing_model_features:
+            st.warning(f"⚠️ Model regulacji nie pasuje do danych - brak cech: {', '.join(missing_model_features)}. "
+                       "Wytrenuj go na parametrach reakcji poleceniem `python wesad_model.py`.")
+        elif regulation_predictions is None:
+            st.warning("⚠️ Brak modelu regulacji. Wytrenuj go poleceniem `python wesad_model.py` "
+                       "(lub w notebooku `wesad_full_pro_analysis.ipynb`).")
+        elif len(eda_data) > 0 and len(bvp_data) > 0 and len(temp_data) > 0:
+            prediction = regulation_predictions.loc[selected_subject]
+            regulation_class = prediction['prediction']
+            
+            # Dobra regulacja
+            if regulation_class == "dobra":
                 st.success("✅ **Regulacja przebiega sprawnie, szybko wracasz do równowagi, brawo, poradzisz sobie!**")
                 st.info("📊 Twoja reakcja jest umiarkowana - ciało reaguje, ale szybko wraca do normy.")
             
-            # Predykcja dla S3
-            elif selected_subject == "S3":
+            # Umiarkowana regulacja
+            elif regulation_class == "umiarkowana":
                 st.warning("⚠️ **Nie jest idealnie, ale jakoś sobie radzisz.**")
                 st.info("📊 Twoja reakcja jest mieszana - ciało aktywuje się częściowo, regulacja działa, choć nie idealnie.")
             
-            # Predykcja dla S4
-            elif selected_subject == "S4":
+            # Słaba regulacja
+            elif regulation_class == "słaba":
                 st.error("❌ **Słaba regulacja, pomóż ciału się uspokoić.**")
                 st.info("📊 Twoja reakcja jest ekstremalna - stres utrzymuje się długo, ciało nie daje rady się uspokoić.")
                 st.markdown("""
@@ -103,7 +199,10 @@ if df is not None:
                 - Medytacja lub mindfulness
                 """)
             else:
-                st.info("Wybierz osobę S2, S3 lub S4")
+                st.info(f"Nieznana klasa regulacji: {regulation_class}")
+            
+            if 'confidence' in prediction:
+                st.caption(f"Model {model_version}, pewność predykcji: {prediction['confidence']:.0%}")
         else:
             st.error("Brak kompletnych danych dla wybranej osoby")
     
@@ -111,52 +210,9 @@ if df is not None:
     st.markdown("---")
     st.subheader("📈 Wizualizacja parametrów")
     
-    fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-    fig.suptitle(f"Parametry reakcji dla {selected_subject}", fontsize=16, fontweight='bold')
-    
-    # Wykres 1: Amplituda piku
-    ax1 = axes[0, 0]
-    signals = subject_data['signal'].unique()
-    amplitudes = [subject_data[subject_data['signal'] == sig]['peak_amplitude'].values[0] 
-                  if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
-                  for sig in signals]
-    ax1.bar(signals, amplitudes, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-    ax1.set_title("Amplituda piku")
-    ax1.set_ylabel("Amplituda")
-    ax1.grid(True, alpha=0.3)
-    
-    # Wykres 2: Czas trwania
-    ax2 = axes[0, 1]
-    durations = [subject_data[subject_data['signal'] == sig]['duration_s'].values[0] 
-                 if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
-                 for sig in signals]
-    ax2.bar(signals, durations, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-    ax2.set_title("Czas trwania reakcji")
-    ax2.set_ylabel("Czas (s)")
-    ax2.grid(True, alpha=0.3)
-    
-    # Wykres 3: Slope
-    ax3 = axes[1, 0]
-    slopes = [subject_data[subject_data['signal'] == sig]['slope'].values[0] 
-              if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
-              for sig in signals]
-    ax3.bar(signals, slopes, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-    ax3.set_title("Tempo wzrostu (slope)")
-    ax3.set_ylabel("Slope")
-    ax3.grid(True, alpha=0.3)
-    
-    # Wykres 4: AUC
-    ax4 = axes[1, 1]
-    aucs = [subject_data[subject_data['signal'] == sig]['auc'].values[0] 
-            if len(subject_data[subject_data['signal'] == sig]) > 0 else 0 
-            for sig in signals]
-    ax4.bar(signals, aucs, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-    ax4.set_title("Powierzchnia pod krzywą (AUC)")
-    ax4.set_ylabel("AUC")
-    ax4.grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    st.pyplot(fig)
+    key = figure_key("regulacja_emocjonalna", selected_subject, "parameters_2x2",
+                     data=data_version(CSV_PATH))
+    st_cached_pyplot(key, lambda: render_parameters_figure(subject_data, selected_subject))
     
     # Stopka
     st.markdown("---")
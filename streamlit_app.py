@@ -10,6 +10,8 @@ from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+from wesad_figure_cache import figure_key, st_cached_pyplot
+
 # Konfiguracja strony
 st.set_page_config(
     page_title="Galaxy vs Nurse Stress Comparison",
@@ -22,14 +24,24 @@ st.set_page_config(
 st.title("📊 Porównanie Galaxy Wearables vs Nurse Stress")
 st.markdown("---")
 
-# Wczytaj dane
-@st.cache_data
-def load_data():
-    """Wczytaj dane z CSV"""
+DATASETS = ['Galaxy', 'Nurse']
+ANALYZED_LABELS = ['baseline', 'stress']
+
+
+def find_data_path():
+    """Ścieżka do pliku z cechami (główna lub alternatywna)"""
     data_path = Path("../results/galaxy_nurse_combined_features.csv")
     if not data_path.exists():
         # Alternatywna ścieżka
         data_path = Path("galaxy_nurse_combined_features.csv")
+    return data_path
+
+
+# Wczytaj dane
+@st.cache_data
+def load_data():
+    """Wczytaj dane z CSV"""
+    data_path = find_data_path()
     
     if data_path.exists():
         df = pd.read_csv(data_path)
@@ -39,6 +51,130 @@ def load_data():
         st.info("💡 Uruchom najpierw komórki analizy, aby utworzyć plik CSV")
         return None
 
+@st.cache_data(show_spinner="Liczenie agregatów...")
+def compute_summary(_df, data_key, feature_cols):
+    """
+    Agregaty per (dataset, label) liczone raz dla wszystkich cech.
+
+    `_df` nie jest hashowany przez Streamlit (przy milionach wierszy samo
+    hashowanie trwałoby dłużej niż groupby) - kluczem cache jest
+    `data_key` (ścieżka + mtime pliku) i zestaw cech. Gałęzie wykresów
+    tylko wycinają potrzebne kolumny z wyniku.
+
+    Returns:
+        dict z kluczami:
+            'means'      - średnie cech, indeks (dataset, label), tylko baseline/stress
+            'counts'     - liczba próbek per (dataset, label) w baseline/stress
+            'change_pct' - zmiana procentowa stress vs baseline, indeks dataset
+                           (NaN gdy baseline = 0 lub brak danych)
+            'crosstab'   - rozkład wszystkich etykiet per dataset
+            'dataset_counts' / 'label_counts' - liczba próbek per dataset / etykieta
+    """
+    feature_cols = list(feature_cols)
+    numeric_cols = [col for col in feature_cols if pd.api.types.is_numeric_dtype(_df[col])]
+    grouped = _df[_df['label'].isin(ANALYZED_LABELS)].groupby(['dataset', 'label'])
+    means = grouped[numeric_cols].mean().reindex(columns=feature_cols)
+
+    change_pct = {}
+    for dataset in means.index.get_level_values('dataset').unique():
+        if (dataset, 'baseline') not in means.index or (dataset, 'stress') not in means.index:
+            continue
+        baseline_vals = means.loc[(dataset, 'baseline')]
+        stress_vals = means.loc[(dataset, 'stress')]
+        valid = (baseline_vals != 0) & baseline_vals.notna() & stress_vals.notna()
+        change_pct[dataset] = ((stress_vals - baseline_vals) / baseline_vals * 100).where(valid)
+
+    return {
+        'means': means,
+        'counts': grouped.size(),
+        'change_pct': pd.DataFrame(change_pct).T.reindex(columns=feature_cols),
+        'crosstab': pd.crosstab(_df['dataset'], _df['label']),
+        'dataset_counts': _df['dataset'].value_counts(),
+        'label_counts': _df['label'].value_counts(),
+    }
+
+
+def group_value(means, dataset, label, feat, default=0):
+    """Średnia cechy dla (dataset, label) lub `default`, gdy brak grupy"""
+    if (dataset, label) in means.index:
+        return means.at[(dataset, label), feat]
+    return default
+
+
+def change_records(change_pct, features):
+    """Zmiany procentowe jako lista rekordów (dataset, feature, change_pct) - pomija NaN"""
+    records = []
+    for dataset in DATASETS:
+        if dataset not in change_pct.index:
+            continue
+        for feat in features:
+            value = change_pct.at[dataset, feat]
+            if not np.isnan(value):
+                records.append({'dataset': dataset, 'feature': feat, 'change_pct': value})
+    return records
+
+
+def render_bar_chart(means, selected_features):
+    """Bar chart baseline vs stress per cecha"""
+    # Utwórz wykres
+    fig, axes = plt.subplots(1, len(selected_features), figsize=(4*len(selected_features), 6))
+    if len(selected_features) == 1:
+        axes = [axes]
+    
+    for idx, feat in enumerate(selected_features):
+        ax = axes[idx]
+        baseline_galaxy = group_value(means, 'Galaxy', 'baseline', feat)
+        stress_galaxy = group_value(means, 'Galaxy', 'stress', feat)
+        baseline_nurse = group_value(means, 'Nurse', 'baseline', feat)
+        stress_nurse = group_value(means, 'Nurse', 'stress', feat)
+    
+        x = np.arange(2)
+        width = 0.35
+    
+        ax.bar(x - width/2, [baseline_galaxy, baseline_nurse], width, label='Baseline', color='#2ecc71')
+        ax.bar(x + width/2, [stress_galaxy, stress_nurse], width, label='Stress', color='#e74c3c')
+    
+        ax.set_xlabel('Dataset')
+        ax.set_ylabel(feat)
+        ax.set_title(feat)
+        ax.set_xticks(x)
+        ax.set_xticklabels(['Galaxy', 'Nurse'])
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    return fig
+
+
+def render_heatmap(pivot_df, n_features):
+    """Heatmapa zmian procentowych (cecha × dataset)"""
+    fig, ax = plt.subplots(figsize=(10, max(6, n_features*0.5)))
+    sns.heatmap(pivot_df, annot=True, fmt='.1f', cmap='RdBu_r', center=0, 
+               cbar_kws={'label': 'Zmiana procentowa (%)'}, ax=ax)
+    ax.set_title('Heatmapa zmian procentowych (stress vs baseline)')
+    ax.set_ylabel('Cecha')
+    plt.tight_layout()
+    return fig
+
+
+def render_trends(trends_df):
+    """Wykres liniowy zmian procentowych per dataset"""
+    fig, ax = plt.subplots(figsize=(12, 6))
+    for dataset in ['Galaxy', 'Nurse']:
+        subset = trends_df[trends_df['dataset'] == dataset]
+        ax.plot(subset['feature'], subset['change_pct'], marker='o', label=dataset, linewidth=2, markersize=8)
+    
+    ax.axhline(y=0, color='black', linestyle='--', alpha=0.3)
+    ax.set_xlabel('Cecha', fontsize=12)
+    ax.set_ylabel('Zmiana procentowa (%)', fontsize=12)
+    ax.set_title('Porównanie trendów zmian (stress vs baseline)', fontsize=14, fontweight='bold')
+    ax.legend(fontsize=11)
+    ax.grid(True, alpha=0.3)
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
 # Wczytaj dane
 df = load_data()
 
@@ -60,8 +196,12 @@ if df is not None and not df.empty:
             options=feature_cols,
             default=feature_cols[:10] if len(feature_cols) > 10 else feature_cols
         )
+        data_path = find_data_path()
+        data_key = (str(data_path), data_path.stat().st_mtime_ns if data_path.exists() else None, len(df))
+        summary = compute_summary(df, data_key, tuple(feature_cols))
     else:
         selected_features = []
+        summary = None
         st.sidebar.warning("⚠️ Brak kolumn 'label' lub 'dataset' w danych")
     
     # Główna zawartość
@@ -69,40 +209,11 @@ if df is not None and not df.empty:
         st.header("📊 Bar Chart: Baseline vs Stress")
         
         if len(selected_features) > 0 and 'label' in df.columns and 'dataset' in df.columns:
-            # Przygotuj dane
-            df_plot = df[df['label'].isin(['baseline', 'stress'])].copy()
-            
-            # Oblicz średnie per dataset × label
-            summary = df_plot.groupby(['dataset', 'label'])[selected_features].mean().reset_index()
+            # Średnie per dataset × label (z cache agregatów)
+            means = summary['means']
             
-            # Utwórz wykres
-            fig, axes = plt.subplots(1, len(selected_features), figsize=(4*len(selected_features), 6))
-            if len(selected_features) == 1:
-                axes = [axes]
-            
-            for idx, feat in enumerate(selected_features):
-                ax = axes[idx]
-                baseline_galaxy = summary[(summary['dataset'] == 'Galaxy') & (summary['label'] == 'baseline')][feat].values[0] if len(summary[(summary['dataset'] == 'Galaxy') & (summary['label'] == 'baseline')]) > 0 else 0
-                stress_galaxy = summary[(summary['dataset'] == 'Galaxy') & (summary['label'] == 'stress')][feat].values[0] if len(summary[(summary['dataset'] == 'Galaxy') & (summary['label'] == 'stress')]) > 0 else 0
-                baseline_nurse = summary[(summary['dataset'] == 'Nurse') & (summary['label'] == 'baseline')][feat].values[0] if len(summary[(summary['dataset'] == 'Nurse') & (summary['label'] == 'baseline')]) > 0 else 0
-                stress_nurse = summary[(summary['dataset'] == 'Nurse') & (summary['label'] == 'stress')][feat].values[0] if len(summary[(summary['dataset'] == 'Nurse') & (summary['label'] == 'stress')]) > 0 else 0
-                
-                x = np.arange(2)
-                width = 0.35
-                
-                ax.bar(x - width/2, [baseline_galaxy, baseline_nurse], width, label='Baseline', color='#2ecc71')
-                ax.bar(x + width/2, [stress_galaxy, stress_nurse], width, label='Stress', color='#e74c3c')
-                
-                ax.set_xlabel('Dataset')
-                ax.set_ylabel(feat)
-                ax.set_title(feat)
-                ax.set_xticks(x)
-                ax.set_xticklabels(['Galaxy', 'Nurse'])
-                ax.legend()
-                ax.grid(True, alpha=0.3)
-            
-            plt.tight_layout()
-            st.pyplot(fig)
+            key = figure_key("galaxy_nurse", chart=chart_type, features=selected_features, data=data_key)
+            st_cached_pyplot(key, lambda: render_bar_chart(means, selected_features))
         else:
             st.warning("⚠️ Wybierz cechy do porównania lub sprawdź czy dane zawierają kolumny 'label' i 'dataset'")
     
@@ -110,27 +221,23 @@ if df is not None and not df.empty:
         st.header("🕸️ Radar Chart: Profil stresu")
         
         if len(selected_features) > 0 and 'label' in df.columns and 'dataset' in df.columns:
-            # Przygotuj dane
-            df_plot = df[df['label'].isin(['baseline', 'stress'])].copy()
-            summary = df_plot.groupby(['dataset', 'label'])[selected_features].mean().reset_index()
+            # Wycinek średnich z cache agregatów
+            radar_summary = summary['means'][selected_features].copy()
             
             # Normalizuj wartości (0-1) dla lepszej wizualizacji
-            for feat in selected_features:
-                max_val = summary[feat].max()
-                min_val = summary[feat].min()
-                if max_val > min_val:
-                    summary[f'{feat}_norm'] = (summary[feat] - min_val) / (max_val - min_val)
-                else:
-                    summary[f'{feat}_norm'] = 0.5
+            max_vals = radar_summary.max()
+            min_vals = radar_summary.min()
+            span = (max_vals - min_vals).where(max_vals > min_vals)
+            normalized = ((radar_summary - min_vals) / span).fillna(
+                pd.Series(0.5, index=selected_features).where(span.isna()))
             
             # Utwórz radar chart używając plotly
             fig = go.Figure()
             
             for dataset in ['Galaxy', 'Nurse']:
                 for label in ['baseline', 'stress']:
-                    subset = summary[(summary['dataset'] == dataset) & (summary['label'] == label)]
-                    if len(subset) > 0:
-                        values = [subset[f'{feat}_norm'].values[0] for feat in selected_features]
+                    if (dataset, label) in normalized.index:
+                        values = normalized.loc[(dataset, label)].tolist()
                         fig.add_trace(go.Scatterpolar(
                             r=values + [values[0]],  # Zamknij wykres
                             theta=selected_features + [selected_features[0]],
@@ -156,38 +263,15 @@ if df is not None and not df.empty:
         st.header("🔥 Heatmapa: Zmiany względne (stress vs baseline)")
         
         if len(selected_features) > 0 and 'label' in df.columns and 'dataset' in df.columns:
-            # Oblicz zmiany procentowe
-            df_plot = df[df['label'].isin(['baseline', 'stress'])].copy()
-            summary = df_plot.groupby(['dataset', 'label'])[selected_features].mean().reset_index()
-            
-            changes_data = []
-            for dataset in ['Galaxy', 'Nurse']:
-                baseline_row = summary[(summary['dataset'] == dataset) & (summary['label'] == 'baseline')]
-                stress_row = summary[(summary['dataset'] == dataset) & (summary['label'] == 'stress')]
-                
-                if len(baseline_row) > 0 and len(stress_row) > 0:
-                    for feat in selected_features:
-                        baseline_val = baseline_row[feat].values[0]
-                        stress_val = stress_row[feat].values[0]
-                        if baseline_val != 0 and not np.isnan(baseline_val) and not np.isnan(stress_val):
-                            change_pct = ((stress_val - baseline_val) / baseline_val) * 100
-                            changes_data.append({
-                                'dataset': dataset,
-                                'feature': feat,
-                                'change_pct': change_pct
-                            })
+            # Zmiany procentowe (z cache agregatów)
+            changes_data = change_records(summary['change_pct'], selected_features)
             
             if len(changes_data) > 0:
                 changes_df = pd.DataFrame(changes_data)
                 pivot_df = changes_df.pivot(index='feature', columns='dataset', values='change_pct')
                 
-                fig, ax = plt.subplots(figsize=(10, max(6, len(selected_features)*0.5)))
-                sns.heatmap(pivot_df, annot=True, fmt='.1f', cmap='RdBu_r', center=0, 
-                           cbar_kws={'label': 'Zmiana procentowa (%)'}, ax=ax)
-                ax.set_title('Heatmapa zmian procentowych (stress vs baseline)')
-                ax.set_ylabel('Cecha')
-                plt.tight_layout()
-                st.pyplot(fig)
+                key = figure_key("galaxy_nurse", chart=chart_type, features=selected_features, data=data_key)
+                st_cached_pyplot(key, lambda: render_heatmap(pivot_df, len(selected_features)))
             else:
                 st.warning("⚠️ Nie można obliczyć zmian procentowych")
         else:
@@ -197,45 +281,15 @@ if df is not None and not df.empty:
         st.header("📈 Porównanie trendów zmian")
         
         if len(selected_features) > 0 and 'label' in df.columns and 'dataset' in df.columns:
-            # Oblicz zmiany procentowe
-            df_plot = df[df['label'].isin(['baseline', 'stress'])].copy()
-            summary = df_plot.groupby(['dataset', 'label'])[selected_features].mean().reset_index()
-            
-            trends_data = []
-            for dataset in ['Galaxy', 'Nurse']:
-                baseline_row = summary[(summary['dataset'] == dataset) & (summary['label'] == 'baseline')]
-                stress_row = summary[(summary['dataset'] == dataset) & (summary['label'] == 'stress')]
-                
-                if len(baseline_row) > 0 and len(stress_row) > 0:
-                    for feat in selected_features:
-                        baseline_val = baseline_row[feat].values[0]
-                        stress_val = stress_row[feat].values[0]
-                        if baseline_val != 0 and not np.isnan(baseline_val) and not np.isnan(stress_val):
-                            change_pct = ((stress_val - baseline_val) / baseline_val) * 100
-                            trends_data.append({
-                                'dataset': dataset,
-                                'feature': feat,
-                                'change_pct': change_pct
-                            })
+            # Zmiany procentowe (z cache agregatów)
+            trends_data = change_records(summary['change_pct'], selected_features)
             
             if len(trends_data) > 0:
                 trends_df = pd.DataFrame(trends_data)
                 
                 # Wykres liniowy
-                fig, ax = plt.subplots(figsize=(12, 6))
-                for dataset in ['Galaxy', 'Nurse']:
-                    subset = trends_df[trends_df['dataset'] == dataset]
-                    ax.plot(subset['feature'], subset['change_pct'], marker='o', label=dataset, linewidth=2, markersize=8)
-                
-                ax.axhline(y=0, color='black', linestyle='--', alpha=0.3)
-                ax.set_xlabel('Cecha', fontsize=12)
-                ax.set_ylabel('Zmiana procentowa (%)', fontsize=12)
-                ax.set_title('Porównanie trendów zmian (stress vs baseline)', fontsize=14, fontweight='bold')
-                ax.legend(fontsize=11)
-                ax.grid(True, alpha=0.3)
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                st.pyplot(fig)
+                key = figure_key("galaxy_nurse", chart=chart_type, features=selected_features, data=data_key)
+                st_cached_pyplot(key, lambda: render_trends(trends_df))
                 
                 # Tabela porównawcza
                 st.subheader("📋 Tabela porównawcza zmian procentowych")
@@ -284,24 +338,24 @@ if df is not None and not df.empty:
         with col1:
             st.metric("Łączna liczba próbek", len(df))
         
+        crosstab = summary['crosstab']
         with col2:
-            galaxy_count = len(df[df['dataset'] == 'Galaxy'])
+            galaxy_count = int(summary['dataset_counts'].get('Galaxy', 0))
             st.metric("Galaxy", galaxy_count)
         
         with col3:
-            nurse_count = len(df[df['dataset'] == 'Nurse'])
+            nurse_count = int(summary['dataset_counts'].get('Nurse', 0))
             st.metric("Nurse", nurse_count)
         
         with col4:
             if 'label' in df.columns:
-                baseline_count = len(df[df['label'] == 'baseline'])
-                stress_count = len(df[df['label'] == 'stress'])
+                baseline_count = int(summary['label_counts'].get('baseline', 0))
+                stress_count = int(summary['label_counts'].get('stress', 0))
                 st.metric("Baseline", baseline_count)
         
         # Rozkład etykiet
         st.subheader("Rozkład etykiet per dataset")
         if 'label' in df.columns:
-            crosstab = pd.crosstab(df['dataset'], df['label'])
             st.dataframe(crosstab, use_container_width=True)
 
 else:
@@ -1,6 +1,9 @@
 # 🔹 STREAMLIT APP - DEMO MONITOROWANIA STRESU
 # Uruchom: streamlit run streamlit_stress_demo.py
 
+import time
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -8,6 +11,8 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib import cm
 
+from wesad_streaming import DEFAULT_WINDOW_S, SessionReplayer, StreamingStressMonitor, load_e4_session
+
 # Konfiguracja strony
 st.set_page_config(
     page_title="Monitorowanie Stresu - Demo",
@@ -47,98 +52,189 @@ REFERENCE_VALUES = {
     "TEMP_mean": {"normal": (36.0, 37.0), "label": "Temperatura (°C)"}
 }
 
+FEATURES = list(REFERENCE_VALUES.keys())
+RADAR_ANGLES = np.linspace(0, 2 * np.pi, len(FEATURES), endpoint=False).tolist()
+RADAR_ANGLES += RADAR_ANGLES[:1]  # Zamknij okrąg
+
+# Domyślna sesja do odtwarzania w trybie na żywo (katalog z BVP.csv i TEMP.csv z opaski E4)
+DEFAULT_E4_PATH = "WESAD/S2/S2_E4_Data"
+
+
+def build_params_df(profile_data):
+    """Tabela parametrów ze statusem względem progów (NaN = jeszcze brak danych)."""
+    def status(value, abnormal, high_text, normal_text="✅ Normalny"):
+        if pd.isna(value):
+            return "⏳ Zbieranie danych"
+        return high_text if abnormal else normal_text
+
+    return pd.DataFrame([
+        {
+            "Parametr": "HR_mean",
+            "Wartość": profile_data["HR_mean"],
+            "Jednostka": "bpm",
+            "Status": status(profile_data["HR_mean"], profile_data["HR_mean"] > 80, "⚠️ Podwyższony")
+        },
+        {
+            "Parametr": "HRV_RMSSD",
+            "Wartość": profile_data["HRV_RMSSD"],
+            "Jednostka": "ms",
+            "Status": status(profile_data["HRV_RMSSD"], profile_data["HRV_RMSSD"] < 25, "⚠️ Obniżony")
+        },
+        {
+            "Parametr": "HRV_SDNN",
+            "Wartość": profile_data["HRV_SDNN"],
+            "Jednostka": "ms",
+            "Status": status(profile_data["HRV_SDNN"], profile_data["HRV_SDNN"] < 30, "⚠️ Obniżony")
+        },
+        {
+            "Parametr": "TEMP_mean",
+            "Wartość": profile_data["TEMP_mean"],
+            "Jednostka": "°C",
+            "Status": status(profile_data["TEMP_mean"], profile_data["TEMP_mean"] > 37.0, "⚠️ Podwyższona",
+                             "✅ Normalna")
+        }
+    ])
+
+
+def normalize_for_radar(profile_data):
+    """Normalizacja wartości do zakresu 0-150% (0 = ref_min, 100 = ref_max), zamknięta w okrąg."""
+    normalized_values = []
+    for feat in FEATURES:
+        ref_min, ref_max = REFERENCE_VALUES[feat]["normal"]
+        normalized = ((profile_data[feat] - ref_min) / (ref_max - ref_min)) * 100
+        normalized = np.clip(np.nan_to_num(normalized), 0, 150)  # Ogranicz do 150%
+        normalized_values.append(normalized)
+    return normalized_values + normalized_values[:1]
+
+
+def create_radar(profile_data, label):
+    """Rysuje radar plot; zwraca (fig, linia, wypełnienie) do późniejszej aktualizacji."""
+    fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(projection='polar'))
+    normalized_values = normalize_for_radar(profile_data)
+
+    line, = ax.plot(RADAR_ANGLES, normalized_values, 'o-', linewidth=2, label=label, color='#2E86AB')
+    fill, = ax.fill(RADAR_ANGLES, normalized_values, alpha=0.25, color='#2E86AB')
+
+    ax.set_xticks(RADAR_ANGLES[:-1])
+    ax.set_xticklabels([REFERENCE_VALUES[feat]["label"] for feat in FEATURES], fontsize=10)
+    ax.set_ylim(0, 150)
+    ax.set_yticks([0, 50, 100, 150])
+    ax.set_yticklabels(['0%', '50%', '100%', '150%'], fontsize=9)
+    ax.grid(True)
+    ax.set_title('Profil Fizjologiczny', fontsize=13, fontweight='bold', pad=20)
+    return fig, line, fill
+
+
+def update_radar(line, fill, profile_data):
+    """Podmienia tylko dane istniejącego wykresu (bez budowania figury od nowa)."""
+    normalized_values = normalize_for_radar(profile_data)
+    line.set_ydata(normalized_values)
+    fill.set_xy(np.column_stack([RADAR_ANGLES, normalized_values]))
+
+
+def interpret_live(snapshot):
+    """Interpretacja bieżących parametrów według tych samych progów co tabela."""
+    if any(pd.isna(snapshot[feat]) for feat in FEATURES):
+        return "Zbieranie danych - za mało uderzeń serca w oknie"
+    flags = (snapshot["HR_mean"] > 80) + (snapshot["HRV_RMSSD"] < 25) + \
+            (snapshot["HRV_SDNN"] < 30) + (snapshot["TEMP_mean"] > 37.0)
+    if flags >= 3:
+        return PROFILES["Profil 2 - Przewlekłe przeciążenie"]["interpretation"]
+    if flags >= 1:
+        return PROFILES["Profil 1 - Chwilowy stres"]["interpretation"]
+    return "Parametry w zakresie normy"
+
+
+def get_live_session(e4_path, speedup, window_s):
+    """Stan odtwarzania trzymany w st.session_state (przetrwa rerun skryptu)."""
+    config = (e4_path, window_s)
+    live = st.session_state.get("live")
+    if live is None or live["config"] != config:
+        session = load_e4_session(Path(e4_path))
+        live = {
+            "config": config,
+            "replay": SessionReplayer(session, speedup=speedup),
+            "monitor": StreamingStressMonitor(session["BVP"].fs, session["TEMP"].fs, window_s=window_s),
+            "running": False,
+        }
+        st.session_state["live"] = live
+    live["replay"].speedup = speedup
+    return live
+
+
 # KROK 3: UI - wybór profilu
 st.header("🔍 Wybór Profilu Użytkownika")
 
-selected_profile = st.radio(
-    "Wybierz profil do analizy:",
-    options=list(PROFILES.keys()),
+mode = st.radio(
+    "Tryb:",
+    options=["Profile demonstracyjne", "Na żywo (odtwarzanie sesji)"],
     horizontal=True
 )
 
-st.markdown("---")
+live = None
+if mode == "Profile demonstracyjne":
+    selected_profile = st.radio(
+        "Wybierz profil do analizy:",
+        options=list(PROFILES.keys()),
+        horizontal=True
+    )
+    # Pobierz dane wybranego profilu
+    profile_data = PROFILES[selected_profile]
+else:
+    selected_profile = "Na żywo"
+    col_path, col_speed, col_window = st.columns([2, 1, 1])
+    with col_path:
+        e4_path = st.text_input("Katalog sesji E4 (BVP.csv, TEMP.csv):", value=DEFAULT_E4_PATH)
+    with col_speed:
+        speedup = st.slider("Przyspieszenie odtwarzania (×)", min_value=1, max_value=60, value=10)
+    with col_window:
+        window_s = st.slider("Okno parametrów (s)", min_value=30, max_value=300,
+                             value=int(DEFAULT_WINDOW_S), step=30)
+    refresh_s = 0.5
+
+    try:
+        live = get_live_session(e4_path, speedup, float(window_s))
+    except (OSError, ValueError, KeyError) as e:
+        st.error(f"❌ Nie można wczytać sesji: {e}")
+        st.stop()
+
+    col_start, col_stop, col_reset = st.columns(3)
+    if col_start.button("▶️ Start"):
+        live["running"] = True
+    if col_stop.button("⏸️ Pauza"):
+        live["running"] = False
+    if col_reset.button("🔄 Od początku"):
+        st.session_state.pop("live", None)
+        live = get_live_session(e4_path, speedup, float(window_s))
+
+    profile_data = live["monitor"].snapshot()
+    replay = live["replay"]
+    profile_data["description"] = (f"Odtwarzanie sesji: {replay.position_s:.0f} / {replay.duration_s:.0f} s "
+                                   f"(×{speedup}, okno {window_s} s)")
+    profile_data["interpretation"] = interpret_live(profile_data)
 
-# Pobierz dane wybranego profilu
-profile_data = PROFILES[selected_profile]
+st.markdown("---")
 
 # Wyświetl tabelę z parametrami
 st.subheader("📋 Parametry Fizjologiczne")
-
-# Przygotuj DataFrame do wyświetlenia
-params_df = pd.DataFrame([
-    {
-        "Parametr": "HR_mean",
-        "Wartość": profile_data["HR_mean"],
-        "Jednostka": "bpm",
-        "Status": "⚠️ Podwyższony" if profile_data["HR_mean"] > 80 else "✅ Normalny"
-    },
-    {
-        "Parametr": "HRV_RMSSD",
-        "Wartość": profile_data["HRV_RMSSD"],
-        "Jednostka": "ms",
-        "Status": "⚠️ Obniżony" if profile_data["HRV_RMSSD"] < 25 else "✅ Normalny"
-    },
-    {
-        "Parametr": "HRV_SDNN",
-        "Wartość": profile_data["HRV_SDNN"],
-        "Jednostka": "ms",
-        "Status": "⚠️ Obniżony" if profile_data["HRV_SDNN"] < 30 else "✅ Normalny"
-    },
-    {
-        "Parametr": "TEMP_mean",
-        "Wartość": profile_data["TEMP_mean"],
-        "Jednostka": "°C",
-        "Status": "⚠️ Podwyższona" if profile_data["TEMP_mean"] > 37.0 else "✅ Normalna"
-    }
-])
-
-st.dataframe(params_df, use_container_width=True)
+table_placeholder = st.empty()
+table_placeholder.dataframe(build_params_df(profile_data), use_container_width=True)
 
 # Wykres - Radar Plot
 st.subheader("📈 Wizualizacja Profilu")
-
-# Przygotuj dane do radar plotu
-features = list(REFERENCE_VALUES.keys())
-values = [profile_data[feat] for feat in features]
-labels = [REFERENCE_VALUES[feat]["label"] for feat in features]
-
-# Normalizacja wartości do zakresu 0-100 dla wizualizacji
-normalized_values = []
-for i, feat in enumerate(features):
-    val = values[i]
-    ref_min, ref_max = REFERENCE_VALUES[feat]["normal"]
-    # Normalizuj: 0 = ref_min, 100 = ref_max
-    normalized = ((val - ref_min) / (ref_max - ref_min)) * 100
-    normalized = np.clip(normalized, 0, 150)  # Ogranicz do 150%
-    normalized_values.append(normalized)
-
-# Radar plot
-fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(projection='polar'))
-
-angles = np.linspace(0, 2 * np.pi, len(features), endpoint=False).tolist()
-angles += angles[:1]  # Zamknij okrąg
-normalized_values += normalized_values[:1]
-
-ax.plot(angles, normalized_values, 'o-', linewidth=2, label=selected_profile, color='#2E86AB')
-ax.fill(angles, normalized_values, alpha=0.25, color='#2E86AB')
-
-ax.set_xticks(angles[:-1])
-ax.set_xticklabels(labels, fontsize=10)
-ax.set_ylim(0, 150)
-ax.set_yticks([0, 50, 100, 150])
-ax.set_yticklabels(['0%', '50%', '100%', '150%'], fontsize=9)
-ax.grid(True)
-ax.set_title('Profil Fizjologiczny', fontsize=13, fontweight='bold', pad=20)
-
-st.pyplot(fig)
+radar_placeholder = st.empty()
+fig, radar_line, radar_fill = create_radar(profile_data, selected_profile)
+radar_placeholder.pyplot(fig)
 
 # KROK 4: Automatyczna interpretacja
 st.markdown("---")
 st.subheader("🔬 Ocena Stanu")
 
-st.info(f"**{profile_data['interpretation']}**")
+interpretation_placeholder = st.empty()
+interpretation_placeholder.info(f"**{profile_data['interpretation']}**")
 
-st.markdown(f"*{profile_data['description']}*")
+description_placeholder = st.empty()
+description_placeholder.markdown(f"*{profile_data['description']}*")
 
 # Ostrzeżenie
 st.warning("⚠️ **To nie jest diagnoza medyczna** – jedynie informacja oparta na danych fizjologicznych. W przypadku problemów zdrowotnych skonsultuj się z lekarzem.")
@@ -213,3 +309,29 @@ Aplikacja pokazuje, jak połączenie danych z wearables i subiektywnego feedback
 
 **Pamiętaj:** To narzędzie edukacyjne i wspierające świadomość – nie zastępuje profesjonalnej opieki medycznej.
 """)
+
+# Tryb na żywo: pętla odtwarzania na końcu skryptu, żeby cała strona była już
+# wyrenderowana. Każde odświeżenie dokłada tylko nowe próbki do monitora
+# i podmienia zawartość istniejących elementów.
+if live is not None and live["running"]:
+    replay, monitor = live["replay"], live["monitor"]
+    last_tick = time.perf_counter()
+    while live["running"] and not replay.finished:
+        time.sleep(refresh_s)
+        now = time.perf_counter()
+        monitor.push(replay.advance(now - last_tick))
+        last_tick = now
+
+        snapshot = monitor.snapshot()
+        table_placeholder.dataframe(build_params_df(snapshot), use_container_width=True)
+        update_radar(radar_line, radar_fill, snapshot)
+        radar_placeholder.pyplot(fig)
+        interpretation_placeholder.info(f"**{interpret_live(snapshot)}**")
+        update_ms = (time.perf_counter() - now) * 1000
+        description_placeholder.markdown(
+            f"*Odtwarzanie sesji: {replay.position_s:.0f} / {replay.duration_s:.0f} s "
+            f"(×{replay.speedup:g}) · aktualizacja {update_ms:.0f} ms*"
+        )
+    live["running"] = False
+
+plt.close(fig)
@@ -0,0 +1,45 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('statsmodels')
+from statsmodels.tsa.arima.model import ARIMA  # noqa: E402
+
+from wesad_arima import select_arima_models  # noqa: E402
+
+
+def grid_search(series, p_max, d_max, q_max):
+    """Pełna siatka jak `simple_arima_grid_search` z analiza_pobudzenia_hamowania.ipynb."""
+    best_aic, best_order = np.inf, None
+    for p in range(p_max + 1):
+        for d in range(d_max + 1):
+            for q in range(q_max + 1):
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    res = ARIMA(series, order=(p, d, q), enforce_stationarity=False,
+                                enforce_invertibility=False).fit(method_kwargs={"warn_convergence": False})
+                if res.aic < best_aic:
+                    best_aic, best_order = res.aic, (p, d, q)
+    return best_order, best_aic
+
+
+def arma_series(seed, integrated, n=200):
+    rng = np.random.default_rng(seed)
+    e = rng.normal(size=n)
+    x = np.zeros(n)
+    phi = rng.uniform(-0.5, 0.7)
+    for t in range(1, n):
+        x[t] = phi * x[t - 1] + e[t] + 0.3 * e[t - 1]
+    return pd.Series(np.cumsum(x) if integrated else x)
+
+
+def test_exhaustive_search_matches_grid_search_for_integrated_series():
+    series = {(f'S{i}', 'eda'): arma_series(i, integrated=i % 2 == 1) for i in range(4)}
+    result = select_arima_models(series, p_max=2, d_max=1, q_max=2, patience=4, n_workers=1,
+                                 cache_root=None, verbose=False)
+    for key, s in series.items():
+        order, aic = grid_search(s, 2, 1, 2)
+        assert result[key][0] == order
+        assert result[key][1].aic == pytest.approx(aic)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wesad_features import (
+    HRV_FEATURES,
+    create_time_windows,
+    extract_bvp_hrv_features,
+    extract_bvp_hrv_features_batch,
+    extract_bvp_hrv_windows,
+    detect_bvp_peaks,
+)
+from wesad_preprocessing import bandpass_filter
+
+FS = 64.0
+
+
+def synthetic_bvp(duration_s, seed=0, noise=0.1):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_s * FS)) / FS
+    beats = np.cumsum(0.8 + 0.08 * rng.normal(size=int(duration_s) + 2))
+    x = np.zeros_like(t)
+    for beat in beats:
+        x += np.exp(-((t - beat) / 0.12) ** 2) + 0.25 * np.exp(-((t - beat - 0.28) / 0.12) ** 2)
+    return bandpass_filter(x + noise * rng.normal(size=len(t)), 0.5, 8.0, FS)
+
+
+def per_window(bvp, windows):
+    return pd.DataFrame([extract_bvp_hrv_features(bvp, FS, time_window=w) for w in windows],
+                        columns=HRV_FEATURES)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_window_mode_equals_per_window_path(seed):
+    bvp = synthetic_bvp(180, seed=seed)
+    n = len(bvp)
+    windows = create_time_windows(n, FS, window_size_s=20, overlap=0.5)
+    # Okna przekraczające koniec sygnału, za krótkie i całkiem poza sygnałem
+    windows += [(n - int(25 * FS), n + int(15 * FS)), (n - int(5 * FS), n + int(30 * FS)),
+                (n + 10, n + int(20 * FS)), (0, int(9 * FS)), (0, n)]
+    batch = extract_bvp_hrv_features_batch(bvp, FS, windows, peak_detection='window')
+    pd.testing.assert_frame_equal(batch, per_window(bvp, windows), check_exact=True)
+    assert batch['mean_hr'].notna().sum() > len(windows) // 2
+
+
+def test_windows_helper_uses_create_time_windows():
+    bvp = synthetic_bvp(60)
+    result = extract_bvp_hrv_windows(bvp, FS, window_size_s=10, overlap=0.5, peak_detection='window')
+    windows = create_time_windows(len(bvp), FS, 10, 0.5)
+    assert list(zip(result['start_idx'], result['end_idx'])) == windows
+    pd.testing.assert_frame_equal(result[HRV_FEATURES], per_window(bvp, windows), check_exact=True)
+
+
+def session_reference(bvp, windows):
+    """Pętla po oknach na pikach sesji - to, co tryb 'session' liczy przez searchsorted."""
+    peaks = detect_bvp_peaks(bvp, FS)
+    rows = []
+    for start, end in windows:
+        start, end = min(max(start, 0), len(bvp)), min(max(end, 0), len(bvp))
+        window_peaks = peaks[(peaks >= start) & (peaks < end)]
+        rr = np.diff(window_peaks / FS)
+        rr = rr[(rr >= 0.3) & (rr <= 2.0)]
+        if end - start < int(FS * 10) or len(window_peaks) < 2 or len(rr) < 2:
+            rows.append([np.nan] * len(HRV_FEATURES))
+            continue
+        diffs = np.diff(rr)
+        power = np.abs(np.fft.rfft(rr - np.mean(rr))) ** 2
+        freq = np.fft.rfftfreq(len(rr), d=np.mean(rr))
+        lf = np.sum(power[(freq >= 0.04) & (freq < 0.15)])
+        hf = np.sum(power[(freq >= 0.15) & (freq <= 0.4)])
+        rows.append([60 / np.mean(rr), np.std(60 / rr), np.sqrt(np.mean(diffs ** 2)), np.std(rr),
+                     np.sum(np.abs(diffs) > 0.05) / len(diffs) * 100, lf / hf if hf > 0 else np.nan])
+    return pd.DataFrame(rows, columns=HRV_FEATURES)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_session_mode_matches_shared_peaks_reference(seed):
+    bvp = synthetic_bvp(180, seed=seed)
+    n = len(bvp)
+    windows = create_time_windows(n, FS, window_size_s=20, overlap=0.5)
+    windows += [(n - int(25 * FS), n + int(15 * FS)), (n + 10, n + int(20 * FS)), (0, int(9 * FS))]
+    batch = extract_bvp_hrv_features_batch(bvp, FS, windows)
+    pd.testing.assert_frame_equal(batch, session_reference(bvp, windows), rtol=1e-9)
+    assert batch['mean_hr'].notna().sum() > len(windows) // 2
+    # Piki sesji i okna zwykle się pokrywają (per okno bywa, że łapie falę dykrotyczną)
+    per_window_hr = per_window(bvp, windows)['mean_hr']
+    assert np.nanmedian(np.abs(batch['mean_hr'] - per_window_hr)) < 3.0
+
+
+def test_unknown_peak_detection_mode():
+    with pytest.raises(ValueError):
+        extract_bvp_hrv_features_batch(synthetic_bvp(30), FS, [(0, 640)], peak_detection='global')
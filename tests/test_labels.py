@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wesad_labels import LabelIndex
+
+
+def _reference_majority(labels, start, end, default):
+    window = pd.Series(labels[start:end])
+    return window.value_counts(sort=True).index[0] if len(window) else default
+
+
+@pytest.mark.parametrize('labels', [
+    np.array([0, 0, 1, 1, 1, 2, 2, 0, 0, 0], dtype=np.int64),
+    pd.Series(['baseline', 'baseline', 'stress', 'stress', 'stress', 'amusement',
+               'amusement', 'unknown', 'unknown', 'unknown']).to_numpy(),
+    np.array(['baseline', 'stress', 'stress', 'baseline']),
+], ids=['int', 'object', 'unicode'])
+def test_majority_and_label_at_for_int_and_string_labels(labels):
+    index = LabelIndex.from_labels(labels)
+    for start in range(len(labels)):
+        for end in range(start + 1, len(labels) + 1):
+            expected = _reference_majority(labels, start, end, 'unknown')
+            assert index.majority(start, end, default='unknown') == expected
+    for sample, label in enumerate(labels):
+        assert index.label_at(sample) == label
+        assert type(index.label_at(sample)) in (int, str)
+    assert index.label_at(len(labels), default='unknown') == 'unknown'
+    assert index.majority(len(labels), len(labels) + 5, default='unknown') == 'unknown'
+
+
+def test_majority_labels_matches_majority_for_strings():
+    rng = np.random.default_rng(0)
+    labels = np.repeat(np.array(['baseline', 'stress', 'amusement', 'unknown'], dtype=object)[
+        rng.integers(0, 4, 40)], rng.integers(1, 20, 40))
+    index = LabelIndex.from_labels(labels)
+    starts = rng.integers(0, len(labels), 200)
+    ends = starts + rng.integers(1, 60, 200)
+    batch = index.majority_labels(starts, ends, default='unknown')
+    single = [index.majority(s, e, default='unknown') for s, e in zip(starts, ends)]
+    assert list(batch) == single
+
+
+@pytest.mark.parametrize('labels', [
+    np.array([0, 0, 1, 1, 2, 0], dtype=np.int64),
+    pd.Series(['baseline', 'baseline', 'stress', 'unknown', 'unknown', 'amusement']).to_numpy(),
+], ids=['int', 'object'])
+def test_save_load_round_trip(tmp_path, labels):
+    index = LabelIndex.from_labels(labels, fs=700.0)
+    path = tmp_path / 'label_runs.npz'
+    index.save(path)
+    loaded = LabelIndex.load(path)
+    assert loaded.fs == 700.0
+    np.testing.assert_array_equal(loaded.starts, index.starts)
+    np.testing.assert_array_equal(loaded.ends, index.ends)
+    assert list(loaded.values) == list(index.values)
+    for start in range(len(labels)):
+        assert loaded.majority(start, len(labels), default='unknown') == index.majority(start, len(labels))
+        assert loaded.label_at(start) == labels[start]
+
+
+@pytest.mark.parametrize('label_fs, fs', [(4.0, 64.0), (700.0, 4.0), (700.0, 64.0), (4.0, 4.0), (32.0, 700.0)])
+def test_phase_bounds_match_scale_phase_indices(label_fs, fs):
+    from wesad_features import scale_phase_indices
+
+    rng = np.random.default_rng(int(fs + label_fs))
+    labels = np.repeat(rng.integers(0, 4, 30), rng.integers(1, 50, 30))
+    index = LabelIndex.from_labels(labels, fs=label_fs)
+    full_len = int(len(labels) * fs / label_fs)
+    for signal_len in (full_len, full_len // 2, full_len // 3 + 1, 1):
+        for label in range(4):
+            scaled = scale_phase_indices({'phase': np.flatnonzero(labels == label)}, label_fs, fs, signal_len)['phase']
+            expected = (int(scaled[0]), int(scaled[-1]) + 1) if len(scaled) else None
+            assert index.phase_bounds(label, fs, signal_len) == expected
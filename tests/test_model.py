@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wesad_features import pivot_signal_features
+from wesad_model import (
+    MissingFeaturesError,
+    REACTION_PARAMETERS,
+    list_versions,
+    load_bundle,
+    regulation_training_set,
+    train_regulation_model,
+)
+
+
+def feature_table(n_subjects=6, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = {'subject': [f"S{i + 2}" for i in range(n_subjects)]}
+    for signal in ['EDA', 'BVP', 'TEMP']:
+        for parameter in REACTION_PARAMETERS:
+            rows[f"{signal}_{parameter}"] = rng.normal(size=n_subjects)
+    rows['BVP_mean_hr'] = rng.normal(70, 5, size=n_subjects)
+    rows['EDA_scr_count'] = rng.integers(0, 10, size=n_subjects).astype(float)
+    rows['regulation_score'] = rng.normal(size=n_subjects)
+    rows['regulation_class'] = (['dobra', 'umiarkowana', 'słaba'] * n_subjects)[:n_subjects]
+    return pd.DataFrame(rows)
+
+
+def test_regulation_schema_is_computable_from_reaction_data():
+    X, _ = regulation_training_set(feature_table())
+    assert sorted(X.columns) == sorted(f"{s}_{p}" for s in ['EDA', 'BVP', 'TEMP'] for p in REACTION_PARAMETERS)
+    reaction_data = pd.read_csv('regulacja_emocjonalna_dane.csv')
+    assert set(X.columns) <= set(pivot_signal_features(reaction_data).columns)
+
+
+def test_missing_schema_columns_raise(tmp_path):
+    pivot = feature_table()
+    bundle = train_regulation_model(pivot, root=tmp_path, reaction_only=False, verbose=False)
+    assert bundle.missing_features(pivot) == []
+    partial = pivot.drop(columns=['BVP_mean_hr', 'EDA_scr_count']).set_index('subject')
+    assert bundle.missing_features(partial) == ['BVP_mean_hr', 'EDA_scr_count']
+    with pytest.raises(MissingFeaturesError) as excinfo:
+        bundle.predict_batch(partial)
+    assert excinfo.value.missing == ['BVP_mean_hr', 'EDA_scr_count']
+    assert len(bundle.predict_batch(partial, allow_missing=True)) == len(partial)
+
+
+def test_save_never_overwrites_a_version(tmp_path):
+    pivot = feature_table()
+    first = train_regulation_model(pivot, root=tmp_path, verbose=False)
+    second = train_regulation_model(pivot, root=tmp_path, verbose=False)
+    assert first.version != second.version
+    assert list_versions(first.name, tmp_path) == [first.version, second.version]
+    assert load_bundle(first.name, root=tmp_path).version == second.version
+    with pytest.raises(FileExistsError):
+        second.save(tmp_path, version=first.version)
+    assert second.metadata['subjects'] == pivot['subject'].tolist()
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from wesad_rolling import WINDOW_FEATURES, window_feature_table
+
+
+def notebook_window_features(window_data):
+    """extract_features_from_window z 07_klasyfikacja_emocji_timeseries.ipynb (bez kolumn oddechu)."""
+    features = {}
+    for col in window_data.columns:
+        signal = window_data[col].values
+        clean = signal[~np.isnan(signal)]
+        if len(clean) == 0:
+            features.update({f"{col}_{name}": 0.0 for name in WINDOW_FEATURES})
+            continue
+        mean, std = np.mean(clean), np.std(clean)
+        features[f"{col}_mean"] = mean
+        features[f"{col}_std"] = std if len(clean) > 1 else 0.0
+        features[f"{col}_min"] = np.min(clean)
+        features[f"{col}_max"] = np.max(clean)
+        features[f"{col}_range"] = features[f"{col}_max"] - features[f"{col}_min"]
+        features[f"{col}_rms"] = np.sqrt(np.mean(clean ** 2))
+        features[f"{col}_kurtosis"] = (np.mean(((clean - mean) / std) ** 4) - 3
+                                       if len(clean) >= 4 and std != 0 else 0.0)
+        features[f"{col}_skewness"] = (np.mean(((clean - mean) / std) ** 3)
+                                       if len(clean) >= 3 and std != 0 else 0.0)
+        features[f"{col}_rmssd"] = np.sqrt(np.mean(np.diff(clean) ** 2)) if len(clean) >= 2 else 0.0
+        features[f"{col}_slope"] = np.polyfit(np.arange(len(clean)), clean, 1)[0] if len(clean) >= 2 else 0.0
+    return features
+
+
+@pytest.mark.parametrize('window, step', [(64, 32), (50, 7), (40, 40)])
+def test_window_feature_table_matches_per_window_loop(window, step):
+    rng = np.random.default_rng(window + step)
+    n = 600
+    with_gaps = rng.normal(size=n).cumsum()
+    with_gaps[rng.choice(n, 60, replace=False)] = np.nan
+    with_gaps[100:100 + window] = np.nan  # okno złożone z samych NaN
+    frame = pd.DataFrame({
+        'eda': 2 + 0.1 * rng.normal(size=n).cumsum(),
+        'acc': rng.normal(size=n),
+        'temp': np.full(n, 33.5),
+        'hr': with_gaps,
+    })
+    result = window_feature_table(frame, window, step)
+    starts = np.arange(0, n - window + 1, step)
+    expected = pd.DataFrame([notebook_window_features(frame.iloc[s:s + window]) for s in starts])
+    assert list(result.columns) == list(expected.columns) + ['window_start', 'window_end']
+    np.testing.assert_array_equal(result['window_start'], starts)
+    np.testing.assert_allclose(result[expected.columns].to_numpy(), expected.to_numpy(), rtol=1e-7, atol=1e-9)
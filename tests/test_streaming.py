@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from wesad_features import extract_bvp_hrv_features
+from wesad_preprocessing import bandpass_filter
+from wesad_streaming import StreamingPeakDetector, StreamingStressMonitor
+
+FS = 64.0
+
+
+def synthetic_bvp(duration_s, hr_bpm=72.0, noise=0.05, seed=0):
+    """Fala tętna z falą dykrotyczną, zmiennością RR i szumem białym."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration_s * FS)) / FS
+    n_beats = int(duration_s * hr_bpm / 60) + 2
+    rr = 60.0 / hr_bpm * (1 + 0.03 * np.sin(2 * np.pi * 0.25 * np.arange(n_beats) * 60 / hr_bpm)
+                          + 0.01 * rng.normal(size=n_beats))
+    x = np.zeros_like(t)
+    for beat in np.cumsum(rr):
+        x += np.exp(-((t - beat) / 0.12) ** 2) + 0.25 * np.exp(-((t - beat - 0.28) / 0.12) ** 2)
+    return x + noise * rng.normal(size=len(t))
+
+
+@pytest.mark.parametrize('noise', [0.02, 0.05, 0.1])
+def test_streaming_hr_and_rmssd_follow_batch_detection(noise):
+    bvp = synthetic_bvp(60, noise=noise)
+    batch = extract_bvp_hrv_features(bandpass_filter(bvp, 0.5, 8.0, FS), FS)
+    monitor = StreamingStressMonitor(FS, 4.0, window_s=120)
+    for start in range(0, len(bvp), 17):
+        monitor.push_bvp(bvp[start:start + 17])
+    snapshot = monitor.snapshot()
+    assert snapshot['HR_mean'] == pytest.approx(batch['mean_hr'], abs=1.0)
+    assert snapshot['HRV_RMSSD'] == pytest.approx(batch['hrv_rmssd'] * 1000, rel=0.3)
+
+
+def test_peaks_do_not_depend_on_chunk_size():
+    bvp = synthetic_bvp(60)
+    results = []
+    for chunk in (1, 7, 64, 5000):
+        detector = StreamingPeakDetector(FS)
+        results.append(np.concatenate([detector.push(bvp[i:i + chunk]) for i in range(0, len(bvp), chunk)]))
+    for peaks in results[1:]:
+        np.testing.assert_array_equal(peaks, results[0])
+    assert np.all(np.diff(results[0]) >= int(FS * 0.3))
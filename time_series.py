@@ -1,19 +1,19 @@
 # ===============================
 # 1️⃣ Importy
 # ===============================
-import pickle
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import streamlit as st
 import numpy as np
+from wesad_cache import load_wesad_cached
 
 # ===============================
 # 2️⃣ Wczytanie przetworzonych danych
 # ===============================
-pkl_path = "/Users/turfian/Downloads/archive (4)/WESAD/S2/S2.pkl"
-with open(pkl_path, "rb") as f:
-    data = pickle.load(f)  # zakładam, że to DataFrame z czasem i cechami
+raw_root = "/Users/turfian/Downloads/archive (4)/WESAD"
+# Kolumnowy cache .npy (wesad_cache.py) - S2.pkl rozpakowywany tylko przy pierwszym uruchomieniu
+data = load_wesad_cached("S2", raw_root=raw_root)
 
 # Sprawdzenie kolumn
 print(data.columns)
@@ -0,0 +1,371 @@
+"""
+Wyrównanie strumieni o różnych częstotliwościach (700/64/32/4/1 Hz) do wspólnej siatki.
+
+`resample_uniform` z notebooków budował dla każdego sensora `pd.date_range`,
+robił `reindex` + `interpolate(method="time")` + `ffill`, a potem łączył
+ramki `merge(how="outer")` po znacznikach czasu; `resample_chest_signal`
+robił FFT (`scipy.signal.resample`) całej sesji 700 Hz, które "dzwoni" na
+krańcach sesji. Tutaj wszystkie strumienie trafiają do jednej prealokowanej
+macierzy float32 na całkowitej siatce próbek (wiersz k to czas
+start_ts + k / target_fs):
+
+- zwiększanie częstotliwości (EDA/TEMP 4 Hz, HR 1 Hz -> 32 Hz): interpolacja
+  liniowa po indeksie próbki - jak `interpolate(method="time")` poza
+  ostatnim interwałem strumienia (patrz zmiany zachowania),
+- zmniejszanie (RespiBAN 700 Hz, BVP 64 Hz -> 32 Hz): polifazowo z filtrem
+  antyaliasingowym (`resample_poly`) kawałkami przez `resample_chunked`,
+- zdarzenia o nieregularnym czasie (IBI): `np.interp` po czasie zdarzeń.
+
+Przed pierwszą i po ostatniej próbce strumienia wartość jest przedłużana
+(jak `ffill().bfill()` w notebooku). Etykiety (`label` 700 Hz z pickla albo
+fazy protokołu z `_quest.csv`) przenoszone są na siatkę przez indeks próbki.
+
+Zmiany zachowania względem `resample_uniform`:
+- ostatni interwał strumienia jest interpolowany do ostatniej próbki;
+  `date_range(..., inclusive="left")` gubił ostatnią próbkę, więc ten
+  interwał był wypełniany `ffill` (różnice do ~2.8 przy EDA 4 Hz -> 32 Hz),
+- BVP 64 Hz jest filtrowane antyaliasingowo zamiast brania co drugiej próbki,
+- IBI nie trafia na osobną, przesuniętą siatkę, a stała kolumna tags nie jest
+  już zwracana.
+
+Użycie:
+    signals = load_e4_subject(RAW_ROOT / "S2" / "S2_E4_Data")
+    aligned = align_e4_session(signals, target_fs=32.0, max_duration_s=40 * 60)
+    aligned.data                       # (n, kanały) float32
+    df = aligned.to_frame()            # timestamp + kolumny, jak aligned z load_empatica_session
+
+    wesad = align_wesad_subject("S2", target_fs=32.0)   # chest + wrist z cache .npy
+    X, y = wesad.data, wesad.labels                      # macierz float32 + etykiety 0-7
+"""
+
+import math
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from wesad_cache import CACHE_ROOT, RAW_ROOT, load_labels
+from wesad_e4 import E4IBI, E4Signal, build_time_index
+from wesad_memmap import CHEST_COLUMNS, CHUNK_SECONDS, MemmapSignalStore, rational_factors, resample_chunked
+
+TARGET_FS = 32.0
+
+# Kolumny kanałów nadgarstka z pickla WESAD (E4 zsynchronizowane z RespiBAN)
+WRIST_COLUMNS = {
+    "ACC": ["wrist_acc_x", "wrist_acc_y", "wrist_acc_z"],
+    "BVP": ["wrist_bvp"],
+    "EDA": ["wrist_eda"],
+    "TEMP": ["wrist_temp"],
+}
+
+DEVICE_COLUMNS = {"chest": CHEST_COLUMNS, "wrist": WRIST_COLUMNS}
+
+# Tolerancja zaokrągleń przy przeliczaniu czasu na indeks próbki
+_EPS = 1e-9
+
+
+class AlignedSignals:
+    """
+    Strumienie wyrównane do wspólnej siatki `fs`.
+
+    `data` to macierz float32 (próbki, kanały), `labels` (opcjonalnie) wektor
+    etykiet tej samej długości; wiersz k odpowiada czasowi start_ts + k / fs.
+    """
+
+    def __init__(self, data: np.ndarray, columns, start_ts: float, fs: float, labels=None):
+        self.data = data
+        self.columns = list(columns)
+        self.start_ts = float(start_ts)
+        self.fs = float(fs)
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"AlignedSignals(n={len(self)}, kanały={len(self.columns)}, fs={self.fs:g})"
+
+    @property
+    def duration_s(self) -> float:
+        return len(self) / self.fs
+
+    def column(self, name: str) -> np.ndarray:
+        """Widok jednej kolumny (bez kopii)."""
+        return self.data[:, self.columns.index(name)]
+
+    def timestamps(self) -> pd.DatetimeIndex:
+        return build_time_index(len(self), self.start_ts, self.fs)
+
+    def to_frame(self, label_column: str = "label") -> pd.DataFrame:
+        """DataFrame: kolumna timestamp + kanały (+ etykiety, jeśli są)."""
+        data = pd.DataFrame(self.data, columns=self.columns)
+        data.insert(0, "timestamp", self.timestamps())
+        if self.labels is not None:
+            data[label_column] = self.labels
+        return data
+
+
+def grid_length(duration_s: float, target_fs: float) -> int:
+    """Liczba próbek siatki `target_fs` w przedziale [0, duration_s)."""
+    return max(int(math.ceil(duration_s * target_fs - _EPS)), 0)
+
+
+def _as_2d(values) -> np.ndarray:
+    return values.reshape(len(values), -1)
+
+
+def _output(out, n_out: int, n_channels: int) -> np.ndarray:
+    if out is None:
+        return np.empty((n_out, n_channels), dtype=np.float32)
+    if out.shape != (n_out, n_channels):
+        raise ValueError(f"Oczekiwano tablicy wyjściowej {(n_out, n_channels)}, otrzymano {out.shape}")
+    return out
+
+
+def interp_stream(values, src_fs: float, target_fs: float, n_out: int, offset_s: float = 0.0,
+                  out=None, chunk_seconds: float = CHUNK_SECONDS) -> np.ndarray:
+    """
+    Interpolacja liniowa strumienia na siatkę `target_fs` (kawałkami).
+
+    Próbka i strumienia ma czas offset_s + i / src_fs (względem początku
+    siatki). Poza zakresem strumienia przedłużana jest pierwsza/ostatnia wartość.
+
+    Args:
+        values: tablica (n,) lub (n, kanały) - np. np.memmap
+        src_fs: częstotliwość strumienia (Hz)
+        target_fs: częstotliwość siatki (Hz)
+        n_out: liczba próbek siatki
+        offset_s: przesunięcie początku strumienia względem siatki (s)
+        out: opcjonalna tablica (n_out, kanały), np. widok kolumn wspólnej macierzy
+
+    Returns:
+        tablica (n_out, kanały)
+    """
+    values = _as_2d(values)
+    out = _output(out, n_out, values.shape[1])
+    n_in = len(values)
+    if n_in == 0:
+        out[:] = np.nan
+        return out
+    step = max(int(chunk_seconds * target_fs), 1)
+    for start in range(0, n_out, step):
+        stop = min(n_out, start + step)
+        # Pozycja próbki siatki w indeksach strumienia
+        pos = (np.arange(start, stop) / target_fs - offset_s) * src_fs
+        pos = np.clip(pos, 0, n_in - 1)
+        left = np.minimum(np.floor(pos + _EPS).astype(np.int64), n_in - 1)
+        right = np.minimum(left + 1, n_in - 1)
+        lo, hi = left[0], right[-1] + 1
+        block = np.asarray(values[lo:hi], dtype=np.float64)
+        frac = (pos - left)[:, None]
+        out[start:stop] = block[left - lo] * (1.0 - frac) + block[right - lo] * frac
+    return out
+
+
+def decimate_stream(values, src_fs: float, target_fs: float, n_out: int, offset_s: float = 0.0,
+                    out=None, chunk_seconds: float = CHUNK_SECONDS) -> np.ndarray:
+    """
+    Polifazowe zmniejszenie częstotliwości (`resample_poly`, kawałkami) na siatkę `target_fs`.
+
+    Przesunięcie strumienia zaokrąglane jest do całej próbki siatki; poza
+    zakresem strumienia przedłużana jest pierwsza/ostatnia wartość.
+    """
+    values = _as_2d(values)
+    out = _output(out, n_out, values.shape[1])
+    if len(values) == 0:
+        out[:] = np.nan
+        return out
+    shift = int(round(offset_s * target_fs))
+    up, down = rational_factors(src_fs, target_fs)
+    if shift >= 0 and n_out > shift:
+        # Tylko próbki potrzebne do końca siatki + połowa długości filtra resample_poly,
+        # żeby obcięcie siatki (max_duration_s) nie zmieniało ostatnich próbek
+        margin = 10 * max(up, down) // up + 1
+        values = values[:int(math.ceil((n_out - shift) * down / up)) + margin]
+    n_resampled = int(math.ceil(len(values) * up / down))
+    lo, hi = max(shift, 0), min(n_out, shift + n_resampled)
+    if shift >= 0 and hi == shift + n_resampled:
+        # Strumień mieści się w siatce - wynik trafia wprost do macierzy wyjściowej
+        resample_chunked(values, src_fs, target_fs, chunk_seconds=chunk_seconds,
+                         out=out[lo:hi], padtype="edge")
+    elif hi > lo:
+        resampled = resample_chunked(values, src_fs, target_fs, chunk_seconds=chunk_seconds,
+                                     dtype=np.float32, padtype="edge")
+        out[lo:hi] = resampled[lo - shift:hi - shift]
+    else:
+        # Strumień w całości poza siatką
+        out[:] = values[0] if shift >= n_out else values[-1]
+        return out
+    out[:lo] = out[lo]
+    out[hi:] = out[hi - 1]
+    return out
+
+
+def align_stream(values, src_fs: float, target_fs: float, n_out: int, offset_s: float = 0.0,
+                 out=None, chunk_seconds: float = CHUNK_SECONDS) -> np.ndarray:
+    """Wybiera metodę: interpolacja przy zwiększaniu częstotliwości, `resample_poly` przy zmniejszaniu."""
+    method = decimate_stream if src_fs > target_fs else interp_stream
+    return method(values, src_fs, target_fs, n_out, offset_s=offset_s, out=out, chunk_seconds=chunk_seconds)
+
+
+def align_events(times_s, values, target_fs: float, n_out: int, offset_s: float = 0.0,
+                 out=None) -> np.ndarray:
+    """Interpolacja liniowa zdarzeń o nieregularnym czasie (np. IBI) na siatkę `target_fs`."""
+    values = _as_2d(np.asarray(values))
+    out = _output(out, n_out, values.shape[1])
+    if len(values) == 0:
+        out[:] = np.nan
+        return out
+    grid_s = np.arange(n_out) / target_fs
+    event_s = offset_s + np.asarray(times_s, dtype=np.float64)
+    for channel in range(values.shape[1]):
+        out[:, channel] = np.interp(grid_s, event_s, values[:, channel])
+    return out
+
+
+def labels_to_grid(labels, src_fs: float, target_fs: float, n_out: int, offset_s: float = 0.0,
+                   fill=0) -> np.ndarray:
+    """
+    Przenosi etykiety na siatkę `target_fs`: etykieta próbki obowiązującej w chwili k / target_fs.
+
+    Próbki siatki poza zakresem etykiet dostają `fill`.
+    """
+    labels = np.asarray(labels)
+    idx = np.floor((np.arange(n_out) / target_fs - offset_s) * src_fs + _EPS).astype(np.int64)
+    valid = (idx >= 0) & (idx < len(labels))
+    result = np.full(n_out, fill, dtype=labels.dtype)
+    result[valid] = labels[idx[valid]]
+    return result
+
+
+def phase_labels_to_grid(phases: pd.DataFrame, start_ts: float, target_fs: float, n_out: int,
+                         unknown: str = "unknown") -> np.ndarray:
+    """
+    Fazy protokołu (kolumny phase/start/end, przedziały [start, end)) jako wektor etykiet siatki.
+
+    Odpowiednik `assign_phase_labels` z notebooków, ale przez `searchsorted`
+    na siatce zamiast `IntervalIndex` na znacznikach czasu.
+    """
+    result = np.full(n_out, unknown, dtype=object)
+    if phases is None or phases.empty:
+        return result
+    grid_ns = build_time_index(n_out, start_ts, target_fs).as_unit("ns").asi8
+    starts = np.searchsorted(grid_ns, pd.DatetimeIndex(phases["start"]).as_unit("ns").asi8, side="left")
+    ends = np.searchsorted(grid_ns, pd.DatetimeIndex(phases["end"]).as_unit("ns").asi8, side="left")
+    # Od końca, żeby przy nakładających się fazach wygrywała wcześniejsza
+    for phase, lo, hi in reversed(list(zip(phases["phase"], starts, ends))):
+        result[lo:hi] = phase
+    return result
+
+
+def _stream_span_s(stream) -> float:
+    """Czas od startu strumienia do jego ostatniej próbki/zdarzenia (s)."""
+    if isinstance(stream, E4IBI):
+        return float(stream.seconds[-1]) if len(stream) else 0.0
+    return (len(stream.values) - 1) / stream.fs if len(stream.values) else 0.0
+
+
+def _stream_columns(stream) -> list:
+    if isinstance(stream, E4IBI):
+        return ["seconds", "ibi"]
+    return list(stream.columns)
+
+
+def align_streams(streams: dict, target_fs: float = TARGET_FS, start_ts: float = None,
+                  max_duration_s: float = None, columns: dict = None,
+                  chunk_seconds: float = CHUNK_SECONDS) -> AlignedSignals:
+    """
+    Wyrównuje strumienie do jednej macierzy float32 na siatce `target_fs`.
+
+    Args:
+        streams: dict nazwa -> `E4Signal` (values, fs, start_ts, columns) albo `E4IBI`
+        target_fs: częstotliwość siatki (Hz)
+        start_ts: początek siatki (unix); domyślnie najwcześniejszy start strumieni
+        max_duration_s: opcjonalne obcięcie siatki (np. 40 min)
+        columns: opcjonalnie dict nazwa -> nazwy kolumn w wyniku (domyślnie `stream.columns`)
+
+    Returns:
+        AlignedSignals
+    """
+    streams = {name: stream for name, stream in streams.items() if len(stream)}
+    if not streams:
+        raise ValueError("Brak niepustych strumieni do wyrównania")
+    if start_ts is None:
+        start_ts = min(stream.start_ts for stream in streams.values())
+    # Siatka sięga do ostatniej próbki najdłuższego strumienia (jak date_range(..., inclusive="left"))
+    end_s = max(stream.start_ts - start_ts + _stream_span_s(stream) for stream in streams.values())
+    n_out = grid_length(end_s, target_fs)
+    if max_duration_s is not None:
+        n_out = min(n_out, grid_length(max_duration_s, target_fs))
+
+    names = {name: (columns or {}).get(name, _stream_columns(stream)) for name, stream in streams.items()}
+    data = np.empty((n_out, sum(len(cols) for cols in names.values())), dtype=np.float32)
+    col = 0
+    for name, stream in streams.items():
+        width = len(names[name])
+        view = data[:, col:col + width]
+        offset_s = stream.start_ts - start_ts
+        if isinstance(stream, E4IBI):
+            values = np.column_stack([stream.seconds, stream.ibi])
+            align_events(stream.seconds, values, target_fs, n_out, offset_s=offset_s, out=view)
+        else:
+            align_stream(stream.values, stream.fs, target_fs, n_out, offset_s=offset_s, out=view,
+                         chunk_seconds=chunk_seconds)
+        col += width
+    all_columns = [column for cols in names.values() for column in cols]
+    return AlignedSignals(data, all_columns, start_ts, target_fs)
+
+
+def prefixed_columns(name: str, columns) -> list:
+    """Nazwy kolumn z prefiksem sensora (jak `prefix_columns` z notebooków): 'seconds' -> 'ibi_seconds'."""
+    base = name.lower()
+    return [col if col.lower().startswith(base) else f"{base}_{col}" for col in columns]
+
+
+def align_e4_session(signals: dict, target_fs: float = TARGET_FS, max_duration_s: float = None,
+                     phases: pd.DataFrame = None, chunk_seconds: float = CHUNK_SECONDS) -> AlignedSignals:
+    """
+    Wyrównuje sensory E4 jednej osoby (wynik `load_e4_subject`) do siatki `target_fs`.
+
+    Kolumny nazywane są jak w `load_empatica_session` (acc_x, eda, bvp, temp,
+    hr, ibi_seconds, ibi). Gdy podane są fazy protokołu, `labels` zawiera
+    nazwę fazy dla każdej próbki siatki ("unknown" poza fazami).
+    """
+    columns = {name: prefixed_columns(name, _stream_columns(stream)) for name, stream in signals.items()}
+    aligned = align_streams(signals, target_fs, max_duration_s=max_duration_s, columns=columns,
+                            chunk_seconds=chunk_seconds)
+    if phases is not None:
+        aligned.labels = phase_labels_to_grid(phases, aligned.start_ts, target_fs, len(aligned))
+    return aligned
+
+
+def align_wesad_subject(subject: str, target_fs: float = TARGET_FS, devices=("chest", "wrist"),
+                        raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT,
+                        max_duration_s: float = None, chunk_seconds: float = CHUNK_SECONDS) -> AlignedSignals:
+    """
+    Sygnały RespiBAN (700 Hz) i E4 z pickla WESAD (64/32/4 Hz) wraz z etykietami na jednej siatce.
+
+    Kanały czytane są z kolumnowego cache (`np.memmap`), więc w pamięci jest
+    tylko wynikowa macierz i bieżący kawałek resamplingu. `labels` to etykiety
+    WESAD (0-7) próbkowane w chwili każdej próbki siatki.
+    """
+    streams, columns = {}, {}
+    stores = [MemmapSignalStore(subject, device, raw_root, cache_root) for device in devices]
+    try:
+        for store in stores:
+            for channel in store.channels:
+                name = f"{store.device}_{channel}"
+                channel_columns = DEVICE_COLUMNS[store.device].get(channel, [name.lower()])
+                streams[name] = E4Signal(name, store.channel(channel), 0.0, store.fs(channel), channel_columns)
+                columns[name] = channel_columns
+        aligned = align_streams(streams, target_fs, start_ts=0.0, max_duration_s=max_duration_s,
+                                columns=columns, chunk_seconds=chunk_seconds)
+    finally:
+        for store in stores:
+            store.close()
+    try:
+        labels, label_fs = load_labels(subject, raw_root, cache_root)
+        aligned.labels = labels_to_grid(labels, label_fs, target_fs, len(aligned))
+    except KeyError:
+        pass
+    return aligned
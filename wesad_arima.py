@@ -0,0 +1,361 @@
+"""
+Wybór rzędu ARIMA (p, d, q) równolegle, z wczesnym zatrzymaniem i cache zwycięskiego modelu.
+
+W analiza_pobudzenia_hamowania.ipynb `simple_arima_grid_search` dopasowywał
+szeregowo każdy model z potrójnej pętli p × d × q na oryginalnym szeregu
+(ARIMA różnicuje go od nowa dla każdego kandydata), a `compute_ar_stiffness`
+dopasowywał `AutoReg` od zera przy każdym wywołaniu. Tutaj:
+
+- każdy kandydat (p, d, q) to ten sam model co w `simple_arima_grid_search`
+  (ARIMA na oryginalnym szeregu), więc AIC/BIC są porównywalne między d,
+- kandydaci oceniani są falami rosnącej złożoności p + q w puli procesów
+  (`ProcessPoolExecutor`, jak w `wesad_pipeline.py`); wszystkie szeregi
+  (subject × sygnał) dzielą jedną pulę,
+- wczesne zatrzymanie po kryterium informacyjnym: gałąź d kończy się, gdy
+  `patience` kolejnych fal nie poprawi jej najlepszego kryterium. To
+  przybliżenie - model o większym p + q za falą bez poprawy nie jest
+  oceniany; przy `patience >= p_max + q_max` wynik jest taki sam jak
+  pełnego przeszukania siatki,
+- parametry zwycięzcy zapisywane są w cache per (subject, sygnał);
+  `load_arima_results` odtwarza wynik przez `ARIMA(...).filter(params)`
+  bez optymalizacji.
+
+Struktura cache:
+    {root}/{subject}/{sygnał}-{klucz}.json
+
+Użycie w notebooku:
+    order, model_res = best_arima(subject, "eda", eda_stationary, p_max=2, d_max=1, q_max=2)
+    model_res = load_arima_results(subject, "eda", eda_stationary)   # np. w forecast_and_plot
+"""
+
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    from statsmodels.tsa.ar_model import AutoReg
+    from statsmodels.tsa.arima.model import ARIMA
+    STATSMODELS_AVAILABLE = True
+except ImportError:
+    STATSMODELS_AVAILABLE = False
+
+ARIMA_ROOT = Path("results") / "arima"
+
+# Przycinanie siatki po kryterium informacyjnym
+CRITERION = 'aic'
+PATIENCE = 1  # fale (p + q) bez poprawy przed zakończeniem gałęzi d; >= p_max + q_max = pełna siatka
+MIN_SAMPLES = 10
+
+
+def _clean_series(series) -> pd.Series:
+    """Szereg float bez NaN (jak w `simple_arima_grid_search`)."""
+    return pd.to_numeric(pd.Series(series).dropna(), errors='coerce').dropna().astype(float)
+
+
+def _fingerprint(values: np.ndarray) -> str:
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    return hashlib.sha1(memoryview(values).cast('B')).hexdigest()
+
+
+def _fit_arima(args):
+    """
+    Zadanie workera: ARIMA(p, d, q) na oryginalnym szeregu -> (p, d, q, aic, bic, params).
+
+    Model i kryterium jak w `simple_arima_grid_search`.
+    """
+    p, d, q, values = args
+    try:
+        res = fit_arima(values, (p, d, q))
+        return p, d, q, float(res.aic), float(res.bic), np.asarray(res.params, dtype=np.float64).tolist()
+    except Exception:
+        return p, d, q, np.inf, np.inf, None
+
+
+class _OrderSearch:
+    """
+    Stan poszukiwania rzędu dla jednego szeregu (fale p + q = 0, 1, 2, ...).
+
+    Każde d przeszukiwane jest osobno: gałąź d kończy się, gdy `patience`
+    kolejnych fal nie poprawi jej najlepszego kryterium.
+    """
+
+    def __init__(self, series: pd.Series, p_max: int, d_max: int, q_max: int, criterion: str, patience: int):
+        self.p_max, self.q_max = p_max, q_max
+        self.criterion = criterion
+        self.patience = patience
+        self.values = series.to_numpy(dtype=np.float64)
+        self.active_d = set(range(d_max + 1)) if len(self.values) >= MIN_SAMPLES else set()
+        self.best_per_d = {d: np.inf for d in self.active_d}
+        self.stale_waves = {d: 0 for d in self.active_d}
+        self.scores = {}
+        self.wave = 0
+
+    @property
+    def done(self) -> bool:
+        return not self.active_d or self.wave > self.p_max + self.q_max
+
+    def next_jobs(self) -> list:
+        p_range = range(max(0, self.wave - self.q_max), min(self.p_max, self.wave) + 1)
+        return [(p, d, self.wave - p, self.values) for d in sorted(self.active_d) for p in p_range]
+
+    def update(self, results: list):
+        wave_best = {d: np.inf for d in self.active_d}
+        for p, d, q, aic, bic, params in results:
+            self.scores[(p, d, q)] = {'aic': aic, 'bic': bic, 'params': params}
+            wave_best[d] = min(wave_best[d], aic if self.criterion == 'aic' else bic)
+        for d, score in wave_best.items():
+            if score < self.best_per_d[d]:
+                self.best_per_d[d] = score
+                self.stale_waves[d] = 0
+            else:
+                self.stale_waves[d] += 1
+        self.active_d = {d for d in self.active_d if self.stale_waves[d] <= self.patience}
+        self.wave += 1
+
+
+def search_orders(series_by_key: dict, p_max: int = 3, d_max: int = 2, q_max: int = 3,
+                  criterion: str = CRITERION, patience: int = PATIENCE, executor=None) -> dict:
+    """
+    Przeszukanie siatki (p, d, q) dla wielu szeregów naraz (wspólna pula procesów).
+
+    Parameters:
+        series_by_key: klucz (np. (subject, sygnał)) -> szereg
+        criterion: 'aic' albo 'bic'
+        patience: liczba fal bez poprawy przed zakończeniem gałęzi d
+        executor: pula procesów (None = w bieżącym procesie)
+
+    Returns:
+        klucz -> tabela {(p, d, q): {'aic', 'bic', 'params'}} ocenionych kandydatów
+    """
+    searches = {key: _OrderSearch(_clean_series(series), p_max, d_max, q_max, criterion, patience)
+                for key, series in series_by_key.items()}
+    while True:
+        batch = {key: search.next_jobs() for key, search in searches.items() if not search.done}
+        if not batch:
+            break
+        tasks = [job for jobs in batch.values() for job in jobs]
+        outputs = _map(executor, _fit_arima, tasks)
+        offset = 0
+        for key, jobs in batch.items():
+            searches[key].update(outputs[offset:offset + len(jobs)])
+            offset += len(jobs)
+    return {key: search.scores for key, search in searches.items()}
+
+
+def best_order(scores: dict, criterion: str = CRITERION):
+    """
+    Rząd o najmniejszym kryterium (przy remisie pierwszy w kolejności p, d, q -
+    jak w pętli `simple_arima_grid_search`), albo None.
+    """
+    fitted = [(values[criterion], order) for order, values in scores.items()
+              if values['params'] is not None and np.isfinite(values[criterion])]
+    return min(fitted)[1] if fitted else None
+
+
+def _map(executor, fn, tasks: list) -> list:
+    if executor is None:
+        return [fn(task) for task in tasks]
+    return list(executor.map(fn, tasks))
+
+
+def fit_arima(series, order):
+    """Dopasowanie ARIMA(order) na oryginalnym szeregu (jak w `simple_arima_grid_search`)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ARIMA(_clean_series(series), order=tuple(order),
+                      enforce_stationarity=False, enforce_invertibility=False)
+        return model.fit(method_kwargs={"warn_convergence": False})
+
+
+class ArimaCache:
+    """Zwycięskie modele (subject × sygnał) na dysku, po jednym pliku JSON na klucz."""
+
+    def __init__(self, root=ARIMA_ROOT):
+        self.root = Path(root)
+
+    def _path(self, subject: str, signal: str, key: str) -> Path:
+        return self.root / subject / f"{signal}-{key}.json"
+
+    def get(self, subject: str, signal: str, key: str):
+        path = self._path(subject, signal, key)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as handle:
+            return json.load(handle)
+
+    def latest(self, subject: str, signal: str, fingerprint: str):
+        """Najnowszy wpis dla danych o odcisku `fingerprint` (niezależnie od siatki)."""
+        subject_dir = self.root / subject
+        if not subject_dir.exists():
+            return None
+        entries = sorted(subject_dir.glob(f"{signal}-*.json"), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+        for path in entries:
+            with open(path, 'r', encoding='utf-8') as handle:
+                entry = json.load(handle)
+            if entry.get('data') == fingerprint:
+                return entry
+        return None
+
+    def put(self, subject: str, signal: str, key: str, entry: dict):
+        """Zapisuje wpis atomowo (plik tymczasowy + os.replace)."""
+        path = self._path(subject, signal, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(entry, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def search_key(fingerprint: str, p_max: int, d_max: int, q_max: int, criterion: str,
+               patience: int = PATIENCE) -> str:
+    """Klucz cache (SHA-1 z odcisku danych, siatki i wczesnego zatrzymania)."""
+    payload = {'data': fingerprint, 'grid': [p_max, d_max, q_max], 'criterion': criterion,
+               'patience': patience, 'model': 'arima'}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def _results_from_entry(series: pd.Series, entry: dict):
+    """Wynik ARIMA z zapisanych parametrów (filtr Kalmana, bez optymalizacji)."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = ARIMA(series, order=tuple(entry['order']),
+                      enforce_stationarity=False, enforce_invertibility=False)
+        return model.filter(np.asarray(entry['params'], dtype=np.float64))
+
+
+def select_arima_models(series_by_key: dict, p_max: int = 3, d_max: int = 2, q_max: int = 3,
+                        criterion: str = CRITERION, patience: int = PATIENCE, n_workers: int = None,
+                        cache_root=ARIMA_ROOT, verbose: bool = True) -> dict:
+    """
+    Najlepszy model ARIMA dla wielu szeregów (subject, sygnał) z cache.
+
+    Szeregi bez aktualnego wpisu w cache przeszukiwane są razem (`search_orders`),
+    a zwycięzca (`best_order`, to samo kryterium co w `simple_arima_grid_search`)
+    trafia do cache. Przy `patience >= p_max + q_max` przeszukanie jest pełne.
+
+    Parameters:
+        series_by_key: (subject, sygnał) -> szereg
+        patience: wczesne zatrzymanie (fale p + q bez poprawy kryterium w gałęzi d)
+        n_workers: liczba procesów (None = liczba rdzeni, 1 = bez puli procesów)
+        cache_root: katalog cache (None = bez cache)
+
+    Returns:
+        (subject, sygnał) -> (rząd, wynik ARIMA) albo (None, None)
+    """
+    if not STATSMODELS_AVAILABLE:
+        raise ImportError("Modele ARIMA wymagają statsmodels (pip install statsmodels)")
+    cache = ArimaCache(cache_root) if cache_root is not None else None
+    cleaned, keys, results = {}, {}, {}
+    for (subject, signal), series in series_by_key.items():
+        s = _clean_series(series)
+        cleaned[(subject, signal)] = s
+        keys[(subject, signal)] = search_key(_fingerprint(s.to_numpy()), p_max, d_max, q_max, criterion, patience)
+        entry = cache.get(subject, signal, keys[(subject, signal)]) if cache is not None else None
+        if entry is not None:
+            results[(subject, signal)] = (tuple(entry['order']), _results_from_entry(s, entry))
+        elif len(s) < MIN_SAMPLES:
+            results[(subject, signal)] = (None, None)
+
+    pending = {key: s for key, s in cleaned.items() if key not in results}
+    if pending:
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=n_workers) if n_workers > 1 else None
+        try:
+            scores = search_orders(pending, p_max, d_max, q_max, criterion, patience, executor=executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        for (subject, signal), s in pending.items():
+            order = best_order(scores[(subject, signal)], criterion)
+            if order is None:
+                results[(subject, signal)] = (None, None)
+                continue
+            winner = scores[(subject, signal)][order]
+            entry = {
+                'subject': subject,
+                'signal': signal,
+                'data': _fingerprint(s.to_numpy()),
+                'order': list(order),
+                'params': winner['params'],
+                'aic': winner['aic'],
+                'bic': winner['bic'],
+                'scores': [[*o, v['aic'], v['bic']] for o, v in sorted(scores[(subject, signal)].items())],
+            }
+            results[(subject, signal)] = (tuple(order), _results_from_entry(s, entry))
+            if cache is not None:
+                cache.put(subject, signal, keys[(subject, signal)], entry)
+    if verbose:
+        print(f"✅ ARIMA: {len(series_by_key)} szeregów, przeszukano {len(pending)}, "
+              f"z cache {len(series_by_key) - len(pending)}")
+    return {key: results[key] for key in series_by_key}
+
+
+def best_arima(subject: str, signal: str, series, p_max: int = 3, d_max: int = 2, q_max: int = 3,
+               criterion: str = CRITERION, patience: int = PATIENCE, n_workers: int = None,
+               cache_root=ARIMA_ROOT):
+    """
+    Najlepszy model ARIMA jednego szeregu - zamiennik `simple_arima_grid_search`.
+
+    Returns:
+        (best_order, best_model) albo (None, None)
+    """
+    result = select_arima_models({(subject, signal): series}, p_max, d_max, q_max, criterion, patience,
+                                 n_workers=n_workers, cache_root=cache_root, verbose=False)
+    return result[(subject, signal)]
+
+
+def load_arima_results(subject: str, signal: str, series, cache_root=ARIMA_ROOT):
+    """
+    Zapisany zwycięski model dla (subject, sygnał) i tych samych danych, albo None.
+
+    Wynik odtwarzany jest z parametrów z cache (bez ponownego dopasowania).
+    """
+    s = _clean_series(series)
+    entry = ArimaCache(cache_root).latest(subject, signal, _fingerprint(s.to_numpy()))
+    if entry is None:
+        return None
+    return _results_from_entry(s, entry)
+
+
+def compute_ar_stiffness(signal, ar_order=3, subject: str = None, signal_name: str = None,
+                         cache_root=ARIMA_ROOT):
+    """
+    Oblicza "sztywność" systemu z współczynników AR modelu.
+    Im większe współczynniki, tym system bardziej "trzyma się" własnej trajektorii.
+
+    Z `subject` i `signal_name` współczynniki zapisywane są w cache (ten sam
+    sygnał i rząd nie jest dopasowywany ponownie).
+
+    Returns:
+        (stiffness, ar_coefs) albo (np.nan, None)
+    """
+    x = np.array(signal, dtype=np.float64)
+    if len(x) < ar_order + 10:
+        return np.nan, None
+
+    cache = ArimaCache(cache_root) if subject is not None and signal_name is not None else None
+    key = hashlib.sha1(f"AR{ar_order}:{_fingerprint(x)}".encode('utf-8')).hexdigest()[:16]
+    if cache is not None:
+        entry = cache.get(subject, f"{signal_name}-ar", key)
+        if entry is not None:
+            ar_coefs = np.asarray(entry['ar_coefs'], dtype=np.float64)
+            return float(np.sum(np.abs(ar_coefs))), ar_coefs
+
+    try:
+        res = AutoReg(x, lags=ar_order).fit()
+    except Exception:
+        return np.nan, None
+    ar_coefs = res.params[1:]  # Pomijamy intercept
+    # "Sztywność" = suma bezwzględnych wartości współczynników
+    stiffness = np.sum(np.abs(ar_coefs))
+    if cache is not None:
+        cache.put(subject, f"{signal_name}-ar", key, {'ar_order': ar_order, 'ar_coefs': ar_coefs.tolist()})
+    return stiffness, ar_coefs
@@ -0,0 +1,267 @@
+"""
+Kolumnowy cache danych WESAD na dysku (jeden plik .npy na kanał).
+
+Surowy `S{n}.pkl` jest rozpakowywany tylko raz - przy pierwszym użyciu
+(albo przez jawne wywołanie konwertera). Każdy kanał zapisywany jest jako
+osobny plik `.npy`, a częstotliwości próbkowania, kształty i podpis pliku
+źródłowego (mtime, rozmiar, opcjonalnie SHA-1) trafiają do `meta.json`.
+Wczytanie jednego kanału to `np.load(..., mmap_mode='r')`, więc pozostałe
+kanały 700 Hz nie są ładowane do pamięci.
+
+Struktura cache:
+    {cache_root}/{subject}/meta.json
+    {cache_root}/{subject}/chest/ECG.npy, EMG.npy, EDA.npy, Resp.npy, Temp.npy, ACC.npy
+    {cache_root}/{subject}/wrist/BVP.npy, EDA.npy, TEMP.npy, ACC.npy
+    {cache_root}/{subject}/label.npy
+
+Jednorazowa konwersja z terminala:
+    python wesad_cache.py --raw-root "/sciezka/do/WESAD" S2 S3 S4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+RAW_ROOT = Path("/Users/turfian/Downloads/archive (4)/WESAD")
+CACHE_ROOT = Path("wesad_cache")
+
+# Wersja formatu cache - zmiana wymusza ponowną konwersję
+CACHE_FORMAT_VERSION = 1
+
+# Częstotliwości próbkowania urządzeń WESAD
+CHEST_FS = {"ACC": 700.0, "ECG": 700.0, "EMG": 700.0, "EDA": 700.0, "Temp": 700.0, "Resp": 700.0}
+WRIST_FS = {"ACC": 32.0, "BVP": 64.0, "EDA": 4.0, "TEMP": 4.0}
+LABEL_FS = 700.0
+DEVICE_FS = {"chest": CHEST_FS, "wrist": WRIST_FS}
+
+
+def _source_path(subject: str, raw_root: Path) -> Path:
+    return Path(raw_root) / subject / f"{subject}.pkl"
+
+
+def _subject_dir(subject: str, cache_root: Path) -> Path:
+    return Path(cache_root) / subject
+
+
+def file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Liczy SHA-1 pliku strumieniowo (bez wczytywania całości do RAM)."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_signature(path: Path, with_hash: bool = False) -> dict:
+    """Podpis pliku źródłowego używany do unieważniania cache."""
+    stat = Path(path).stat()
+    signature = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+    if with_hash:
+        signature["sha1"] = file_sha1(path)
+    return signature
+
+
+def read_meta(subject: str, cache_root: Path = CACHE_ROOT) -> dict:
+    """Wczytuje meta.json dla subjecta (lub None, jeśli cache nie istnieje)."""
+    meta_path = _subject_dir(subject, cache_root) / "meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path, "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def is_cache_valid(subject: str, raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT,
+                   check_hash: bool = False) -> bool:
+    """
+    Sprawdza, czy cache subjecta odpowiada aktualnemu plikowi .pkl.
+
+    Porównywany jest mtime i rozmiar pliku źródłowego; przy `check_hash=True`
+    dodatkowo SHA-1 (wolniejsze, ale odporne na np. `touch` lub kopiowanie).
+    Jeśli plik źródłowy nie istnieje, ważny jest każdy kompletny cache.
+    """
+    meta = read_meta(subject, cache_root)
+    if meta is None or meta.get("format_version") != CACHE_FORMAT_VERSION:
+        return False
+
+    source = _source_path(subject, raw_root)
+    if not source.exists():
+        return True
+
+    cached = meta.get("source", {})
+    current = source_signature(source, with_hash=False)
+    if cached.get("size") != current["size"]:
+        return False
+    if cached.get("mtime_ns") == current["mtime_ns"] and not check_hash:
+        return True
+    if "sha1" in cached and cached["sha1"] == file_sha1(source):
+        # Treść bez zmian - odśwież mtime, żeby nie liczyć hasha przy każdym wczytaniu
+        meta["source"]["mtime_ns"] = current["mtime_ns"]
+        with open(_subject_dir(subject, cache_root) / "meta.json", "w", encoding="utf-8") as handle:
+            json.dump(meta, handle, indent=2, ensure_ascii=False)
+        return True
+    return False
+
+
+def _write_array(path: Path, array) -> dict:
+    array = np.ascontiguousarray(np.asarray(array))
+    np.save(path, array, allow_pickle=False)
+    return {"file": path.name, "shape": list(array.shape), "dtype": str(array.dtype)}
+
+
+def convert_subject(subject: str, raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT,
+                    with_hash: bool = False) -> dict:
+    """
+    Jednorazowa konwersja `S{n}.pkl` do kolumnowego cache.
+
+    Zapis odbywa się do katalogu tymczasowego, który jest podmieniany dopiero
+    po zapisaniu wszystkich kanałów - przerwana konwersja nie zostawia
+    niekompletnego cache.
+
+    Returns:
+        dict z metadanymi zapisanymi w meta.json
+    """
+    source = _source_path(subject, raw_root)
+    if not source.exists():
+        raise FileNotFoundError(f"Brak pliku {source}")
+
+    with open(source, "rb") as handle:
+        data = pickle.load(handle, encoding="latin1")
+
+    target_dir = _subject_dir(subject, cache_root)
+    tmp_dir = target_dir.with_name(f".{subject}.tmp-{os.getpid()}")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    meta = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "subject": subject,
+        "source": {"path": str(source), **source_signature(source, with_hash=with_hash)},
+        "channels": {},
+    }
+
+    signals = data.get("signal", {})
+    for device, device_fs in DEVICE_FS.items():
+        device_signals = signals.get(device, {})
+        if not device_signals:
+            continue
+        (tmp_dir / device).mkdir()
+        meta["channels"][device] = {}
+        for channel, array in device_signals.items():
+            info = _write_array(tmp_dir / device / f"{channel}.npy", array)
+            info["fs"] = device_fs.get(channel)
+            meta["channels"][device][channel] = info
+
+    if "label" in data:
+        info = _write_array(tmp_dir / "label.npy", data["label"])
+        info["fs"] = LABEL_FS
+        meta["label"] = info
+
+    with open(tmp_dir / "meta.json", "w", encoding="utf-8") as handle:
+        json.dump(meta, handle, indent=2, ensure_ascii=False)
+
+    if target_dir.exists():
+        shutil.rmtree(target_dir)
+    tmp_dir.rename(target_dir)
+    return meta
+
+
+def ensure_cached(subject: str, raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT,
+                  check_hash: bool = False) -> dict:
+    """Zwraca metadane cache, konwertując subjecta, jeśli cache jest nieaktualny."""
+    if not is_cache_valid(subject, raw_root, cache_root, check_hash=check_hash):
+        return convert_subject(subject, raw_root, cache_root, with_hash=check_hash)
+    return read_meta(subject, cache_root)
+
+
+def channel_path(subject: str, device: str, channel: str, cache_root: Path = CACHE_ROOT) -> Path:
+    """Ścieżka do pliku .npy kanału (device: 'chest' lub 'wrist')."""
+    return _subject_dir(subject, cache_root) / device / f"{channel}.npy"
+
+
+def load_channel(subject: str, device: str, channel: str, raw_root: Path = RAW_ROOT,
+                 cache_root: Path = CACHE_ROOT, mmap: bool = True):
+    """
+    Wczytuje pojedynczy kanał subjecta z cache.
+
+    Args:
+        subject: np. "S2"
+        device: 'chest' (RespiBAN, 700 Hz) lub 'wrist' (Empatica E4)
+        channel: np. 'ECG', 'Resp', 'BVP', 'EDA', 'TEMP', 'ACC'
+        mmap: True - tablica tylko do odczytu mapowana z pliku (zero kopii)
+
+    Returns:
+        (array, fs)
+    """
+    meta = ensure_cached(subject, raw_root, cache_root)
+    try:
+        info = meta["channels"][device][channel]
+    except KeyError:
+        raise KeyError(f"Brak kanału {device}/{channel} dla {subject}") from None
+    array = np.load(channel_path(subject, device, channel, cache_root),
+                    mmap_mode="r" if mmap else None)
+    return array, info["fs"]
+
+
+def load_labels(subject: str, raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT,
+                mmap: bool = True):
+    """Wczytuje wektor etykiet (700 Hz) z cache. Zwraca (labels, fs)."""
+    meta = ensure_cached(subject, raw_root, cache_root)
+    if "label" not in meta:
+        raise KeyError(f"Brak etykiet dla {subject}")
+    labels = np.load(_subject_dir(subject, cache_root) / "label.npy",
+                     mmap_mode="r" if mmap else None)
+    return labels, meta["label"]["fs"]
+
+
+def load_wesad_cached(subject: str, raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT,
+                      mmap: bool = True) -> dict:
+    """
+    Zamiennik `load_wesad_pickle` o tej samej strukturze słownika.
+
+    Zwraca {'subject', 'signal': {'chest': {...}, 'wrist': {...}}, 'label'},
+    ale tablice są mapowane z plików .npy - dopóki kanał nie jest czytany,
+    nie zajmuje pamięci.
+    """
+    meta = ensure_cached(subject, raw_root, cache_root)
+    mode = "r" if mmap else None
+    data = {"subject": subject, "signal": {}}
+    for device, channels in meta["channels"].items():
+        data["signal"][device] = {
+            channel: np.load(channel_path(subject, device, channel, cache_root), mmap_mode=mode)
+            for channel in channels
+        }
+    if "label" in meta:
+        data["label"] = np.load(_subject_dir(subject, cache_root) / "label.npy", mmap_mode=mode)
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Konwersja WESAD S*.pkl do kolumnowego cache .npy")
+    parser.add_argument("subjects", nargs="*", help="np. S2 S3 (domyślnie wszystkie z raw-root)")
+    parser.add_argument("--raw-root", type=Path, default=RAW_ROOT)
+    parser.add_argument("--cache-root", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--hash", action="store_true", help="zapisz i sprawdzaj SHA-1 pliku źródłowego")
+    parser.add_argument("--force", action="store_true", help="konwertuj nawet przy aktualnym cache")
+    args = parser.parse_args(argv)
+
+    subjects = args.subjects or sorted(
+        p.name for p in Path(args.raw_root).glob("S*") if (p / f"{p.name}.pkl").exists()
+    )
+    for subject in subjects:
+        if not args.force and is_cache_valid(subject, args.raw_root, args.cache_root, check_hash=args.hash):
+            print(f"✅ {subject}: cache aktualny")
+            continue
+        meta = convert_subject(subject, args.raw_root, args.cache_root, with_hash=args.hash)
+        n_channels = sum(len(ch) for ch in meta["channels"].values())
+        print(f"✅ {subject}: zapisano {n_channels} kanałów do {_subject_dir(subject, args.cache_root)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Szybkie wczytywanie plików Empatica E4 (ACC, EDA, BVP, TEMP, HR, IBI).
+
+`load_sensor_for_subject` z notebooków czytał każdy plik dwa razy (nagłówek
++ treść), a potem `build_time_index` tworzył `pd.Timestamp` z time zone dla
+każdej próbki. Tutaj plik czytany jest raz (`pyarrow`, jeśli jest
+zainstalowany, inaczej silnik C pandas) do float32, a czas trzymany jest
+niejawnie jako (start_ts, fs, indeks próbki) - znaczniki czasu powstają
+dopiero na żądanie (`E4Signal.timestamps()` / `to_frame()`). Sensory jednej
+osoby wczytywane są równolegle (wątki - parsowanie zwalnia GIL).
+
+Użycie:
+    signals = load_e4_subject(RAW_ROOT / "S2" / "S2_E4_Data")
+    bvp = signals["BVP"]              # E4Signal: values (float32), fs, start_ts
+    bvp.slice_seconds(60, 120)        # próbki z 1. minuty, bez znaczników czasu
+    df = bvp.to_frame()               # jak load_sensor_for_subject (kolumna timestamp)
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.csv as pa_csv
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Schematy sensorów (jak w notebookach)
+SENSOR_SCHEMAS = {
+    "ACC": ["acc_x", "acc_y", "acc_z"],
+    "EDA": ["eda"],
+    "BVP": ["bvp"],
+    "TEMP": ["temp"],
+    "HR": ["hr"],
+}
+
+DEFAULT_DTYPE = np.float32
+
+
+def build_time_index(length: int, start_ts: float, fs: float, offset: int = 0) -> pd.DatetimeIndex:
+    """Znaczniki czasu (UTC) próbek offset..offset+length-1 - jak w notebookach."""
+    start = pd.to_datetime(start_ts, unit="s", utc=True)
+    offsets = pd.to_timedelta(np.arange(offset, offset + length) / fs, unit="s")
+    return start + offsets
+
+
+class E4Signal:
+    """
+    Sygnał E4 z niejawną osią czasu: próbka i ma czas start_ts + i / fs.
+
+    `values` ma kształt (n,) dla sensorów jednokanałowych i (n, kanały) dla ACC.
+    """
+
+    def __init__(self, name: str, values: np.ndarray, start_ts: float, fs: float, columns=None):
+        self.name = name
+        self.values = values
+        self.start_ts = float(start_ts)
+        self.fs = float(fs)
+        self.columns = list(columns) if columns is not None else SENSOR_SCHEMAS.get(name, [name.lower()])
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"E4Signal({self.name}, n={len(self)}, fs={self.fs:g}, start_ts={self.start_ts:.3f})"
+
+    @property
+    def duration_s(self) -> float:
+        return len(self) / self.fs
+
+    @property
+    def end_ts(self) -> float:
+        return self.start_ts + self.duration_s
+
+    def sample_index(self, ts) -> np.ndarray:
+        """Indeks próbki dla czasu unix `ts` (skalar lub tablica), bez przycinania."""
+        return np.floor((np.asarray(ts, dtype=np.float64) - self.start_ts) * self.fs).astype(np.int64)
+
+    def seconds(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Czas próbek w sekundach od startu sesji (float64)."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return np.arange(start, stop) / self.fs
+
+    def timestamps(self, start: int = 0, stop: int = None) -> pd.DatetimeIndex:
+        """Znaczniki czasu (UTC) próbek start..stop - tworzone dopiero tutaj."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        return build_time_index(max(stop - start, 0), self.start_ts, self.fs, offset=start)
+
+    def slice_seconds(self, start_s: float, end_s: float) -> np.ndarray:
+        """Próbki z przedziału [start_s, end_s) sekund od startu sesji (widok, bez kopii)."""
+        start = max(int(np.ceil(start_s * self.fs)), 0)
+        stop = max(int(np.ceil(end_s * self.fs)), start)
+        return self.values[start:stop]
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame jak `load_sensor_for_subject`: kolumna timestamp + kanały, attrs start_ts/fs."""
+        values = self.values.reshape(len(self), -1)
+        data = pd.DataFrame(values, columns=self.columns)
+        data.insert(0, "timestamp", self.timestamps())
+        data.attrs.update({"start_ts": self.start_ts, "fs": self.fs})
+        return data
+
+
+class E4IBI:
+    """Interwały IBI: czas (s od start_ts) i długość interwału (s)."""
+
+    def __init__(self, start_ts: float, seconds: np.ndarray, ibi: np.ndarray):
+        self.name = "IBI"
+        self.start_ts = float(start_ts)
+        self.seconds = seconds
+        self.ibi = ibi
+
+    def __len__(self):
+        return len(self.ibi)
+
+    def timestamps(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(pd.to_datetime(self.start_ts + self.seconds, unit="s", utc=True))
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame jak `load_ibi_for_subject`: timestamp, seconds, ibi."""
+        data = pd.DataFrame({"seconds": self.seconds, "ibi": self.ibi})
+        data.insert(0, "timestamp", self.timestamps())
+        return data
+
+
+def _split_header(raw: bytes, n_lines: int):
+    """Zwraca (pierwsze `n_lines` linii jako tekst, reszta pliku jako bajty)."""
+    pos = 0
+    lines = []
+    for _ in range(n_lines):
+        end = raw.find(b"\n", pos)
+        if end < 0:
+            end = len(raw)
+        lines.append(raw[pos:end].decode("utf-8").strip())
+        pos = end + 1
+    return lines, raw[pos:]
+
+
+def _parse_body(body: bytes, n_columns: int, dtype) -> np.ndarray:
+    """Parsuje liczby CSV (bez nagłówka) do tablicy (n, n_columns)."""
+    if not body.strip():
+        return np.empty((0, n_columns), dtype=dtype)
+    if PYARROW_AVAILABLE:
+        table = pa_csv.read_csv(
+            io.BytesIO(body),
+            read_options=pa_csv.ReadOptions(autogenerate_column_names=True),
+        )
+        columns = [table.column(i).to_numpy().astype(dtype, copy=False) for i in range(table.num_columns)]
+        return np.column_stack(columns) if len(columns) > 1 else columns[0].reshape(-1, 1)
+    frame = pd.read_csv(io.BytesIO(body), header=None, dtype=dtype, engine="c")
+    return frame.to_numpy()
+
+
+def read_e4_csv(path, columns=None, dtype=DEFAULT_DTYPE) -> E4Signal:
+    """
+    Wczytuje plik sensora E4 w jednym przebiegu.
+
+    Pierwszy wiersz to czas startu (unix), drugi częstotliwość próbkowania,
+    dalej próbki (jedna kolumna na kanał).
+    """
+    path = Path(path)
+    name = path.stem
+    columns = columns or SENSOR_SCHEMAS.get(name, [name.lower()])
+    (start_line, fs_line), body = _split_header(path.read_bytes(), 2)
+    start_ts = float(start_line.split(",")[0])
+    fs = float(fs_line.split(",")[0])
+    values = _parse_body(body, len(columns), dtype)
+    if values.shape[1] == 1:
+        values = values[:, 0]
+    return E4Signal(name, values, start_ts, fs, columns)
+
+
+def read_ibi_csv(path) -> E4IBI:
+    """Wczytuje IBI.csv (pierwszy wiersz: czas startu, dalej `sekundy, ibi`)."""
+    (first_line,), body = _split_header(Path(path).read_bytes(), 1)
+    start_ts = float(first_line.split(",")[0])
+    values = _parse_body(body, 2, np.float64)
+    return E4IBI(start_ts, values[:, 0], values[:, 1])
+
+
+def load_e4_subject(subject_path, sensors=tuple(SENSOR_SCHEMAS), include_ibi=True, dtype=DEFAULT_DTYPE,
+                    max_workers=None) -> dict:
+    """
+    Wczytuje sensory jednej osoby równolegle.
+
+    Args:
+        subject_path: katalog `{subject}_E4_Data`
+        sensors: nazwy sensorów (pliki `{nazwa}.csv`)
+        include_ibi: czy wczytać także IBI.csv (pomijane, gdy pliku brak)
+        max_workers: liczba wątków (domyślnie jeden na plik)
+
+    Returns:
+        dict nazwa -> E4Signal (oraz 'IBI' -> E4IBI)
+    """
+    subject_path = Path(subject_path)
+    if not subject_path.exists():
+        raise FileNotFoundError(f"Brak katalogu z danymi: {subject_path}")
+    ibi_path = subject_path / "IBI.csv"
+    load_ibi = include_ibi and ibi_path.exists() and ibi_path.stat().st_size > 0
+    n_files = len(sensors) + int(load_ibi)
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(n_files, 1)) as executor:
+        futures = {name: executor.submit(read_e4_csv, subject_path / f"{name}.csv", None, dtype)
+                   for name in sensors}
+        if load_ibi:
+            futures["IBI"] = executor.submit(read_ibi_csv, ibi_path)
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,586 @@
+"""
+Silnik EDA: rozkład tonic/phasic i detekcja SCR raz na sesję, cechy SCR dla wszystkich okien naraz.
+
+`detect_scr_responses` (nurse_stress_ml_analysis.ipynb) oraz
+`detect_eda_peaks` / `extract_eda_scr_features` dla każdego okna osobno
+interpolowały NaN, liczyły próg z odchylenia standardowego i uruchamiały
+`find_peaks`, a początek i powrót każdej reakcji szukały pętlą po próbkach.
+Tutaj:
+
+- tonic to średnia krocząca z sum skumulowanych (`moving_average`, O(n)
+  niezależnie od okna 10 s), phasic = EDA - tonic - liczone raz na sesję,
+- SCR wykrywane są jednym `find_peaks` na całym strumieniu; onset, powrót
+  i połowiczny powrót wszystkich pików naraz na macierzy (piki × horyzont),
+- reakcje przypisywane są do okien po pozycji piku (`np.searchsorted`),
+  a liczba/amplituda/latencja/czasy okna to różnice sum skumulowanych.
+
+Próg `min_amplitude` liczony jest z całej sesji, a nie z każdego okna
+osobno, więc okna jednej osoby oceniane są tym samym kryterium.
+
+Metryki reaktywności z analiza_pobudzenia_hamowania.ipynb
+(`compute_time_to_peak`, `compute_recovery_speed`, długość pobudzenia,
+`compute_eda_reactivity_recovery`) szukały progów pętlą po próbkach dla
+każdego piku. Wersje `*_batch` budują widok (piki × horyzont) przez
+`sliding_window_view` i biorą pierwsze przekroczenie progu `argmax` na
+masce - wyniki jak w pętlach, bez pętli w Pythonie.
+
+Użycie:
+    events = detect_scr(phasic, fs=4.0)                       # wszystkie reakcje sesji
+    scr_window_features(events, start_idx, end_idx)           # DataFrame: jedno okno = jeden wiersz
+    eda_window_features(eda, 4.0, start_idx, end_idx)         # tonic/phasic + SCR jednym wywołaniem
+    eda_windows_by_subject({"S2": (eda, 4.0), ...}, window_s=60, step_s=30)
+    reactivity_recovery_batch(eda, peaks, 4.0)                # baseline, narastanie, recovery pików
+    recovery_speed_batch(eda, peak_idx, baseline, 4.0)        # (recovery_time, recovery_slope) pików
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks
+
+from wesad_features import extract_eda_tonic_phasic
+
+# Parametry detekcji SCR (jak w detect_scr_responses)
+SCR_MIN_RISE_TIME_S = 0.5  # minimalny odstęp między pikami
+SCR_ONSET_WINDOW_S = 2.0  # szukanie początku max 2 s wstecz
+SCR_RECOVERY_WINDOW_S = 10.0  # szukanie powrotu max 10 s dalej
+SCR_PROMINENCE_SD = 0.1  # próg = 10% odchylenia standardowego
+SCR_ONSET_FRACTION = 0.5  # onset: spadek o 50% progu poniżej piku
+SCR_RECOVERY_FRACTION = 0.7  # powrót: spadek o 70% progu poniżej piku
+
+
+class SCREvents:
+    """
+    Reakcje skórne jednej sesji (indeksy próbek przy częstotliwości `fs`).
+
+    `recoveries` i `half_recoveries` równe pikowi oznaczają brak powrotu
+    w horyzoncie - odpowiadające im czasy są NaN.
+    """
+
+    def __init__(self, onsets, peaks, recoveries, half_recoveries, amplitudes, fs: float,
+                 min_amplitude: float = np.nan):
+        self.onsets = np.asarray(onsets, dtype=np.int64)
+        self.peaks = np.asarray(peaks, dtype=np.int64)
+        self.recoveries = np.asarray(recoveries, dtype=np.int64)
+        self.half_recoveries = np.asarray(half_recoveries, dtype=np.int64)
+        self.amplitudes = np.asarray(amplitudes, dtype=np.float64)
+        self.fs = float(fs)
+        self.min_amplitude = float(min_amplitude)
+
+    @classmethod
+    def empty(cls, fs: float) -> 'SCREvents':
+        none = np.empty(0, dtype=np.int64)
+        return cls(none, none, none, none, np.empty(0), fs)
+
+    def __len__(self):
+        return len(self.peaks)
+
+    def __repr__(self):
+        return f"SCREvents(reakcje={len(self)}, fs={self.fs:g}, próg={self.min_amplitude:.4g})"
+
+    @property
+    def rise_time(self) -> np.ndarray:
+        return (self.peaks - self.onsets) / self.fs
+
+    @property
+    def recovery_time(self) -> np.ndarray:
+        return _time_after_peak(self.recoveries, self.peaks, self.fs)
+
+    @property
+    def half_recovery_time(self) -> np.ndarray:
+        return _time_after_peak(self.half_recoveries, self.peaks, self.fs)
+
+    def to_responses(self) -> list:
+        """Lista słowników w formacie `detect_scr_responses` z notebooka Nurse."""
+        recovery_time = self.recovery_time
+        return [
+            {'onset': int(o), 'peak': int(p), 'recovery': int(r), 'amplitude': float(a),
+             'rise_time': float(rt), 'recovery_time': float(rec)}
+            for o, p, r, a, rt, rec in zip(self.onsets, self.peaks, self.recoveries, self.amplitudes,
+                                           self.rise_time, recovery_time)
+        ]
+
+
+def _time_after_peak(index: np.ndarray, peaks: np.ndarray, fs: float) -> np.ndarray:
+    return np.where(index > peaks, (index - peaks) / fs, np.nan)
+
+
+def _interpolate_nonfinite(values: np.ndarray):
+    """Interpolacja liniowa NaN/inf (jak w detect_scr_responses); None, gdy brak wartości skończonych."""
+    finite = np.isfinite(values)
+    if finite.all():
+        return values
+    if not finite.any():
+        return None
+    positions = np.arange(len(values))
+    return np.interp(positions, positions[finite], values[finite])
+
+
+def _first_crossing(values: np.ndarray, peaks: np.ndarray, thresholds: np.ndarray, offsets: np.ndarray,
+                    lo: int, hi: np.ndarray) -> np.ndarray:
+    """
+    Pierwsza próbka `peak + offset` (w kolejności `offsets`) z wartością poniżej progu piku.
+
+    Próbki spoza [lo, hi) są pomijane; gdy żadna nie spełnia warunku, zwracany jest indeks piku.
+    """
+    if not len(peaks) or not len(offsets):
+        return peaks.copy()
+    candidates = peaks[:, None] + offsets[None, :]
+    valid = (candidates >= lo) & (candidates < hi[:, None])
+    below = valid & (values[np.clip(candidates, 0, len(values) - 1)] < thresholds[:, None])
+    found = below.any(axis=1)
+    first = np.argmax(below, axis=1)
+    return np.where(found, candidates[np.arange(len(peaks)), first], peaks)
+
+
+def detect_scr(signal, fs: float = 1.0, min_amplitude: float = None,
+               min_rise_time: float = SCR_MIN_RISE_TIME_S) -> SCREvents:
+    """
+    Wykrywa reakcje skórne (SCR) na całym sygnale jednym wywołaniem `find_peaks`.
+
+    Piki, onset (2 s wstecz) i powrót (10 s dalej) jak w `detect_scr_responses`;
+    połowiczny powrót to pierwsza próbka po piku, w której sygnał spadł
+    o połowę amplitudy reakcji (w tym samym horyzoncie 10 s).
+
+    Parameters:
+        signal: sygnał EDA (zwykle komponent phasic całej sesji)
+        fs: częstotliwość próbkowania
+        min_amplitude: minimalna prominencja piku (domyślnie 10% SD sygnału)
+        min_rise_time: minimalny odstęp między pikami w sekundach
+
+    Returns:
+        SCREvents
+    """
+    values = np.asarray(signal, dtype=np.float64)
+    if len(values) == 0:
+        return SCREvents.empty(fs)
+    values = _interpolate_nonfinite(values)
+    if values is None or len(values) < 3:
+        return SCREvents.empty(fs)
+
+    if min_amplitude is None:
+        std_val = np.std(values)
+        if std_val > 0:
+            min_amplitude = std_val * SCR_PROMINENCE_SD
+        else:
+            # Fallback: 1% zakresu sygnału
+            min_amplitude = max(0.01, (np.max(values) - np.min(values)) * 0.01)
+    else:
+        min_amplitude = max(0.01, float(min_amplitude))
+
+    distance = max(1, min(int(fs * min_rise_time), len(values) - 1))
+    peaks, _ = find_peaks(values, distance=distance, prominence=min_amplitude)
+    peaks = peaks.astype(np.int64)
+    if not len(peaks):
+        return SCREvents.empty(fs)
+
+    n = len(values)
+    peak_values = values[peaks]
+
+    # Onset: od peak-1 w dół, najdalej do max(0, peak - 2 s) (wyłącznie)
+    onset_horizon = int(fs * SCR_ONSET_WINDOW_S)
+    onsets = _first_crossing(values, peaks, peak_values - min_amplitude * SCR_ONSET_FRACTION,
+                             -np.arange(1, onset_horizon), 1, peaks)
+
+    # Powrót: od peak+1 w górę, przed min(n-1, peak + 10 s)
+    recovery_horizon = int(fs * SCR_RECOVERY_WINDOW_S)
+    offsets = np.arange(1, recovery_horizon)
+    search_end = np.minimum(n - 1, peaks + recovery_horizon)
+    recoveries = _first_crossing(values, peaks, peak_values - min_amplitude * SCR_RECOVERY_FRACTION,
+                                 offsets, 0, search_end)
+
+    amplitudes = peak_values - values[onsets]
+    # <= zamiast <: _first_crossing szuka wartości ściśle poniżej progu
+    half_thresholds = np.where(amplitudes > 0, np.nextafter(peak_values - amplitudes / 2.0, np.inf), -np.inf)
+    half_recoveries = _first_crossing(values, peaks, half_thresholds, offsets, 0, search_end)
+
+    return SCREvents(onsets, peaks, recoveries, half_recoveries, amplitudes, fs, min_amplitude)
+
+
+def _window_sums(values: np.ndarray, lo: np.ndarray, hi: np.ndarray):
+    """(suma, liczba wartości skończonych) elementów [lo, hi) dla każdego okna."""
+    finite = np.isfinite(values)
+    cumulative = np.concatenate([[0.0], np.cumsum(np.where(finite, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(finite)])
+    return cumulative[hi] - cumulative[lo], counts[hi] - counts[lo]
+
+
+def _window_means(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Średnia wartości skończonych [lo, hi) dla każdego okna (NaN dla pustych)."""
+    sums, counts = _window_sums(values, lo, hi)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def scr_window_features(events: SCREvents, start_idx, end_idx) -> pd.DataFrame:
+    """
+    Cechy SCR dla wszystkich okien [start, end) naraz.
+
+    Reakcja należy do okna, w którym leży jej pik. Kolumny jak
+    w `extract_eda_scr_features` (amplituda = pik - onset, latencja od
+    początku okna) plus średni czas powrotu z `detect_scr_responses`.
+
+    Returns:
+        DataFrame z jednym wierszem na okno
+    """
+    start_idx = np.asarray(start_idx, dtype=np.int64)
+    end_idx = np.asarray(end_idx, dtype=np.int64)
+    lo = np.searchsorted(events.peaks, start_idx, side='left')
+    hi = np.maximum(np.searchsorted(events.peaks, end_idx, side='left'), lo)
+    counts = hi - lo
+    has_scr = counts > 0
+
+    # Maksimum amplitudy: reduceat po parach [lo, hi) z wartownikiem na końcu
+    amplitudes = np.append(events.amplitudes, -np.inf)
+    if len(lo):
+        bounds = np.column_stack([lo, hi]).ravel()
+        max_amplitude = np.maximum.reduceat(amplitudes, bounds)[::2]
+    else:
+        max_amplitude = np.empty(0)
+    first_peak = events.peaks[np.minimum(lo, max(len(events) - 1, 0))] if len(events) else start_idx
+
+    return pd.DataFrame({
+        'scr_count': counts,
+        'scr_mean_amplitude': _window_means(events.amplitudes, lo, hi),
+        'scr_max_amplitude': np.where(has_scr, max_amplitude, np.nan),
+        'scr_latency_first': np.where(has_scr, (first_peak - start_idx) / events.fs, np.nan),
+        'scr_rise_time_mean': _window_means(events.rise_time, lo, hi),
+        'scr_recovery_time_mean': _window_means(events.recovery_time, lo, hi),
+        'scr_half_recovery_time': _window_means(events.half_recovery_time, lo, hi),
+    })
+
+
+def eda_window_features(eda, fs: float, start_idx, end_idx, min_amplitude: float = None) -> pd.DataFrame:
+    """
+    Tonic/phasic i SCR jednej sesji, zagregowane do okien [start, end).
+
+    Rozkład (`extract_eda_tonic_phasic`) i detekcja SCR na komponencie phasic
+    wykonywane są raz na całym sygnale; poziom tonic okna to średnia z sum
+    skumulowanych.
+
+    Returns:
+        DataFrame: `eda_tonic_mean`, `eda_phasic_std` i kolumny `scr_window_features`
+    """
+    eda = np.asarray(eda, dtype=np.float64)
+    start_idx = np.clip(np.asarray(start_idx, dtype=np.int64), 0, len(eda))
+    end_idx = np.clip(np.asarray(end_idx, dtype=np.int64), 0, len(eda))
+    filled = _interpolate_nonfinite(eda)
+    if filled is None:
+        filled = np.zeros_like(eda)
+    tonic, phasic = extract_eda_tonic_phasic(filled, fs)
+    events = detect_scr(phasic, fs, min_amplitude=min_amplitude)
+
+    sums, counts = _window_sums(phasic, start_idx, end_idx)
+    squares, _ = _window_sums(phasic ** 2, start_idx, end_idx)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+        variance = np.maximum(squares - counts * mean ** 2, 0.0) / (counts - 1)
+    features = pd.DataFrame({
+        'eda_tonic_mean': _window_means(tonic, start_idx, end_idx),
+        'eda_phasic_std': np.where(counts > 1, np.sqrt(variance), np.nan),
+    })
+    # Okna z samymi NaN w surowym EDA nie mają cech
+    _, raw_counts = _window_sums(eda, start_idx, end_idx)
+    features = pd.concat([features, scr_window_features(events, start_idx, end_idx)], axis=1)
+    features.loc[raw_counts == 0, :] = np.nan
+    return features
+
+
+def window_indices(n_samples: int, fs: float, window_s: float, step_s: float):
+    """Granice okien [start, end) w próbkach: okno i zaczyna się w i * step, tylko pełne okna."""
+    window = int(round(window_s * fs))
+    step = max(int(round(step_s * fs)), 1)
+    if window <= 0 or n_samples < window:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    start_idx = np.arange(0, n_samples - window + 1, step, dtype=np.int64)
+    return start_idx, start_idx + window
+
+
+def eda_windows_by_subject(signals: dict, window_s: float, step_s: float,
+                           min_amplitude: float = None) -> pd.DataFrame:
+    """
+    Cechy EDA/SCR okien dla wielu osób: subject -> (eda, fs).
+
+    Każda sesja rozkładana i przeszukiwana jest raz; okna z `window_indices`.
+
+    Returns:
+        DataFrame z kolumnami `subject`, `window_start_s`, `window_end_s` i cechami okien
+    """
+    frames = []
+    for subject, (eda, fs) in signals.items():
+        start_idx, end_idx = window_indices(len(eda), fs, window_s, step_s)
+        if not len(start_idx):
+            continue
+        features = eda_window_features(eda, fs, start_idx, end_idx, min_amplitude=min_amplitude)
+        features.insert(0, 'window_end_s', end_idx / fs)
+        features.insert(0, 'window_start_s', start_idx / fs)
+        features.insert(0, 'subject', subject)
+        frames.append(features)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+# ========== REAKTYWNOŚĆ I RECOVERY (analiza_pobudzenia_hamowania.ipynb) ==========
+
+REACTIVITY_BASELINE_S = 5.0  # baseline piku: minimum z 5 s przed pikiem
+REACTIVITY_RECOVERY_S = 60.0  # powrót do 50% amplitudy: max 60 s po piku
+TIME_TO_PEAK_SEARCH_S = 60.0  # szukanie szczytu: 60 s po początku stresora
+TIME_TO_PEAK_BASELINE_S = 10.0  # baseline: średnia z 10 s przed stresorem
+RECOVERY_SEARCH_S = 120.0  # szukanie wygaszenia / powrotu do baseline: max 2 minuty
+AROUSAL_TOLERANCE = 0.1  # powrót do baseline: |x - baseline| <= 10% |baseline|
+
+
+def _forward_view(values: np.ndarray, starts: np.ndarray, horizon: int, fill: float) -> np.ndarray:
+    """(piki × horyzont): wiersz k to values[starts[k]:starts[k] + horizon], poza sygnałem `fill`."""
+    if horizon <= 0:
+        return np.empty((len(starts), 0))
+    padded = np.concatenate([values, np.full(horizon, fill)])
+    return sliding_window_view(padded, horizon)[starts]
+
+
+def _backward_view(values: np.ndarray, ends: np.ndarray, horizon: int, fill: float) -> np.ndarray:
+    """(piki × horyzont): wiersz k to values[ends[k] - horizon + 1:ends[k] + 1], przed sygnałem `fill`."""
+    padded = np.concatenate([np.full(horizon - 1, fill), values])
+    return sliding_window_view(padded, horizon)[ends]
+
+
+def _first_true(mask: np.ndarray):
+    """(czy znaleziono, pozycja pierwszego True) dla każdego wiersza maski."""
+    if not mask.shape[1]:
+        return np.zeros(len(mask), dtype=bool), np.zeros(len(mask), dtype=np.int64)
+    return mask.any(axis=1), np.argmax(mask, axis=1)
+
+
+def time_to_peak_batch(signal, stressor_starts, sampling_hz: float = 4.0,
+                       search_s: float = TIME_TO_PEAK_SEARCH_S, baseline_s: float = TIME_TO_PEAK_BASELINE_S):
+    """
+    Czas od początku stresora do szczytu dla wielu początków naraz (jak `compute_time_to_peak`).
+
+    Returns:
+        (time_to_peak [s], peak_idx (-1 = brak), amplituda szczytu względem średniej
+        z `baseline_s` sekund przed stresorem)
+    """
+    x = np.asarray(signal, dtype=np.float64)
+    starts = np.asarray(stressor_starts, dtype=np.int64).reshape(-1)
+    n = len(x)
+    valid = (starts >= 0) & (starts < n)
+    if not n:
+        return np.full(len(starts), np.nan), np.full(len(starts), -1), np.full(len(starts), np.nan)
+    safe = np.where(valid, starts, 0)
+
+    window = int(search_s * sampling_hz)
+    peak_idx = safe + np.argmax(_forward_view(x, safe, max(window, 1), -np.inf), axis=1)
+
+    # Średnia z okna przed stresorem (puste okno -> NaN, jak np.mean)
+    lookback = int(baseline_s * sampling_hz)
+    counts = np.minimum(safe, lookback)
+    if lookback > 0:
+        sums = _backward_view(x, np.maximum(safe - 1, 0), lookback, 0.0).sum(axis=1)
+        sums = np.where(safe > 0, sums, 0.0)
+    else:
+        sums = np.zeros(len(safe))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        baseline = sums / counts
+
+    time_to_peak = np.where(valid, (peak_idx - safe) / sampling_hz, np.nan)
+    amplitude = np.where(valid, x[peak_idx] - baseline, np.nan)
+    return time_to_peak, np.where(valid, peak_idx, -1), amplitude
+
+
+def compute_time_to_peak(signal, stressor_start_idx, sampling_hz=4.0):
+    """
+    Oblicza czas od początku stresora do szczytu sygnału.
+
+    Parameters:
+        signal: sygnał (numpy array)
+        stressor_start_idx: indeks początku stresora
+        sampling_hz: częstotliwość próbkowania
+
+    Returns:
+        time_to_peak: czas w sekundach
+        peak_idx: indeks peaku
+        peak_amplitude: amplituda peaku
+    """
+    time_to_peak, peak_idx, amplitude = time_to_peak_batch(signal, [stressor_start_idx], sampling_hz)
+    if peak_idx[0] < 0:
+        return np.nan, None, np.nan
+    return float(time_to_peak[0]), int(peak_idx[0]), float(amplitude[0])
+
+
+def recovery_speed_batch(signal, peak_idx, baseline, sampling_hz: float = 4.0, recovery_threshold: float = 0.5,
+                         search_s: float = RECOVERY_SEARCH_S):
+    """
+    Wygaszanie pobudzenia dla wielu pików naraz (jak `compute_recovery_speed`).
+
+    Dla każdego piku: pierwsza próbka w [pik, pik + `search_s`) nie wyższa niż
+    baseline + recovery_threshold × (wartość piku - baseline).
+
+    Returns:
+        (recovery_time [s], recovery_slope) - NaN, gdy sygnał nie spadł do progu
+    """
+    x = np.asarray(signal, dtype=np.float64)
+    peaks = np.asarray(peak_idx, dtype=np.int64).reshape(-1)
+    baseline = np.broadcast_to(np.asarray(baseline, dtype=np.float64), peaks.shape)
+    valid = (peaks >= 0) & (peaks < len(x))
+    safe = np.where(valid, peaks, 0)
+    if not len(x):
+        return np.full(len(peaks), np.nan), np.full(len(peaks), np.nan)
+
+    peak_value = x[safe]
+    target = baseline + recovery_threshold * (peak_value - baseline)
+    found, offset = _first_true(_forward_view(x, safe, int(search_s * sampling_hz), np.nan) <= target[:, None])
+    found &= valid
+
+    recovery_time = np.where(found, offset / sampling_hz, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recovery_slope = np.where(found & (offset > 0), (peak_value - x[safe + offset]) / recovery_time, np.nan)
+    return recovery_time, recovery_slope
+
+
+def compute_recovery_speed(signal, peak_idx, baseline, sampling_hz=4.0, recovery_threshold=0.5):
+    """
+    Oblicza szybkość wygaszania pobudzenia (spadek o recovery_threshold od peak do baseline).
+
+    Parameters:
+        signal: sygnał
+        peak_idx: indeks peaku
+        baseline: wartość baseline
+        sampling_hz: częstotliwość próbkowania
+        recovery_threshold: próg recovery (0.5 = 50% spadku)
+
+    Returns:
+        recovery_time: czas recovery w sekundach
+        recovery_slope: slope wygaszania
+    """
+    recovery_time, recovery_slope = recovery_speed_batch(signal, [peak_idx], baseline, sampling_hz,
+                                                         recovery_threshold)
+    return float(recovery_time[0]), float(recovery_slope[0])
+
+
+def arousal_duration_batch(signal, peak_idx, baseline, sampling_hz: float = 4.0,
+                           tolerance: float = AROUSAL_TOLERANCE, search_s: float = RECOVERY_SEARCH_S) -> np.ndarray:
+    """
+    Długość trwania pobudzenia dla wielu pików naraz (KROK 8 w analiza_pobudzenia_hamowania.ipynb).
+
+    Czas od piku do pierwszej próbki w [pik, pik + `search_s`) w granicach
+    `tolerance` × |baseline| od baseline; gdy jej nie ma - do spadku do 50%
+    (baseline + 0.5 × (wartość piku - baseline)).
+
+    Returns:
+        czas w sekundach (NaN, gdy żaden warunek nie jest spełniony)
+    """
+    x = np.asarray(signal, dtype=np.float64)
+    peaks = np.asarray(peak_idx, dtype=np.int64).reshape(-1)
+    baseline = np.broadcast_to(np.asarray(baseline, dtype=np.float64), peaks.shape)
+    valid = (peaks >= 0) & (peaks < len(x))
+    safe = np.where(valid, peaks, 0)
+    if not len(x):
+        return np.full(len(peaks), np.nan)
+
+    view = _forward_view(x, safe, int(search_s * sampling_hz), np.nan)
+    in_baseline, baseline_offset = _first_true(np.abs(view - baseline[:, None]) <= (np.abs(baseline) * tolerance)[:, None])
+    half_value = baseline + 0.5 * (x[safe] - baseline)
+    below_half, half_offset = _first_true(view <= half_value[:, None])
+
+    offset = np.where(in_baseline, baseline_offset, half_offset)
+    return np.where(valid & (in_baseline | below_half), offset / sampling_hz, np.nan)
+
+
+def reactivity_recovery_batch(signal, peaks, sampling_hz: float = 4.0) -> pd.DataFrame:
+    """
+    Baseline, amplituda, czas narastania i recovery wszystkich pików naraz.
+
+    Dla piku p: baseline = min z [p - 5 s, p], narastanie od pierwszej próbki
+    >= baseline + 10% amplitudy, recovery do pierwszej próbki <= baseline + 50%
+    amplitudy w ciągu 60 s (jak pętle w `compute_eda_reactivity_recovery`).
+
+    Returns:
+        DataFrame: peak_index, peak_amp, baseline, rise_time_s, recovery_time_s, recovery_slope
+    """
+    x = np.asarray(signal, dtype=np.float64)
+    peaks = np.asarray(peaks, dtype=np.int64).reshape(-1)
+    columns = ['peak_index', 'peak_amp', 'baseline', 'rise_time_s', 'recovery_time_s', 'recovery_slope']
+    if not len(peaks):
+        return pd.DataFrame(columns=columns)
+
+    lookback = int(REACTIVITY_BASELINE_S * sampling_hz)
+    baseline_idx = np.maximum(peaks - lookback, 0)
+    # Okno [p - lookback, p]; pozycje przed początkiem sygnału: +inf dla minimum, NaN dla progów
+    baseline = _backward_view(x, peaks, lookback + 1, np.inf).min(axis=1)
+    before = _backward_view(x, peaks, lookback + 1, np.nan)
+    peak_amplitude = x[peaks] - baseline
+
+    # Czas narastania: od pierwszej próbki >= 10% amplitudy w [baseline_idx, p]
+    ten_percent_value = baseline + 0.1 * peak_amplitude
+    found, offset = _first_true(before >= ten_percent_value[:, None])
+    asc_idx = np.where(found, peaks - lookback + offset, baseline_idx)
+    rise_time = (peaks - asc_idx) / sampling_hz
+
+    # Recovery: do 50% amplitudy, max 60 s
+    half_value = baseline + 0.5 * peak_amplitude
+    found, offset = _first_true(_forward_view(x, peaks, int(REACTIVITY_RECOVERY_S * sampling_hz), np.nan)
+                                <= half_value[:, None])
+    rec_idx = np.where(found, peaks + offset, peaks)
+    recovery_time = np.where(rec_idx > peaks, (rec_idx - peaks) / sampling_hz, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recovery_slope = np.where(recovery_time > 0, (x[peaks] - x[rec_idx]) / recovery_time, np.nan)
+
+    return pd.DataFrame({
+        'peak_index': peaks,
+        'peak_amp': peak_amplitude,
+        'baseline': baseline,
+        'rise_time_s': rise_time,
+        'recovery_time_s': recovery_time,
+        'recovery_slope': recovery_slope,
+    }, columns=columns)
+
+
+def compute_eda_reactivity_recovery(eda_series, sampling_hz=4.0, height=None, distance_seconds=2.0):
+    """
+    Oblicza metryki reaktywności i recovery dla EDA.
+
+    Returns:
+        peaks_df: DataFrame z informacjami o każdym peaku
+        summary: Słownik z podsumowaniem metryk
+    """
+    x = np.array(eda_series, dtype=np.float64)
+
+    # Automatyczne określenie height jeśli nie podano
+    if height is None:
+        height = np.std(x) * 0.5  # 0.5 odchylenia standardowego
+
+    peaks, _ = find_peaks(x, height=height, distance=int(distance_seconds * sampling_hz))
+    peaks_df = reactivity_recovery_batch(x, peaks, sampling_hz)
+
+    # Podsumowanie
+    if len(peaks_df) > 0:
+        summary = {
+            'n_peaks': len(peaks_df),
+            'median_rise_time_s': peaks_df['rise_time_s'].median(),
+            'mean_rise_time_s': peaks_df['rise_time_s'].mean(),
+            'median_recovery_time_s': peaks_df['recovery_time_s'].median(),
+            'mean_recovery_time_s': peaks_df['recovery_time_s'].mean(),
+            'median_recovery_slope': peaks_df['recovery_slope'].median(),
+            'mean_peak_amplitude': peaks_df['peak_amp'].mean(),
+            'median_peak_amplitude': peaks_df['peak_amp'].median(),
+            # Tonic vs Phasic
+            'tonic_level': np.median(x),  # Mediana całego sygnału
+            'phasic_activity': peaks_df['peak_amp'].sum() / len(x) if len(x) > 0 else 0
+        }
+    else:
+        summary = {
+            'n_peaks': 0,
+            'median_rise_time_s': np.nan,
+            'mean_rise_time_s': np.nan,
+            'median_recovery_time_s': np.nan,
+            'mean_recovery_time_s': np.nan,
+            'median_recovery_slope': np.nan,
+            'mean_peak_amplitude': np.nan,
+            'median_peak_amplitude': np.nan,
+            'tonic_level': np.median(x),
+            'phasic_activity': 0
+        }
+
+    return peaks_df, summary
@@ -0,0 +1,113 @@
+"""
+Przyrostowy magazyn cech WESAD.
+
+Każdy blok to cechy jednego sygnału jednej osoby, zapisane jako JSON pod
+kluczem wyliczonym z (subject, sygnał, konfiguracja okien/filtrów, wersja
+ekstraktora, podpis pliku źródłowego). Zmiana dowolnego z tych elementów
+daje nowy klucz, więc blok staje się nieaktualny i tylko on jest liczony
+ponownie - dodanie S17 albo zmiana `WINDOW_SIZE_S` nie wymaga przebudowy
+całego `wesad_features_full.csv`.
+
+Struktura:
+    {root}/{subject}/{SYGNAŁ}-{klucz}.json
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from wesad_features import EXTRACTOR_VERSIONS, feature_config
+
+FEATURE_STORE_ROOT = Path("wesad_feature_store")
+SIGNALS = ('EDA', 'BVP', 'TEMP')
+
+
+def _source_token(source: dict) -> dict:
+    """Część podpisu źródła istotna dla klucza (SHA-1, jeśli jest, inaczej mtime + rozmiar)."""
+    if not source:
+        return {}
+    if 'sha1' in source:
+        return {'sha1': source['sha1']}
+    return {'mtime_ns': source.get('mtime_ns'), 'size': source.get('size')}
+
+
+def block_key(subject: str, signal: str, source: dict = None, config: dict = None) -> str:
+    """Klucz bloku cech (SHA-1 z subjecta, sygnału, konfiguracji, wersji i źródła)."""
+    payload = {
+        'subject': subject,
+        'signal': signal,
+        'config': feature_config() if config is None else config,
+        'extractor_version': EXTRACTOR_VERSIONS[signal],
+        'source': _source_token(source),
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+class FeatureStore:
+    """Magazyn bloków cech (subject × sygnał) na dysku."""
+
+    def __init__(self, root=FEATURE_STORE_ROOT):
+        self.root = Path(root)
+
+    def _path(self, subject: str, signal: str, key: str) -> Path:
+        return self.root / subject / f"{signal}-{key}.json"
+
+    def has(self, subject: str, signal: str, key: str) -> bool:
+        return self._path(subject, signal, key).exists()
+
+    def get(self, subject: str, signal: str, key: str):
+        """
+        Zwraca (znaleziono, wiersz). Wiersz może być None - oznacza to, że
+        dla tej konfiguracji sygnał nie dał cech (np. brak fazy stresu).
+        """
+        path = self._path(subject, signal, key)
+        if not path.exists():
+            return False, None
+        with open(path, 'r', encoding='utf-8') as handle:
+            return True, json.load(handle)['row']
+
+    def put(self, subject: str, signal: str, key: str, row):
+        """Zapisuje blok atomowo (plik tymczasowy + os.replace)."""
+        path = self._path(subject, signal, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        block = {
+            'subject': subject,
+            'signal': signal,
+            'key': key,
+            'extractor_version': EXTRACTOR_VERSIONS[signal],
+            'config': feature_config(),
+            'row': row,
+        }
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(block, handle, ensure_ascii=False, default=lambda o: o.item())
+        os.replace(tmp_path, path)
+
+    def stale_signals(self, subject: str, source: dict = None, signals=SIGNALS) -> list:
+        """Lista sygnałów, dla których brakuje aktualnego bloku."""
+        return [signal for signal in signals
+                if not self.has(subject, signal, block_key(subject, signal, source))]
+
+    def load_rows(self, subject: str, source: dict = None, signals=SIGNALS) -> list:
+        """Aktualne wiersze cech subjecta (pomija sygnały bez cech)."""
+        rows = []
+        for signal in signals:
+            found, row = self.get(subject, signal, block_key(subject, signal, source))
+            if found and row is not None:
+                rows.append(row)
+        return rows
+
+    def prune(self, subject: str, source: dict = None, signals=SIGNALS) -> int:
+        """Usuwa nieaktualne bloki subjecta. Zwraca liczbę usuniętych plików."""
+        subject_dir = self.root / subject
+        if not subject_dir.exists():
+            return 0
+        current = {f"{signal}-{block_key(subject, signal, source)}.json" for signal in signals}
+        removed = 0
+        for path in subject_dir.glob("*.json"):
+            if path.name not in current:
+                path.unlink()
+                removed += 1
+        return removed
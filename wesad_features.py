@@ -0,0 +1,990 @@
+"""
+Ekstrakcja cech EDA/BVP/TEMP dla WESAD (KROK 3-6 z wesad_full_pro_analysis.ipynb).
+
+Funkcje przeniesione z notebooka bez zmian w zachowaniu, plus:
+- `extract_subject_features` - pełna ekstrakcja dla jednej osoby (pętla z KROK 5),
+- `build_feature_table` - pivot do schematu `wesad_features_full.csv` (KROK 6),
+- `extract_reaction_parameters_batch` - parametry reakcji dla wielu segmentów
+  bodźca naraz (maski progowe zamiast pętli po próbkach),
+- `extract_bvp_hrv_features_batch` / `extract_bvp_hrv_windows` - cechy HRV
+  wielu okien z pików wykrytych raz na sesję (RR przypisywane do okien przez
+  `searchsorted` i sumy prefiksowe, statystyki i LF/HF na macierzach
+  okna × RR); tryb `peak_detection='window'` odtwarza
+  `extract_bvp_hrv_features` okno po oknie.
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks
+
+from wesad_labels import PHASE_LABELS, LabelIndex
+from wesad_preprocessing import (
+    BASELINE_DURATION_S,
+    BVP_BANDPASS_HIGH,
+    BVP_BANDPASS_LOW,
+    EDA_LOWPASS_HZ,
+    bandpass_filter,
+    compute_baseline,
+    correct_baseline,
+    lowpass_filter,
+    smooth_signal,
+)
+
+# Parametry sygnałów
+EDA_SAMPLING_HZ = 4.0
+BVP_SAMPLING_HZ = 64.0
+TEMP_SAMPLING_HZ = 4.0
+ACC_SAMPLING_HZ = 32.0  # Akcelerometr
+LABEL_SAMPLING_HZ = 64.0
+
+# Parametry okien czasowych
+WINDOW_SIZE_S = 10  # Okno czasowe dla ekstrakcji cech (10 sekund)
+WINDOW_OVERLAP = 0.5  # 50% nakładania okien
+
+# Parametry detekcji reakcji
+SIGNIFICANT_THRESHOLD_SD = 2.0  # 2 SD powyżej baseline
+PEAK_THRESHOLD_PERCENT = 0.5  # 50% amplitudy dla duration
+
+# Wersja ekstraktorów - podbić przy każdej zmianie wpływającej na wartości cech
+# (unieważnia bloki w magazynie cech `wesad_feature_store.py`)
+EXTRACTOR_VERSIONS = {'EDA': 2, 'BVP': 2, 'TEMP': 2}
+
+
+def extract_eda_tonic_phasic(eda_signal, sampling_hz):
+    """
+    Rozdziela sygnał EDA na komponent tonic (wolnozmienny) i phasic (szybkozmienny).
+    
+    Returns:
+        tonic: komponent tonic (baseline level)
+        phasic: komponent phasic (reakcje)
+    """
+    eda_array = np.asarray(eda_signal)
+    
+    # Tonic = wygładzony sygnał (moving average z oknem ~10s)
+    window_size = int(10 * sampling_hz)
+    if window_size > len(eda_array):
+        window_size = len(eda_array) // 2
+    if window_size < 3:
+        return eda_array, np.zeros_like(eda_array)
+    
+    tonic = smooth_signal(eda_array, window_size=window_size)
+    phasic = eda_array - tonic
+    
+    return tonic, phasic
+
+def extract_acc_features(acc_signal, sampling_hz, time_window=None):
+    """
+    Ekstrahuje cechy z sygnału akcelerometru (ACC).
+    
+    Parameters:
+        acc_signal: sygnał ACC (może być 3D: x, y, z lub 1D: magnitude)
+        sampling_hz: częstotliwość próbkowania
+        time_window: (start_idx, end_idx) - opcjonalne okno czasowe
+    
+    Returns:
+        dict z cechami ACC
+    """
+    if time_window is not None:
+        start_idx, end_idx = time_window
+        acc_segment = acc_signal[start_idx:end_idx]
+    else:
+        acc_segment = acc_signal
+    
+    acc_array = np.asarray(acc_segment)
+    
+    # Jeśli 3D (x, y, z), oblicz magnitude
+    if acc_array.ndim > 1 and acc_array.shape[1] > 1:
+        magnitude = np.sqrt(np.sum(acc_array ** 2, axis=1))
+    else:
+        magnitude = acc_array.flatten()
+    
+    if len(magnitude) == 0:
+        return {
+            'acc_energy': np.nan,
+            'acc_movement_intensity': np.nan,
+            'acc_mean': np.nan,
+            'acc_std': np.nan,
+            'acc_max': np.nan
+        }
+    
+    # Energy (suma kwadratów)
+    acc_energy = float(np.sum(magnitude ** 2))
+    
+    # Movement intensity (średnia z magnitude)
+    acc_movement_intensity = float(np.mean(magnitude))
+    
+    # Statystyki
+    acc_mean = float(np.mean(magnitude))
+    acc_std = float(np.std(magnitude))
+    acc_max = float(np.max(magnitude))
+    
+    return {
+        'acc_energy': acc_energy,
+        'acc_movement_intensity': acc_movement_intensity,
+        'acc_mean': acc_mean,
+        'acc_std': acc_std,
+        'acc_max': acc_max
+    }
+
+def create_time_windows(signal_length, sampling_hz, window_size_s=10, overlap=0.5):
+    """
+    Tworzy okna czasowe dla ekstrakcji cech.
+    
+    Parameters:
+        signal_length: długość sygnału w próbkach
+        sampling_hz: częstotliwość próbkowania
+        window_size_s: rozmiar okna w sekundach
+        overlap: nakładanie okien (0.0-1.0)
+    
+    Returns:
+        windows: lista tupli (start_idx, end_idx)
+    """
+    window_size_samples = int(window_size_s * sampling_hz)
+    step_size = int(window_size_samples * (1 - overlap))
+    
+    if step_size == 0:
+        step_size = 1
+    
+    windows = []
+    start_idx = 0
+    
+    while start_idx + window_size_samples <= signal_length:
+        end_idx = start_idx + window_size_samples
+        windows.append((start_idx, end_idx))
+        start_idx += step_size
+    
+    # Ostatnie okno (jeśli zostało miejsce)
+    if start_idx < signal_length:
+        windows.append((start_idx, signal_length))
+    
+    return windows
+
+
+def extract_reaction_parameters(signal, baseline_mean, baseline_std, sampling_hz,
+                                stimulus_start_idx=0, stimulus_end_idx=None):
+    """
+    Wyciąga podstawowe parametry reakcji z sygnału po bodźcu.
+    Returns: dict z latency_s, peak_amplitude, duration_s, slope, decay, auc
+    """
+    if stimulus_end_idx is None:
+        stimulus_end_idx = len(signal)
+    start, end, _ = slice(stimulus_start_idx, stimulus_end_idx).indices(len(signal))
+    return extract_reaction_parameters_batch(signal, baseline_std, sampling_hz, [(start, max(start, end))])[0]
+
+
+def _empty_reaction_parameters():
+    return {
+        'latency_s': np.nan, 'peak_amplitude': np.nan, 'peak_index': None,
+        'duration_s': np.nan, 'slope': np.nan, 'decay': np.nan, 'auc': np.nan
+    }
+
+
+def extract_reaction_parameters_batch(signal, baseline_std, sampling_hz, windows):
+    """
+    Parametry reakcji dla wielu segmentów bodźca naraz.
+
+    Segmenty [start, end) wycinane są z `signal` do jednej płaskiej tablicy
+    (offsety jak w CSR), a latencja, pik, czas trwania, slope i decay to
+    pierwsze/ostatnie pozycje masek progowych w segmencie
+    (`np.minimum.reduceat` / `np.maximum.reduceat`) zamiast pętli po
+    próbkach z `.item()`. Wynik dla każdego okna jest identyczny
+    z dotychczasowym `extract_reaction_parameters` - dlatego AUC sumowane
+    jest `np.sum` po wycinku tablicy trapezów (ta sama kolejność sumowania).
+
+    Parameters:
+        signal: sygnał skorygowany względem baseline (dla kohorty: sygnały
+            połączone `np.concatenate`, okna przesunięte o długości poprzednich)
+        baseline_std: SD baseline - jedna wartość albo po jednej na okno
+        sampling_hz: częstotliwość próbkowania - jedna wartość albo po jednej na okno
+        windows: lista (start_idx, end_idx)
+
+    Returns:
+        lista słowników (latency_s, peak_amplitude, peak_index, duration_s, slope, decay, auc)
+    """
+    values_all = np.asarray(signal, dtype=np.float64).ravel()
+    bounds = np.asarray(windows, dtype=np.int64).reshape(-1, 2)
+    n_windows = len(bounds)
+    starts = bounds[:, 0]
+    lengths = np.maximum(bounds[:, 1] - starts, 0)
+    baseline_std = np.broadcast_to(np.asarray(baseline_std, dtype=np.float64), (n_windows,))
+    fs = np.broadcast_to(np.asarray(sampling_hz, dtype=np.float64), (n_windows,))
+
+    results = [_empty_reaction_parameters() for _ in range(n_windows)]
+    rows = np.flatnonzero(lengths > 0)
+    if not len(rows):
+        return results
+
+    # Płaska tablica segmentów: segment k zajmuje [offsets[k], offsets[k] + lengths[k])
+    seg_lengths = lengths[rows]
+    offsets = np.concatenate([[0], np.cumsum(seg_lengths)[:-1]])
+    total = int(seg_lengths.sum())
+    segment = np.repeat(np.arange(len(rows)), seg_lengths)
+    local = np.arange(total) - offsets[segment]
+    values = values_all[starts[rows][segment] + local]
+
+    std_scalar = np.where(~np.isnan(baseline_std[rows]) & (baseline_std[rows] > 0), baseline_std[rows], 0.0)
+
+    def first_where(mask, default):
+        return np.minimum.reduceat(np.where(mask, local, default[segment]), offsets)
+
+    # Latencja: pierwsza próbka >= 2 SD baseline
+    significant = SIGNIFICANT_THRESHOLD_SD * std_scalar
+    no_match = seg_lengths
+    latency_idx = first_where(values >= significant[segment], no_match)
+    has_latency = latency_idx < seg_lengths
+
+    # Pik: np.argmax (pierwsze maksimum, a przy NaN - pierwszy NaN)
+    is_nan = np.isnan(values)
+    first_nan = first_where(is_nan, no_match)
+    seg_max = np.maximum.reduceat(np.where(is_nan, -np.inf, values), offsets)
+    first_max = first_where(values == seg_max[segment], no_match)
+    peak_local = np.where(first_nan < seg_lengths, first_nan, first_max)
+    peak_amplitude = values[offsets + peak_local]
+
+    # Duration: odcinek wokół piku powyżej 50% amplitudy
+    below_peak = values < (PEAK_THRESHOLD_PERCENT * peak_amplitude)[segment]
+    before_peak = local <= peak_local[segment]
+    duration_start = np.maximum.reduceat(np.where(below_peak & before_peak, local, -1), offsets) + 1
+    after_peak = local >= peak_local[segment]
+    duration_end = first_where(below_peak & after_peak, no_match)
+
+    # Decay: pierwszy powrót do |x| <= 10% SD baseline od piku
+    decay_threshold = 0.1 * std_scalar
+    decay_end = first_where((np.abs(values) <= decay_threshold[segment]) & after_peak, no_match)
+    has_decay = (decay_end < seg_lengths) & (decay_end > peak_local)
+
+    # AUC: trapezy z dodatnich wartości, sumowane per segment
+    positive = np.maximum(values, 0)
+    trapezoids = (positive[:-1] + positive[1:]) / 2.0
+
+    for k, row in enumerate(rows):
+        n = int(seg_lengths[k])
+        sampling = fs[row]
+        peak = int(peak_local[k])
+        amplitude = float(peak_amplitude[k])
+        latency = int(latency_idx[k]) if has_latency[k] else None
+        if latency is not None and peak > latency:
+            rise_time = (peak - latency) / sampling
+            slope = float(amplitude / rise_time) if rise_time > 0 else np.nan
+        else:
+            slope = np.nan
+        if has_decay[k]:
+            decay_time = (int(decay_end[k]) - peak) / sampling
+            decay = float(amplitude / decay_time) if decay_time > 0 else np.nan
+        else:
+            decay = np.nan
+        if n > 1:
+            offset = int(offsets[k])
+            auc = float(np.sum(trapezoids[offset:offset + n - 1]) * (1.0 / sampling))
+        else:
+            auc = float(positive[offsets[k]] * (1.0 / sampling))
+
+        results[row] = {
+            'latency_s': float(latency / sampling) if latency is not None else np.nan,
+            'peak_amplitude': amplitude,
+            'peak_index': int(starts[row] + peak),
+            'duration_s': float((int(duration_end[k]) - int(duration_start[k])) / sampling),
+            'slope': slope,
+            'decay': decay,
+            'auc': auc
+        }
+    return results
+
+def detect_eda_peaks(eda_signal, sampling_hz, min_height=None, min_distance=None):
+    """
+    Wykrywa piki EDA (Skin Conductance Responses - SCR).
+    
+    Returns:
+        peaks: indeksy pików
+        properties: właściwości pików (amplitudy, szerokości)
+    """
+    if min_distance is None:
+        min_distance = int(0.5 * sampling_hz)  # Minimum 0.5s między pikami
+    
+    if min_height is None:
+        # Użyj percentyla 75 jako minimalnej wysokości
+        min_height = np.percentile(eda_signal, 75) - np.percentile(eda_signal, 25)
+    
+    peaks, properties = find_peaks(
+        eda_signal,
+        height=min_height,
+        distance=min_distance,
+        prominence=min_height * 0.3
+    )
+    
+    return peaks, properties
+
+def extract_eda_scr_features(eda_signal, time_axis, onset_idx, offset_idx, 
+                              baseline_mean, baseline_std, sampling_hz):
+    """
+    Ekstrahuje cechy SCR z sygnału EDA w oknie reakcji.
+    
+    Returns:
+        dict z cechami SCR
+    """
+    reaction_window = eda_signal[onset_idx:offset_idx]
+    reaction_time = time_axis[onset_idx:offset_idx]
+    
+    if len(reaction_window) == 0:
+        return {
+            'scr_count': 0,
+            'scr_mean_amplitude': np.nan,
+            'scr_max_amplitude': np.nan,
+            'scr_latency_first': np.nan,
+            'scr_rise_time_mean': np.nan,
+            'scr_half_recovery_time': np.nan
+        }
+    
+    # Detekcja pików w oknie reakcji
+    peaks, properties = detect_eda_peaks(reaction_window, sampling_hz)
+    
+    # Liczba SCR
+    scr_count = len(peaks)
+    
+    if scr_count == 0:
+        return {
+            'scr_count': 0,
+            'scr_mean_amplitude': np.nan,
+            'scr_max_amplitude': np.nan,
+            'scr_latency_first': np.nan,
+            'scr_rise_time_mean': np.nan,
+            'scr_half_recovery_time': np.nan
+        }
+    
+    # Amplitudy pików (względem baseline)
+    peak_amplitudes = reaction_window[peaks] - baseline_mean
+    
+    # Latencja pierwszego SCR
+    first_peak_idx = peaks[0]
+    scr_latency_first = float(reaction_time[first_peak_idx] - reaction_time[0])
+    
+    # Średnia amplituda SCR
+    scr_mean_amplitude = float(np.mean(peak_amplitudes))
+    scr_max_amplitude = float(np.max(peak_amplitudes))
+    
+    # Średni czas wzrostu (uproszczony)
+    scr_rise_time_mean = float(np.mean(properties.get('widths', [np.nan]))) / sampling_hz
+    
+    # Czas połowicznego powrotu (uproszczony - dla największego piku)
+    max_peak_idx = peaks[np.argmax(peak_amplitudes)]
+    max_peak_amplitude = peak_amplitudes[np.argmax(peak_amplitudes)]
+    half_amplitude = max_peak_amplitude / 2.0
+    
+    # Znajdź gdzie sygnał spada do połowy amplitudy
+    half_recovery_idx = None
+    for i in range(max_peak_idx, len(reaction_window)):
+        if reaction_window[i] - baseline_mean <= half_amplitude:
+            half_recovery_idx = i
+            break
+    
+    if half_recovery_idx is not None:
+        scr_half_recovery_time = float((reaction_time[half_recovery_idx] - reaction_time[max_peak_idx]))
+    else:
+        scr_half_recovery_time = np.nan
+    
+    return {
+        'scr_count': int(scr_count),
+        'scr_mean_amplitude': scr_mean_amplitude,
+        'scr_max_amplitude': scr_max_amplitude,
+        'scr_latency_first': scr_latency_first,
+        'scr_rise_time_mean': scr_rise_time_mean,
+        'scr_half_recovery_time': scr_half_recovery_time
+    }
+
+def extract_bvp_hrv_features(bvp_signal, sampling_hz, time_window=None):
+    """
+    Ekstrahuje cechy HRV z sygnału BVP poprzez detekcję R-peaks.
+    
+    Parameters:
+        bvp_signal: sygnał BVP
+        sampling_hz: częstotliwość próbkowania
+        time_window: (start_idx, end_idx) - opcjonalne okno czasowe
+    
+    Returns:
+        dict z cechami HRV
+    """
+    if time_window is not None:
+        start_idx, end_idx = time_window
+        bvp_segment = bvp_signal[start_idx:end_idx]
+    else:
+        bvp_segment = bvp_signal
+    
+    if len(bvp_segment) < int(sampling_hz * 10):  # Minimum 10 sekund
+        return {
+            'mean_hr': np.nan,
+            'hr_std': np.nan,
+            'hrv_rmssd': np.nan,
+            'hrv_sdnn': np.nan,
+            'hrv_pnn50': np.nan,
+            'hrv_lf_hf_ratio': np.nan
+        }
+    
+    # Detekcja pików (R-peaks)
+    # Minimalna odległość między pikami (odpowiada ~200 bpm)
+    min_distance = int(sampling_hz * 0.3)
+    
+    peaks, _ = find_peaks(
+        bvp_segment,
+        distance=min_distance,
+        prominence=np.std(bvp_segment) * 0.5
+    )
+    
+    if len(peaks) < 2:
+        return {
+            'mean_hr': np.nan,
+            'hr_std': np.nan,
+            'hrv_rmssd': np.nan,
+            'hrv_sdnn': np.nan,
+            'hrv_pnn50': np.nan,
+            'hrv_lf_hf_ratio': np.nan
+        }
+    
+    # Oblicz interwały RR (w sekundach)
+    peak_times = peaks / sampling_hz
+    rr_intervals = np.diff(peak_times)  # w sekundach
+    
+    # Filtruj nierealistyczne wartości (30-200 bpm)
+    valid_rr = rr_intervals[(rr_intervals >= 0.3) & (rr_intervals <= 2.0)]
+    
+    if len(valid_rr) < 2:
+        return {
+            'mean_hr': np.nan,
+            'hr_std': np.nan,
+            'hrv_rmssd': np.nan,
+            'hrv_sdnn': np.nan,
+            'hrv_pnn50': np.nan,
+            'hrv_lf_hf_ratio': np.nan
+        }
+    
+    # Mean HR
+    mean_hr = float(60.0 / np.mean(valid_rr))
+    hr_std = float(np.std(60.0 / valid_rr))
+    
+    # RMSSD (Root Mean Square of Successive Differences)
+    rr_diff = np.diff(valid_rr)
+    hrv_rmssd = float(np.sqrt(np.mean(rr_diff ** 2)))
+    
+    # SDNN (Standard Deviation of NN intervals)
+    hrv_sdnn = float(np.std(valid_rr))
+    
+    # pNN50 (percentage of NN intervals > 50ms)
+    nn50 = np.sum(np.abs(rr_diff) > 0.05)  # 50ms = 0.05s
+    hrv_pnn50 = float(nn50 / len(rr_diff) * 100.0) if len(rr_diff) > 0 else 0.0
+    
+    # LF/HF ratio (uproszczony - używamy FFT)
+    # Dla dokładniejszego LF/HF potrzebny byłby pełny pipeline PSD
+    # Tutaj uproszczona wersja
+    try:
+        # Oblicz spektrum mocy
+        fft_vals = np.fft.rfft(valid_rr - np.mean(valid_rr))
+        fft_freq = np.fft.rfftfreq(len(valid_rr), d=np.mean(valid_rr))
+        power = np.abs(fft_vals) ** 2
+        
+        # Pasma: LF (0.04-0.15 Hz), HF (0.15-0.4 Hz)
+        lf_mask = (fft_freq >= 0.04) & (fft_freq <= 0.15)
+        hf_mask = (fft_freq >= 0.15) & (fft_freq <= 0.4)
+        
+        lf_power = np.sum(power[lf_mask]) if np.any(lf_mask) else 0.0
+        hf_power = np.sum(power[hf_mask]) if np.any(hf_mask) else 0.0
+        
+        hrv_lf_hf_ratio = float(lf_power / hf_power) if hf_power > 0 else np.nan
+    except Exception:
+        hrv_lf_hf_ratio = np.nan
+    
+    return {
+        'mean_hr': mean_hr,
+        'hr_std': hr_std,
+        'hrv_rmssd': hrv_rmssd,
+        'hrv_sdnn': hrv_sdnn,
+        'hrv_pnn50': hrv_pnn50,
+        'hrv_lf_hf_ratio': hrv_lf_hf_ratio
+    }
+
+HRV_FEATURES = ['mean_hr', 'hr_std', 'hrv_rmssd', 'hrv_sdnn', 'hrv_pnn50', 'hrv_lf_hf_ratio']
+
+
+def detect_bvp_peaks(bvp_signal, sampling_hz):
+    """
+    Detekcja pików BVP raz na całej sesji (te same parametry co w
+    `extract_bvp_hrv_features`, prominence z odchylenia całego sygnału).
+    """
+    bvp_array = np.asarray(bvp_signal, dtype=float)
+    peaks, _ = find_peaks(
+        bvp_array,
+        distance=int(sampling_hz * 0.3),
+        prominence=np.std(bvp_array) * 0.5
+    )
+    return peaks
+
+
+def _window_rr_intervals(bvp_signal, sampling_hz, start_idx, end_idx):
+    """
+    Poprawne interwały RR okna - detekcja pików jak w `extract_bvp_hrv_features`
+    (prominence z odchylenia tego okna), albo None, gdy okno nie daje cech.
+    """
+    bvp_segment = bvp_signal[start_idx:end_idx]
+    if len(bvp_segment) < int(sampling_hz * 10):  # Minimum 10 sekund
+        return None
+    peaks, _ = find_peaks(
+        bvp_segment,
+        distance=int(sampling_hz * 0.3),
+        prominence=np.std(bvp_segment) * 0.5
+    )
+    if len(peaks) < 2:
+        return None
+    rr_intervals = np.diff(peaks / sampling_hz)
+    valid_rr = rr_intervals[(rr_intervals >= 0.3) & (rr_intervals <= 2.0)]
+    return valid_rr if len(valid_rr) >= 2 else None
+
+
+def _session_rr_layout(bvp_signal, sampling_hz, bounds, peaks=None):
+    """
+    Interwały RR okien z pików całej sesji: (wszystkie poprawne RR, początek okna w tej tablicy, liczba RR).
+
+    Piki okna to piki z [start, end) (okno przycięte do końca sygnału jak
+    wycinek), a jego interwały RR to interwały między kolejnymi z nich -
+    w tablicy poprawnych RR leżą obok siebie, więc granice wyznacza
+    `searchsorted` po pikach i suma prefiksowa maski poprawnych RR.
+    """
+    signal_len = len(bvp_signal)
+    if peaks is None:
+        peaks = detect_bvp_peaks(bvp_signal, sampling_hz)
+    peaks = np.asarray(peaks, dtype=np.int64)
+    starts = np.clip(bounds[:, 0], 0, signal_len)
+    ends = np.clip(bounds[:, 1], 0, signal_len)
+    rr = np.diff(peaks / sampling_hz)
+    valid = (rr >= 0.3) & (rr <= 2.0)
+    valid_prefix = np.concatenate(([0], np.cumsum(valid)))
+    first = np.searchsorted(peaks, starts, side='left')
+    last = np.searchsorted(peaks, ends, side='left')
+    n_peaks = np.maximum(last - first, 0)
+    offsets = valid_prefix[np.minimum(first, len(valid))]
+    counts = np.where(n_peaks >= 2, valid_prefix[np.minimum(first + n_peaks - 1, len(valid))] - offsets, 0)
+    counts[(ends - starts) < int(sampling_hz * 10)] = 0  # Minimum 10 sekund
+    return rr[valid], offsets, counts
+
+
+def extract_bvp_hrv_features_batch(bvp_signal, sampling_hz, windows, peak_detection='session', peaks=None):
+    """
+    Cechy HRV dla wielu okien naraz.
+
+    - `peak_detection='session'`: piki wykrywane są raz na całej sesji
+      (`detect_bvp_peaks`), a interwały RR przypisywane do okien przez
+      `searchsorted` i sumy prefiksowe. Prominence liczona jest z
+      odchylenia całego sygnału, nie okna, więc wartości mogą się nieco
+      różnić od `extract_bvp_hrv_features`.
+    - `peak_detection='window'`: piki wykrywane w każdym oknie osobno - wynik
+      taki sam jak `extract_bvp_hrv_features` dla każdego okna (ścieżka
+      referencyjna, np. do sprawdzania równoważności).
+
+    W obu trybach okna przekraczające koniec sygnału przycinane są jak wycinek
+    `bvp_signal[start:end]`, a okna grupowane są po liczbie interwałów RR,
+    więc statystyki i widmo (jedno `rfft` na grupę) liczone są na macierzach
+    (okna × RR).
+
+    Parameters:
+        bvp_signal: przefiltrowany sygnał BVP
+        sampling_hz: częstotliwość próbkowania
+        windows: lista (start_idx, end_idx), np. z `create_time_windows`
+        peak_detection: 'session' albo 'window'
+        peaks: opcjonalnie gotowe piki sesji z `detect_bvp_peaks` (tryb 'session')
+
+    Returns:
+        DataFrame (okna × HRV_FEATURES)
+    """
+    bvp_array = np.asarray(bvp_signal)
+    bounds = np.asarray(windows, dtype=np.int64).reshape(-1, 2)
+    n_windows = len(bounds)
+    result = np.full((n_windows, len(HRV_FEATURES)), np.nan)
+    if n_windows == 0:
+        return pd.DataFrame(result, columns=HRV_FEATURES)
+
+    if peak_detection == 'session':
+        all_rr, offsets_all, counts = _session_rr_layout(bvp_array, sampling_hz, bounds, peaks)
+    elif peak_detection == 'window':
+        rr_parts, counts = [], np.zeros(n_windows, dtype=np.int64)
+        for row, (start_idx, end_idx) in enumerate(bounds):
+            valid_rr = _window_rr_intervals(bvp_array, sampling_hz, start_idx, end_idx)
+            if valid_rr is not None:
+                rr_parts.append(valid_rr)
+                counts[row] = len(valid_rr)
+        all_rr = np.concatenate(rr_parts) if rr_parts else np.empty(0)
+        offsets_all = np.concatenate(([0], np.cumsum(counts)))[:-1]
+    else:
+        raise ValueError(f"Nieznany tryb detekcji pików: {peak_detection!r} (dozwolone: 'session', 'window')")
+
+    for n in np.unique(counts[counts >= 2]):
+        rows = np.flatnonzero(counts == n)
+        offsets = offsets_all[rows]
+        block = sliding_window_view(all_rr, n)[offsets]
+        diffs = np.diff(block, axis=1)
+
+        means = np.mean(block, axis=1)
+        result[rows, 0] = 60.0 / means
+        result[rows, 1] = np.std(60.0 / block, axis=1)
+        result[rows, 2] = np.sqrt(np.mean(diffs ** 2, axis=1))
+        result[rows, 3] = np.std(block, axis=1)
+        result[rows, 4] = np.sum(np.abs(diffs) > 0.05, axis=1) / (n - 1) * 100.0
+
+        # LF/HF - jedno rfft dla całej grupy okien o tej samej liczbie RR
+        power = np.abs(np.fft.rfft(block - means[:, None], axis=1)) ** 2
+        freq = np.arange(n // 2 + 1)[None, :] * (1.0 / (n * means))[:, None]
+        # Pasma LF/HF to ciągłe zakresy indeksów; okna o tych samych zakresach
+        # sumowane są razem (ta sama kolejność sumowania co w wersji per okno)
+        band_edges = np.stack([
+            np.sum(freq < 0.04, axis=1), np.sum(freq <= 0.15, axis=1),
+            np.sum(freq < 0.15, axis=1), np.sum(freq <= 0.4, axis=1),
+        ], axis=1)
+        edges, group = np.unique(band_edges, axis=0, return_inverse=True)
+        for g, (lf_lo, lf_hi, hf_lo, hf_hi) in enumerate(edges):
+            members = np.flatnonzero(group.ravel() == g)
+            lf_power = np.sum(power[members, lf_lo:lf_hi], axis=1)
+            hf_power = np.sum(power[members, hf_lo:hf_hi], axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[rows[members], 5] = np.where(hf_power > 0, lf_power / hf_power, np.nan)
+
+    return pd.DataFrame(result, columns=HRV_FEATURES)
+
+
+def extract_bvp_hrv_windows(bvp_signal, sampling_hz, window_size_s=10, overlap=0.5, peak_detection='session'):
+    """
+    Cechy HRV w oknach z `create_time_windows` (jedno wywołanie batch zamiast pętli po oknach).
+
+    Domyślnie piki wykrywane są raz na sesję; `peak_detection='window'` daje
+    wynik `extract_bvp_hrv_features` dla każdego okna.
+
+    Returns:
+        DataFrame: start_idx, end_idx + HRV_FEATURES
+    """
+    windows = create_time_windows(len(bvp_signal), sampling_hz, window_size_s, overlap)
+    features = extract_bvp_hrv_features_batch(bvp_signal, sampling_hz, windows, peak_detection)
+    bounds = pd.DataFrame(np.asarray(windows, dtype=np.int64).reshape(-1, 2), columns=['start_idx', 'end_idx'])
+    return pd.concat([bounds, features], axis=1)
+
+
+def extract_temp_features(temp_signal, time_axis, onset_idx, offset_idx, 
+                         baseline_mean, sampling_hz):
+    """
+    Ekstrahuje cechy z sygnału temperatury.
+    
+    Returns:
+        dict z cechami TEMP
+    """
+    reaction_window = temp_signal[onset_idx:offset_idx]
+    reaction_time = time_axis[onset_idx:offset_idx]
+    
+    if len(reaction_window) == 0:
+        return {
+            'temp_slope': np.nan,
+            'temp_delta_0_30s': np.nan,
+            'temp_max_change': np.nan,
+            'temp_variance': np.nan,
+            'temp_trend': np.nan
+        }
+    
+    # Slope (trend) - regresja liniowa
+    if len(reaction_window) > 1:
+        time_norm = reaction_time - reaction_time[0]
+        slope, intercept = np.polyfit(time_norm, reaction_window, 1)
+        temp_slope = float(slope)
+    else:
+        temp_slope = np.nan
+    
+    # Delta w pierwszych 30 sekundach
+    window_30s = int(30 * sampling_hz)
+    if len(reaction_window) >= window_30s:
+        temp_delta_0_30s = float(reaction_window[window_30s] - reaction_window[0])
+    else:
+        temp_delta_0_30s = float(reaction_window[-1] - reaction_window[0])
+    
+    # Maksymalna zmiana względem baseline
+    temp_max_change = float(np.max(reaction_window) - baseline_mean)
+    
+    # Wariancja
+    temp_variance = float(np.var(reaction_window))
+    
+    # Trend (rolling mean difference)
+    if len(reaction_window) > 10:
+        window_size = min(10, len(reaction_window) // 3)
+        rolling_mean = pd.Series(reaction_window).rolling(window=window_size, center=True).mean()
+        temp_trend = float(rolling_mean.iloc[-1] - rolling_mean.iloc[0])
+    else:
+        temp_trend = float(reaction_window[-1] - reaction_window[0])
+    
+    return {
+        'temp_slope': temp_slope,
+        'temp_delta_0_30s': temp_delta_0_30s,
+        'temp_max_change': temp_max_change,
+        'temp_variance': temp_variance,
+        'temp_trend': temp_trend
+    }
+
+
+def extract_phase_indices(data):
+    """Wyciąga indeksy faz z danych WESAD"""
+    if 'label' not in data:
+        return None
+    
+    labels = np.array(data['label'])
+    
+    # Mapowanie etykiet WESAD: 0=baseline, 1=stress, 2=amusement
+    baseline_indices = np.where(labels == 0)[0]
+    stress_indices = np.where(labels == 1)[0]
+    amusement_indices = np.where(labels == 2)[0]
+    
+    phase_indices = {
+        'baseline': baseline_indices,
+        'stress': stress_indices,
+        'amusement': amusement_indices
+    }
+    
+    return phase_indices
+
+def scale_phase_indices(phase_indices, label_fs, target_fs, target_signal_len):
+    """Przeskaluj indeksy faz z częstotliwości label do częstotliwości docelowego sygnału"""
+    if phase_indices is None:
+        return None
+    
+    scaled = {}
+    scale_factor = target_fs / label_fs
+    
+    for phase_name, indices in phase_indices.items():
+        if len(indices) > 0:
+            scaled_indices = (indices * scale_factor).astype(int)
+            scaled_indices = scaled_indices[scaled_indices < target_signal_len]
+            scaled[phase_name] = scaled_indices
+        else:
+            scaled[phase_name] = np.array([], dtype=int)
+    
+    return scaled
+
+
+def feature_config():
+    """Parametry wpływające na wartości cech (część klucza w magazynie cech)."""
+    return {
+        'eda_sampling_hz': EDA_SAMPLING_HZ,
+        'bvp_sampling_hz': BVP_SAMPLING_HZ,
+        'temp_sampling_hz': TEMP_SAMPLING_HZ,
+        'label_sampling_hz': LABEL_SAMPLING_HZ,
+        'window_size_s': WINDOW_SIZE_S,
+        'window_overlap': WINDOW_OVERLAP,
+        'baseline_duration_s': BASELINE_DURATION_S,
+        'eda_lowpass_hz': EDA_LOWPASS_HZ,
+        'bvp_bandpass': [BVP_BANDPASS_LOW, BVP_BANDPASS_HIGH],
+        'significant_threshold_sd': SIGNIFICANT_THRESHOLD_SD,
+        'peak_threshold_percent': PEAK_THRESHOLD_PERCENT,
+    }
+
+
+def _stress_bounds(phase_indices, target_fs, signal_len, label_fs=LABEL_SAMPLING_HZ):
+    """
+    Zwraca (start, end) fazy stresu w próbkach sygnału lub None.
+
+    `phase_indices` to wynik `extract_phase_indices` albo `wesad_labels.LabelIndex`
+    (ten sam wynik bez materializowania indeksów faz).
+    """
+    if isinstance(phase_indices, LabelIndex):
+        bounds = phase_indices.phase_bounds(PHASE_LABELS['stress'], target_fs, signal_len, label_fs=label_fs)
+        if bounds is None:
+            return None
+        stress_start_idx, stress_end_idx = bounds
+    else:
+        scaled = scale_phase_indices(phase_indices, label_fs, target_fs, signal_len)
+        if not scaled or len(scaled.get('stress', [])) == 0:
+            return None
+        stress_indices = scaled['stress']
+        stress_start_idx = int(stress_indices[0])
+        stress_end_idx = int(stress_indices[-1]) + 1
+    stress_start_idx = max(0, min(stress_start_idx, signal_len - 1))
+    stress_end_idx = max(stress_start_idx + 1, min(stress_end_idx, signal_len))
+    return stress_start_idx, stress_end_idx
+
+
+def _baseline_stats(signal, sampling_hz):
+    baseline_mean, baseline_std, _ = compute_baseline(signal, BASELINE_DURATION_S, sampling_hz)
+    baseline_mean = float(baseline_mean) if not np.isnan(baseline_mean) else np.nan
+    baseline_std = float(baseline_std) if not np.isnan(baseline_std) else np.nan
+    return baseline_mean, baseline_std
+
+
+def _eda_signal_features(subject, eda_raw, phase_indices):
+    time_eda = np.arange(len(eda_raw)) / EDA_SAMPLING_HZ
+    eda_filtered = lowpass_filter(eda_raw, EDA_LOWPASS_HZ, EDA_SAMPLING_HZ)
+    baseline_mean, baseline_std = _baseline_stats(eda_filtered, EDA_SAMPLING_HZ)
+    eda_corrected = correct_baseline(eda_filtered, baseline_mean, normalize=False)
+
+    bounds = _stress_bounds(phase_indices, EDA_SAMPLING_HZ, len(eda_corrected))
+    if bounds is None:
+        return None
+    stress_start_idx, stress_end_idx = bounds
+    basic_params = extract_reaction_parameters(
+        eda_corrected, baseline_mean, baseline_std, EDA_SAMPLING_HZ,
+        stimulus_start_idx=stress_start_idx,
+        stimulus_end_idx=stress_end_idx
+    )
+    scr_features = extract_eda_scr_features(
+        eda_filtered, time_eda, stress_start_idx, stress_end_idx,
+        baseline_mean, baseline_std, EDA_SAMPLING_HZ
+    )
+    return {
+        'subject': subject,
+        'signal': 'EDA',
+        'condition': 'stress',
+        **basic_params,
+        **scr_features
+    }
+
+
+def _bvp_signal_features(subject, bvp_raw, phase_indices):
+    bvp_filtered = bandpass_filter(
+        bvp_raw, BVP_BANDPASS_LOW, BVP_BANDPASS_HIGH, BVP_SAMPLING_HZ
+    )
+    baseline_mean, baseline_std = _baseline_stats(bvp_filtered, BVP_SAMPLING_HZ)
+    bvp_corrected = correct_baseline(bvp_filtered, baseline_mean, normalize=False)
+
+    bounds = _stress_bounds(phase_indices, BVP_SAMPLING_HZ, len(bvp_corrected))
+    if bounds is None:
+        return None
+    stress_start_idx, stress_end_idx = bounds
+    basic_params = extract_reaction_parameters(
+        bvp_corrected, baseline_mean, baseline_std, BVP_SAMPLING_HZ,
+        stimulus_start_idx=stress_start_idx,
+        stimulus_end_idx=stress_end_idx
+    )
+    hrv_features = extract_bvp_hrv_features_batch(
+        bvp_filtered, BVP_SAMPLING_HZ, [(stress_start_idx, stress_end_idx)], peak_detection='window'
+    ).iloc[0].to_dict()
+    return {
+        'subject': subject,
+        'signal': 'BVP',
+        'condition': 'stress',
+        **basic_params,
+        **hrv_features
+    }
+
+
+def _temp_signal_features(subject, temp_raw, phase_indices):
+    time_temp = np.arange(len(temp_raw)) / TEMP_SAMPLING_HZ
+    temp_smoothed = smooth_signal(temp_raw, window_size=5)
+    baseline_mean, baseline_std = _baseline_stats(temp_smoothed, TEMP_SAMPLING_HZ)
+    temp_corrected = correct_baseline(temp_smoothed, baseline_mean, normalize=False)
+
+    bounds = _stress_bounds(phase_indices, TEMP_SAMPLING_HZ, len(temp_corrected))
+    if bounds is None:
+        return None
+    stress_start_idx, stress_end_idx = bounds
+    basic_params = extract_reaction_parameters(
+        temp_corrected, baseline_mean, baseline_std, TEMP_SAMPLING_HZ,
+        stimulus_start_idx=stress_start_idx,
+        stimulus_end_idx=stress_end_idx
+    )
+    temp_features_adv = extract_temp_features(
+        temp_smoothed, time_temp, stress_start_idx, stress_end_idx,
+        baseline_mean, TEMP_SAMPLING_HZ
+    )
+    return {
+        'subject': subject,
+        'signal': 'TEMP',
+        'condition': 'stress',
+        **basic_params,
+        **temp_features_adv
+    }
+
+
+SIGNAL_EXTRACTORS = {
+    'EDA': _eda_signal_features,
+    'BVP': _bvp_signal_features,
+    'TEMP': _temp_signal_features,
+}
+
+
+def extract_signal_features(subject, signal, raw, phase_indices):
+    """
+    Cechy jednego sygnału ('EDA', 'BVP' lub 'TEMP') w fazie stresu.
+
+    Returns:
+        słownik z cechami albo None (brak sygnału lub fazy stresu)
+    """
+    if len(raw) == 0:
+        return None
+    return SIGNAL_EXTRACTORS[signal](subject, raw, phase_indices or {})
+
+
+def extract_subject_features(subject, eda_raw, bvp_raw, temp_raw, phase_indices):
+    """
+    Pełna ekstrakcja cech dla jednej osoby (pętla KROK 5 z notebooka).
+
+    Parameters:
+        subject: identyfikator osoby, np. "S2"
+        eda_raw, bvp_raw, temp_raw: surowe sygnały 1D z nadgarstka
+        phase_indices: wynik `extract_phase_indices`
+
+    Returns:
+        lista słowników (po jednym na sygnał: EDA, BVP, TEMP)
+    """
+    rows = []
+    for signal, raw in (('EDA', eda_raw), ('BVP', bvp_raw), ('TEMP', temp_raw)):
+        row = extract_signal_features(subject, signal, raw, phase_indices)
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+def pivot_signal_features(features_df):
+    """
+    Tabela długa (subject, signal, cechy...) -> jeden wiersz na subject z kolumnami `{SYGNAŁ}_{cecha}`.
+
+    Kolumny nienumeryczne (np. `interpretacja` w `regulacja_emocjonalna_dane.csv`)
+    są pomijane.
+    """
+    values = [col for col in features_df.columns
+              if col not in ['subject', 'signal', 'condition', 'peak_index']
+              and pd.api.types.is_numeric_dtype(features_df[col])]
+    pivot_df = features_df.pivot_table(
+        index='subject',
+        columns='signal',
+        values=values,
+        aggfunc='first'
+    )
+    pivot_df.columns = [f"{col[1]}_{col[0]}" for col in pivot_df.columns]
+    return pivot_df.reset_index()
+
+
+def build_feature_table(all_features):
+    """
+    Pivot cech do schematu `wesad_features_full.csv` (KROK 6 z notebooka).
+
+    Każdy subject dostaje jeden wiersz z kolumnami `{SYGNAŁ}_{cecha}`,
+    `regulation_score` i `regulation_class` (tercyle: słaba/umiarkowana/dobra).
+    """
+    pivot_df = pivot_signal_features(pd.DataFrame(all_features))
+
+    # Szybki decay + krótka duration + niski AUC = dobra regulacja
+    regulation_scores = []
+    for subject in pivot_df['subject'].unique():
+        subject_row = pivot_df[pivot_df['subject'] == subject].iloc[0]
+        eda_decay = subject_row.get('EDA_decay', np.nan)
+        eda_duration = subject_row.get('EDA_duration_s', np.nan)
+        eda_auc = subject_row.get('EDA_auc', np.nan)
+
+        score = 0.0
+        if not np.isnan(eda_decay) and eda_decay > 0:
+            score += np.log1p(eda_decay)
+        if not np.isnan(eda_duration):
+            score -= eda_duration / 100.0
+        if not np.isnan(eda_auc):
+            score -= eda_auc / 1000.0
+
+        regulation_scores.append({
+            'subject': subject,
+            'regulation_score': score
+        })
+
+    regulation_df = pd.DataFrame(regulation_scores)
+    regulation_df['regulation_class'] = pd.qcut(
+        regulation_df['regulation_score'],
+        q=3,
+        labels=['słaba', 'umiarkowana', 'dobra']
+    )
+    return pivot_df.merge(regulation_df, on='subject', how='left')
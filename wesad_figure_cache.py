@@ -0,0 +1,154 @@
+"""
+Cache wyrenderowanych wykresów matplotlib dla aplikacji Streamlit.
+
+Każdy rerun aplikacji budował od nowa figury 2×2 (`plt.subplots` +
+`tight_layout`) i przekazywał je do `st.pyplot`, a figury nigdy nie były
+zamykane. Tutaj figura renderowana jest raz do PNG, od razu zamykana
+(`plt.close`), a bajty PNG trzymane są w cache LRU współdzielonym przez
+wszystkie sesje serwera. Klucz to (aplikacja, subject, typ wykresu, wybrane
+cechy, wersja danych), więc powrót do wcześniej oglądanego subjecta nie
+wymaga ponownego rysowania, a pamięć serwera jest ograniczona limitem cache.
+
+Użycie w aplikacji:
+    from wesad_figure_cache import data_version, figure_key, st_cached_pyplot
+
+    key = figure_key("wesad_full_pro", subject, "features_2x2", data=data_version(csv_path))
+    st_cached_pyplot(key, lambda: render_feature_figure(df, subject_data))
+"""
+
+import io
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+
+# Limity cache (wspólne dla wszystkich sesji jednego procesu Streamlit)
+MAX_ENTRIES = 128
+MAX_BYTES = 64 * 1024 * 1024
+
+# Jak domyślnie w st.pyplot
+SAVEFIG_KWARGS = {"format": "png", "bbox_inches": "tight", "dpi": 200}
+
+# pyplot ma stan globalny - renderowanie z wielu sesji (wątków) naraz jest serializowane
+_RENDER_LOCK = threading.Lock()
+
+
+def data_version(path) -> tuple:
+    """Wersja pliku danych do klucza cache: (ścieżka, mtime_ns, rozmiar)."""
+    path = Path(path)
+    if not path.exists():
+        return (str(path), None, None)
+    stat = path.stat()
+    return (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def figure_key(app: str, subject=None, chart: str = None, features=(), data=None) -> tuple:
+    """Klucz cache: (aplikacja, subject, typ wykresu, cechy, wersja danych)."""
+    return (app, subject, chart, tuple(features), data)
+
+
+def render_png(fig, **savefig_kwargs) -> bytes:
+    """Zapisuje figurę do PNG i zamyka ją (zwalnia pamięć matplotlib)."""
+    kwargs = dict(SAVEFIG_KWARGS, **savefig_kwargs)
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, **kwargs)
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+class FigureCache:
+    """Cache LRU: klucz -> bajty PNG, z limitem liczby wpisów i łącznego rozmiaru."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key):
+        """Zwraca PNG (i oznacza jako ostatnio użyty) albo None."""
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return png
+
+    def put(self, key, png: bytes):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = png
+            self._bytes += len(png)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_render(self, key, render, **savefig_kwargs) -> bytes:
+        """
+        PNG z cache albo wyrenderowany teraz.
+
+        Args:
+            key: klucz z `figure_key`
+            render: funkcja bez argumentów zwracająca figurę matplotlib
+        """
+        png = self.get(key)
+        if png is not None:
+            return png
+        with _RENDER_LOCK:
+            # Inna sesja mogła właśnie wyrenderować ten sam wykres
+            png = self.get(key)
+            if png is not None:
+                return png
+            self.misses += 1
+            png = render_png(render(), **savefig_kwargs)
+        self.put(key, png)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_default_cache = FigureCache()
+
+
+def get_figure_cache() -> FigureCache:
+    """Wspólny cache procesu (przetrwa reruny i jest dzielony między sesjami)."""
+    return _default_cache
+
+
+def st_cached_pyplot(key, render, cache: FigureCache = None, **image_kwargs):
+    """
+    Zamiennik `st.pyplot(fig)`: wyświetla PNG z cache, renderując figurę tylko przy braku wpisu.
+
+    Args:
+        key: klucz z `figure_key`
+        render: funkcja bez argumentów zwracająca figurę matplotlib
+        image_kwargs: argumenty `st.image` (domyślnie szerokość kontenera, jak `st.pyplot`)
+    """
+    import streamlit as st
+
+    cache = cache or get_figure_cache()
+    png = cache.get_or_render(key, render)
+    if not image_kwargs:
+        image_kwargs = {"use_container_width": True}
+    st.image(png, **image_kwargs)
+    return png
@@ -6,6 +6,10 @@ import seaborn as sns
 from pathlib import Path
 import sys
 
+from wesad_figure_cache import data_version, figure_key, st_cached_pyplot
+from wesad_model import REGULATION_MODEL, latest_version, load_bundle
+from wesad_shap import META_FILENAME, load_shap_store, shap_store_path
+
 # Konfiguracja strony
 st.set_page_config(
     page_title="WESAD Full Pro Analysis",
@@ -59,6 +63,154 @@ def load_data():
         st.exception(e)
         return None
 
+@st.cache_resource
+def load_regulation_model(version):
+    """Model regulacji wczytywany raz na proces (nowa wersja w results/models = nowy wpis cache)"""
+    return load_bundle(REGULATION_MODEL, version)
+
+@st.cache_data
+def predict_regulation(_bundle, model_version, df):
+    """
+    Predykcje regulacji dla wszystkich osób jednym wywołaniem modelu.
+
+    `in_sample` = osoba była w zbiorze treningowym modelu (metadane `subjects`),
+    więc predykcja odtwarza etykietę z treningu, a nie ocenia nowych danych.
+    """
+    predictions = _bundle.predict_batch(df.set_index('subject'))
+    predictions['in_sample'] = predictions.index.isin(_bundle.metadata.get('subjects', []))
+    return predictions
+
+@st.cache_resource
+def load_shap_explanations(model_version, store_version):
+    """Magazyn SHAP wersji modelu (tablice mapowane z dysku, czytane dopiero przy rysowaniu)"""
+    try:
+        return load_shap_store(REGULATION_MODEL, model_version)
+    except FileNotFoundError:
+        return None
+
+def render_shap_waterfall(explanation, subject, output, top=10):
+    """Waterfall SHAP jednej osoby: od E[f(x)] przez wkłady cech do f(x)"""
+    base_value = explanation.attrs['base_value']
+    labels = [f"{row.feature} = {row.value:.3g}" for row in explanation.head(top).itertuples()]
+    contributions = list(explanation['shap'].head(top))
+    if len(explanation) > top:
+        labels.append(f"pozostałe cechy ({len(explanation) - top})")
+        contributions.append(explanation['shap'].iloc[top:].sum())
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    # Od dołu: najmniejsze wkłady, na górze największy (jak shap.plots.waterfall)
+    position = base_value
+    for y, (label, contribution) in enumerate(zip(labels[::-1], contributions[::-1])):
+        ax.barh(y, contribution, left=position, color='#FF6B6B' if contribution > 0 else '#45B7D1')
+        position += contribution
+    ax.axvline(base_value, color='gray', linestyle='--', label=f'E[f(x)] = {base_value:.3f}')
+    ax.axvline(position, color='black', linestyle='-', label=f'f(x) = {position:.3f}')
+    ax.set_yticks(range(len(labels)))
+    ax.set_yticklabels(labels[::-1])
+    ax.set_xlabel('Wynik modelu')
+    ax.set_title(f'SHAP waterfall - {subject} (klasa: {output})')
+    ax.legend(loc='lower right')
+    ax.grid(True, alpha=0.3, axis='x')
+    plt.tight_layout()
+    return fig
+
+def render_shap_summary(store, output, top=15):
+    """Globalne wyjaśnienia: średnie |SHAP| i rozkład wartości SHAP per cecha"""
+    importance = store.global_importance(output).head(top)
+    features = list(importance.index[::-1])
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6), sharey=True)
+
+    axes[0].barh(features, importance.values[::-1], color='#4ECDC4')
+    axes[0].set_title('Średnie |SHAP|')
+    axes[0].grid(True, alpha=0.3, axis='x')
+
+    jitter = np.random.default_rng(0).uniform(-0.3, 0.3, len(store))
+    for y, feature in enumerate(features):
+        shap_values, values = store.feature_values(feature, output)
+        span = np.ptp(values)
+        colors = (values - values.min()) / span if span > 0 else np.full(len(values), 0.5)
+        points = axes[1].scatter(shap_values, y + jitter, c=colors, cmap='coolwarm', vmin=0, vmax=1, s=14)
+    axes[1].axvline(0, color='gray', linewidth=0.8)
+    axes[1].set_title('Wartości SHAP (kolor: wartość cechy)')
+    axes[1].grid(True, alpha=0.3, axis='x')
+    fig.colorbar(points, ax=axes[1], label='Wartość cechy (niska → wysoka)')
+
+    fig.suptitle(f'Wyjaśnienia globalne (klasa: {output})', fontweight='bold')
+    plt.tight_layout()
+    return fig
+
+def render_feature_figure(df, subject_data):
+    """Wykres 2×2 cech wybranej osoby (renderowany raz, dalej z cache PNG)"""
+    fig, axes = plt.subplots(2, 2, figsize=(12, 10))
+
+    # EDA features
+    eda_cols = [col for col in df.columns if col.startswith('EDA_') and col != 'EDA_peak_index']
+    if len(eda_cols) > 0:
+        eda_values = [subject_data.get(col, 0) for col in eda_cols[:5]]
+        axes[0, 0].bar(range(len(eda_values)), eda_values)
+        axes[0, 0].set_xticks(range(len(eda_values)))
+        axes[0, 0].set_xticklabels(
+            [col.replace('EDA_', '') for col in eda_cols[:5]], 
+            rotation=45, 
+            ha='right'
+        )
+        axes[0, 0].set_title('EDA Features')
+        axes[0, 0].grid(True, alpha=0.3)
+    else:
+        axes[0, 0].text(0.5, 0.5, 'Brak danych EDA', 
+                       ha='center', va='center', transform=axes[0, 0].transAxes)
+        axes[0, 0].set_title('EDA Features')
+
+    # BVP/HRV features
+    bvp_cols = [col for col in df.columns if col.startswith('BVP_')]
+    if len(bvp_cols) > 0:
+        bvp_values = [subject_data.get(col, 0) for col in bvp_cols[:5]]
+        axes[0, 1].bar(range(len(bvp_values)), bvp_values)
+        axes[0, 1].set_xticks(range(len(bvp_values)))
+        axes[0, 1].set_xticklabels(
+            [col.replace('BVP_', '') for col in bvp_cols[:5]], 
+            rotation=45, 
+            ha='right'
+        )
+        axes[0, 1].set_title('BVP/HRV Features')
+        axes[0, 1].grid(True, alpha=0.3)
+    else:
+        axes[0, 1].text(0.5, 0.5, 'Brak danych BVP', 
+                       ha='center', va='center', transform=axes[0, 1].transAxes)
+        axes[0, 1].set_title('BVP/HRV Features')
+
+    # Porównanie z innymi
+    if 'EDA_peak_amplitude' in df.columns:
+        axes[1, 0].bar(df['subject'], df['EDA_peak_amplitude'])
+        axes[1, 0].axhline(
+            y=subject_data.get('EDA_peak_amplitude', 0), 
+            color='r', 
+            linestyle='--', 
+            label='Wybrana osoba'
+        )
+        axes[1, 0].set_title('EDA Peak Amplitude - Porównanie')
+        axes[1, 0].set_ylabel('Amplituda')
+        axes[1, 0].legend()
+        axes[1, 0].grid(True, alpha=0.3)
+    else:
+        axes[1, 0].text(0.5, 0.5, 'Brak danych', 
+                       ha='center', va='center', transform=axes[1, 0].transAxes)
+
+    # Regulation class distribution
+    if 'regulation_class' in df.columns:
+        regulation_counts = df['regulation_class'].value_counts()
+        axes[1, 1].bar(regulation_counts.index, regulation_counts.values)
+        axes[1, 1].set_title('Rozkład klas regulacji')
+        axes[1, 1].set_ylabel('Liczba osób')
+        axes[1, 1].grid(True, alpha=0.3)
+    else:
+        axes[1, 1].text(0.5, 0.5, 'Brak danych', 
+                       ha='center', va='center', transform=axes[1, 1].transAxes)
+
+    plt.tight_layout()
+    return fig
+
+
 # Wczytaj dane
 df = load_data()
 
@@ -68,6 +220,20 @@ if df is not None:
         # Sidebar
         st.sidebar.header("⚙️ Konfiguracja")
         
+        # Model regulacji (results/models) - predykcje dla całej kohorty naraz
+        regulation_predictions = None
+        model_version = latest_version(REGULATION_MODEL)
+        if model_version is not None:
+            try:
+                regulation_bundle = load_regulation_model(model_version)
+                regulation_predictions = predict_regulation(regulation_bundle, model_version, df)
+                st.sidebar.success(f"✅ Model regulacji: wersja {model_version}")
+            except Exception as e:
+                st.sidebar.warning(f"⚠️ Nie można użyć modelu regulacji: {e}")
+        else:
+            st.sidebar.info("ℹ️ Brak modelu regulacji - pokazuję etykiety z CSV. "
+                            "Trening: `python wesad_model.py`")
+        
         # Pobierz listę subjectów
         subjects = df['subject'].unique().tolist()
         subjects.sort()  # Posortuj alfabetycznie
@@ -90,6 +256,14 @@ if df is not None:
             else:
                 subject_data = subject_data.iloc[0]
                 
+                # Klasa regulacji: predykcja modelu, a bez modelu etykieta z CSV
+                if regulation_predictions is not None:
+                    subject_prediction = regulation_predictions.loc[selected_subject]
+                    regulation_class = subject_prediction['prediction']
+                else:
+                    subject_prediction = None
+                    regulation_class = subject_data.get('regulation_class', 'N/A')
+                
                 # ========== GŁÓWNE METRYKI ==========
                 st.header(f"📊 Analiza dla {selected_subject}")
                 
@@ -117,7 +291,6 @@ if df is not None:
                         st.metric("EDA Decay", "N/A")
                 
                 with col4:
-                    regulation_class = subject_data.get('regulation_class', 'N/A')
                     st.metric("Regulacja", regulation_class)
                 
                 # ========== WIZUALIZACJE ==========
@@ -125,74 +298,11 @@ if df is not None:
                 st.subheader("📈 Wizualizacje cech")
                 
                 try:
-                    fig, axes = plt.subplots(2, 2, figsize=(12, 10))
-                    
-                    # EDA features
-                    eda_cols = [col for col in df.columns if col.startswith('EDA_') and col != 'EDA_peak_index']
-                    if len(eda_cols) > 0:
-                        eda_values = [subject_data.get(col, 0) for col in eda_cols[:5]]
-                        axes[0, 0].bar(range(len(eda_values)), eda_values)
-                        axes[0, 0].set_xticks(range(len(eda_values)))
-                        axes[0, 0].set_xticklabels(
-                            [col.replace('EDA_', '') for col in eda_cols[:5]], 
-                            rotation=45, 
-                            ha='right'
-                        )
-                        axes[0, 0].set_title('EDA Features')
-                        axes[0, 0].grid(True, alpha=0.3)
-                    else:
-                        axes[0, 0].text(0.5, 0.5, 'Brak danych EDA', 
-                                       ha='center', va='center', transform=axes[0, 0].transAxes)
-                        axes[0, 0].set_title('EDA Features')
-                    
-                    # BVP/HRV features
-                    bvp_cols = [col for col in df.columns if col.startswith('BVP_')]
-                    if len(bvp_cols) > 0:
-                        bvp_values = [subject_data.get(col, 0) for col in bvp_cols[:5]]
-                        axes[0, 1].bar(range(len(bvp_values)), bvp_values)
-                        axes[0, 1].set_xticks(range(len(bvp_values)))
-                        axes[0, 1].set_xticklabels(
-                            [col.replace('BVP_', '') for col in bvp_cols[:5]], 
-                            rotation=45, 
-                            ha='right'
-                        )
-                        axes[0, 1].set_title('BVP/HRV Features')
-                        axes[0, 1].grid(True, alpha=0.3)
-                    else:
-                        axes[0, 1].text(0.5, 0.5, 'Brak danych BVP', 
-                                       ha='center', va='center', transform=axes[0, 1].transAxes)
-                        axes[0, 1].set_title('BVP/HRV Features')
-                    
-                    # Porównanie z innymi
-                    if 'EDA_peak_amplitude' in df.columns:
-                        axes[1, 0].bar(df['subject'], df['EDA_peak_amplitude'])
-                        axes[1, 0].axhline(
-                            y=subject_data.get('EDA_peak_amplitude', 0), 
-                            color='r', 
-                            linestyle='--', 
-                            label='Wybrana osoba'
-                        )
-                        axes[1, 0].set_title('EDA Peak Amplitude - Porównanie')
-                        axes[1, 0].set_ylabel('Amplituda')
-                        axes[1, 0].legend()
-                        axes[1, 0].grid(True, alpha=0.3)
-                    else:
-                        axes[1, 0].text(0.5, 0.5, 'Brak danych', 
-                                       ha='center', va='center', transform=axes[1, 0].transAxes)
-                    
-                    # Regulation class distribution
-                    if 'regulation_class' in df.columns:
-                        regulation_counts = df['regulation_class'].value_counts()
-                        axes[1, 1].bar(regulation_counts.index, regulation_counts.values)
-                        axes[1, 1].set_title('Rozkład klas regulacji')
-                        axes[1, 1].set_ylabel('Liczba osób')
-                        axes[1, 1].grid(True, alpha=0.3)
-                    else:
-                        axes[1, 1].text(0.5, 0.5, 'Brak danych', 
-                                       ha='center', va='center', transform=axes[1, 1].transAxes)
-                    
-                    plt.tight_layout()
-                    st.pyplot(fig, use_container_width=True)
+                    csv_path = Path("wesad_features_full.csv")
+                    key = figure_key("wesad_full_pro", selected_subject, "features_2x2",
+                                     data=data_version(csv_path))
+                    st_cached_pyplot(key, lambda: render_feature_figure(df, subject_data),
+                                     use_container_width=True)
                     
                 except Exception as e:
                     st.error(f"❌ **Błąd podczas tworzenia wykresów:** {e}")
@@ -218,8 +328,6 @@ if df is not None:
                 st.subheader("🔮 Predykcja Regulacji Emocjonalnej")
                 
                 if st.button("🎯 Uruchom Analizę", type="primary"):
-                    regulation_class = subject_data.get('regulation_class', 'N/A')
-                    
                     if regulation_class == 'dobra':
                         st.success("✅ **Dobra regulacja emocjonalna** - szybko wracasz do równowagi!")
                     elif regulation_class == 'umiarkowana':
@@ -228,6 +336,50 @@ if df is not None:
                         st.error("❌ **Słaba regulacja** - rozważ techniki relaksacyjne i wsparcie.")
                     else:
                         st.info("ℹ️ Analiza w toku...")
+                    
+                    if subject_prediction is not None and 'confidence' in subject_prediction:
+                        st.caption(f"Model {model_version}, pewność predykcji: {subject_prediction['confidence']:.0%}")
+                    if subject_prediction is not None and subject_prediction['in_sample']:
+                        st.caption(f"⚠️ Predykcja in-sample: {selected_subject} był w zbiorze treningowym modelu, "
+                                   "więc wynik odtwarza etykietę z CSV (nie jest oceną na nowych danych).")
+                
+                if regulation_predictions is not None:
+                    with st.expander("📋 Predykcje modelu dla wszystkich osób"):
+                        if regulation_predictions['in_sample'].any():
+                            st.caption("⚠️ `in_sample` = osoba ze zbioru treningowego modelu - predykcja in-sample, "
+                                       "nie ocena na nowych danych.")
+                        st.dataframe(regulation_predictions.round(3), width='stretch')
+                
+                # ========== WYJAŚNIENIA MODELU (SHAP) ==========
+                st.markdown("---")
+                st.subheader("🔍 Wyjaśnienia modelu (SHAP)")
+                
+                shap_store = None
+                if model_version is not None:
+                    shap_version = data_version(shap_store_path(REGULATION_MODEL, model_version) / META_FILENAME)
+                    shap_store = load_shap_explanations(model_version, shap_version)
+                
+                if shap_store is None:
+                    st.info("ℹ️ Brak wyjaśnień SHAP dla modelu regulacji. Oblicz je poleceniem "
+                            "`python wesad_shap.py`")
+                elif selected_subject not in shap_store:
+                    st.info(f"ℹ️ Brak wyjaśnień SHAP dla {selected_subject}")
+                else:
+                    outputs = shap_store.outputs
+                    default_output = outputs.index(regulation_class) if regulation_class in outputs else len(outputs) - 1
+                    shap_output = st.selectbox("Klasa do wyjaśnienia:", outputs, index=default_output)
+                    
+                    # Wykresy z magazynu SHAP (bez liczenia), PNG w cache per (osoba, klasa, wersja)
+                    key = figure_key("wesad_full_pro", selected_subject, "shap_waterfall",
+                                     features=(shap_output,), data=shap_version)
+                    st_cached_pyplot(key, lambda: render_shap_waterfall(
+                        shap_store.explain_row(selected_subject, shap_output), selected_subject, shap_output),
+                        use_container_width=True)
+                    
+                    key = figure_key("wesad_full_pro", None, "shap_summary",
+                                     features=(shap_output,), data=shap_version)
+                    st_cached_pyplot(key, lambda: render_shap_summary(shap_store, shap_output),
+                                     use_container_width=True)
     
     except Exception as e:
         st.error(f"❌ **Krytyczny błąd aplikacji:** {type(e).__name__}: {e}")
@@ -0,0 +1,259 @@
+"""
+Indeks odcinków etykiet (run-length) dla wektorów etykiet WESAD.
+
+`extract_phase_indices` materializował `np.where(labels == k)` dla
+baseline/stress/amusement na całym wektorze 700 Hz - miliony indeksów int64
+na osobę - a `scale_phase_indices` przeliczał je osobno dla każdego sygnału.
+Tutaj etykiety zamieniane są raz na listę odcinków (etykieta, start, koniec)
+- kilkanaście-kilkadziesiąt wpisów na sesję - a zapytania "zakres próbek
+fazy X przy częstotliwości fs" i "etykieta większościowa okna [a, b)"
+to `np.searchsorted` po początkach odcinków, czyli O(log n).
+
+Indeks jest zapisywany obok `label.npy` w cache (`label_runs.npz`), więc
+kolejne uruchomienia (i workery pipeline'u) nie skanują już wektora 700 Hz.
+
+Użycie:
+    index = load_label_index("S2", raw_root=RAW_ROOT)       # etykiety 700 Hz z cache
+    index.phase_bounds(PHASE_LABELS["stress"], fs=4.0)       # (start, end) w próbkach EDA
+    index.majority(start_idx, end_idx)                       # etykieta okna
+
+    index = LabelIndex.from_labels(subject_df["label"].to_numpy())   # etykiety tekstowe z notebooka
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from wesad_cache import CACHE_ROOT, RAW_ROOT, ensure_cached, load_labels
+
+# Etykiety faz w wektorze `label` (jak w extract_phase_indices)
+PHASE_LABELS = {'baseline': 0, 'stress': 1, 'amusement': 2}
+
+# Rozmiar kawałka przy skanowaniu wektora etykiet (próbki)
+CHUNK_SAMPLES = 1 << 20
+
+RUNS_FILENAME = 'label_runs.npz'
+
+
+def _python_value(value):
+    """Skalar numpy -> typ Pythona; etykiety tekstowe z tablicy object zostają bez zmian."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class LabelIndex:
+    """
+    Odcinki stałej etykiety: `values[i]` obowiązuje w próbkach [starts[i], ends[i]).
+
+    Indeksy próbek liczone są przy częstotliwości etykiet `fs`; metody
+    przyjmujące `fs` przeliczają zakresy na częstotliwość innego sygnału.
+    """
+
+    def __init__(self, values, starts, ends, fs: float = None):
+        self.values = np.asarray(values)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.fs = float(fs) if fs is not None else None
+
+    @classmethod
+    def from_labels(cls, labels, fs: float = None, chunk_size: int = CHUNK_SAMPLES) -> 'LabelIndex':
+        """Buduje indeks z wektora etykiet (np. np.memmap) skanowanego kawałkami."""
+        n = len(labels)
+        changes = []
+        previous = None
+        for start in range(0, n, chunk_size):
+            block = np.asarray(labels[start:start + chunk_size]).ravel()
+            if previous is not None and block[0] != previous:
+                changes.append(np.array([start]))
+            changes.append(np.flatnonzero(block[1:] != block[:-1]) + 1 + start)
+            previous = block[-1]
+        boundaries = np.concatenate(changes) if changes else np.empty(0, dtype=np.int64)
+        starts = np.concatenate([[0], boundaries]) if n else np.empty(0, dtype=np.int64)
+        ends = np.concatenate([boundaries, [n]]) if n else np.empty(0, dtype=np.int64)
+        values = np.asarray(labels[starts]).ravel() if n else np.empty(0)
+        return cls(values, starts, ends, fs)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        fs = f", fs={self.fs:g}" if self.fs is not None else ""
+        return f"LabelIndex(odcinki={len(self)}, próbki={self.n_samples}{fs})"
+
+    @property
+    def n_samples(self) -> int:
+        return int(self.ends[-1]) if len(self) else 0
+
+    def _scale(self, fs, label_fs=None) -> float:
+        """Współczynnik przeliczenia próbek etykiet (przy `label_fs`, domyślnie `self.fs`) na próbki sygnału `fs`."""
+        label_fs = label_fs if label_fs is not None else self.fs
+        if fs is None or label_fs is None:
+            return 1.0
+        return fs / label_fs
+
+    def label_at(self, sample: int, default=None):
+        """Etykieta próbki `sample` (przy częstotliwości etykiet)."""
+        run = int(np.searchsorted(self.starts, sample, side='right')) - 1
+        if run < 0 or sample >= self.n_samples:
+            return default
+        return _python_value(self.values[run])
+
+    def runs(self, label):
+        """(starts, ends) wszystkich odcinków etykiety `label`."""
+        mask = self.values == label
+        return self.starts[mask], self.ends[mask]
+
+    def sample_ranges(self, label, fs: float = None, signal_len: int = None, label_fs: float = None) -> list:
+        """
+        Zakresy [start, end) odcinków etykiety w próbkach sygnału `fs`.
+
+        Próbka i etykiety trafia do próbki floor(i * fs / fs_etykiet) - jak
+        w `scale_phase_indices` - a próbki etykiet, które trafiają poza
+        `signal_len`, są pomijane. Zakres odcinka biegnie od pierwszej do
+        ostatniej (+1) takiej próbki; przy `fs` > fs_etykiet obejmuje też
+        próbki pomiędzy przeskalowanymi indeksami, których `scale_phase_indices`
+        nie zwraca (granice są te same).
+        """
+        starts, ends = self.runs(label)
+        scale = self._scale(fs, label_fs)
+        last_label = ends - 1
+        if signal_len is not None:
+            last_label = np.minimum(last_label, self._last_label_sample(scale, signal_len))
+        keep = last_label >= starts
+        first = (starts[keep] * scale).astype(np.int64)
+        last = (last_label[keep] * scale).astype(np.int64) + 1
+        return list(zip(first.tolist(), last.tolist()))
+
+    @staticmethod
+    def _last_label_sample(scale: float, signal_len: int) -> int:
+        """Największe i, dla którego int(i * scale) < signal_len (to samo zaokrąglenie co `scale_phase_indices`)."""
+        i = int(np.ceil(signal_len / scale)) - 1
+        while int((i + 1) * scale) < signal_len:
+            i += 1
+        while i >= 0 and int(i * scale) >= signal_len:
+            i -= 1
+        return i
+
+    def phase_bounds(self, label, fs: float = None, signal_len: int = None, label_fs: float = None):
+        """
+        (start, end) od pierwszej do ostatniej próbki etykiety w próbkach sygnału `fs`, albo None.
+
+        Odpowiada pierwszemu i ostatniemu indeksowi z `scale_phase_indices`
+        (+1), bez materializowania indeksów.
+        """
+        ranges = self.sample_ranges(label, fs, signal_len, label_fs)
+        if not ranges:
+            return None
+        return ranges[0][0], ranges[-1][1]
+
+    def _label_samples(self, index, fs):
+        """Indeks próbki sygnału `fs` -> indeks próbki etykiet."""
+        scale = self._scale(fs)
+        index = np.asarray(index, dtype=np.float64)
+        return np.ceil(index / scale).astype(np.int64) if scale != 1.0 else index.astype(np.int64)
+
+    def majority(self, start: int, end: int, fs: float = None, default=None):
+        """
+        Etykieta większości próbek okna [start, end) - jak `value_counts().index[0]`.
+
+        Przy remisie wygrywa etykieta, która pojawia się w oknie pierwsza.
+        """
+        lo, hi = self._label_samples([start, end], fs)
+        lo, hi = max(int(lo), 0), min(int(hi), self.n_samples)
+        if hi <= lo:
+            return default
+        first = int(np.searchsorted(self.starts, lo, side='right')) - 1
+        last = int(np.searchsorted(self.starts, hi, side='left'))
+        counts = {}
+        for run in range(first, last):
+            overlap = min(self.ends[run], hi) - max(self.starts[run], lo)
+            label = _python_value(self.values[run])
+            counts[label] = counts.get(label, 0) + overlap
+        best = max(counts.values())
+        return next(label for label, count in counts.items() if count == best)
+
+    def majority_labels(self, starts, ends, fs: float = None, default=None) -> np.ndarray:
+        """
+        Etykiety większościowe wielu okien naraz (wektorowo).
+
+        Liczba próbek etykiety w oknie to różnica sum skumulowanych długości
+        jej odcinków na krańcach okna; remisy rozstrzygane jak w `majority`.
+        """
+        lo = np.clip(self._label_samples(starts, fs), 0, self.n_samples)
+        hi = np.clip(self._label_samples(ends, fs), 0, self.n_samples)
+        result = np.full(len(lo), default, dtype=object)
+        if not len(self) or not len(lo):
+            return result
+        labels = np.unique(self.values)
+        lengths = self.ends - self.starts
+        run_lo, run_hi = self._run_of(lo), self._run_of(hi)
+        no_match = np.iinfo(np.int64).max
+        counts = np.empty((len(lo), len(labels)), dtype=np.int64)
+        first = np.empty((len(lo), len(labels)), dtype=np.int64)
+        for j, label in enumerate(labels):
+            is_label = self.values == label
+            cumulative = np.concatenate([[0], np.cumsum(np.where(is_label, lengths, 0))])
+
+            def count_before(position, run):
+                inside = np.clip(position - self.starts[run], 0, lengths[run])
+                return cumulative[run] + np.where(is_label[run], inside, 0)
+
+            counts[:, j] = count_before(hi, run_hi) - count_before(lo, run_lo)
+            # Pierwsza próbka etykiety w oknie: pierwszy jej odcinek od odcinka zawierającego lo
+            label_runs = np.flatnonzero(is_label)
+            k = np.searchsorted(label_runs, run_lo, side='left')
+            next_start = self.starts[label_runs[np.minimum(k, len(label_runs) - 1)]]
+            candidate = np.where(k < len(label_runs), np.maximum(next_start, lo), no_match)
+            first[:, j] = np.where(candidate < hi, candidate, no_match)
+
+        best = counts.max(axis=1, keepdims=True)
+        winner = np.argmin(np.where(counts == best, first, no_match), axis=1)
+        valid = hi > lo
+        result[valid] = labels[winner[valid]]
+        return result
+
+    def _run_of(self, position) -> np.ndarray:
+        """Numer odcinka zawierającego próbkę (przycięty do istniejących odcinków)."""
+        return np.clip(np.searchsorted(self.starts, position, side='right') - 1, 0, len(self) - 1)
+
+    def save(self, path):
+        """
+        Zapis do .npz bez pickle: etykiety tekstowe (tablica object) zapisywane są
+        jako tablica unicode o stałej szerokości, więc `load` odczyta je bez `allow_pickle`.
+        """
+        values = self.values.astype(str) if self.values.dtype == object else self.values
+        np.savez(path, values=values, starts=self.starts, ends=self.ends,
+                 fs=np.nan if self.fs is None else self.fs)
+
+    @classmethod
+    def load(cls, path) -> 'LabelIndex':
+        with np.load(path, allow_pickle=False) as data:
+            fs = float(data['fs'])
+            return cls(data['values'], data['starts'], data['ends'], None if np.isnan(fs) else fs)
+
+
+@lru_cache(maxsize=64)
+def _cached_label_index(runs_path: str, labels_mtime_ns: int, subject: str, raw_root: str, cache_root: str):
+    runs_path = Path(runs_path)
+    if runs_path.exists() and runs_path.stat().st_mtime_ns >= labels_mtime_ns:
+        return LabelIndex.load(runs_path)
+    labels, fs = load_labels(subject, Path(raw_root), Path(cache_root))
+    index = LabelIndex.from_labels(labels, fs)
+    index.save(runs_path)
+    return index
+
+
+def load_label_index(subject: str, raw_root: Path = RAW_ROOT, cache_root: Path = CACHE_ROOT) -> LabelIndex:
+    """
+    Indeks odcinków etykiet osoby z cache (liczony raz, zapisany w `label_runs.npz`).
+
+    Raises:
+        KeyError: gdy dane osoby nie mają etykiet
+    """
+    meta = ensure_cached(subject, raw_root, cache_root)
+    if 'label' not in meta:
+        raise KeyError(f"Brak etykiet dla {subject}")
+    subject_dir = Path(cache_root) / subject
+    labels_mtime_ns = (subject_dir / 'label.npy').stat().st_mtime_ns
+    return _cached_label_index(str(subject_dir / RUNS_FILENAME), labels_mtime_ns, subject,
+                               str(raw_root), str(cache_root))
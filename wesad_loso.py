@@ -0,0 +1,373 @@
+"""
+Równoległa walidacja leave-one-subject-out (LOSO) z cache przygotowania foldów.
+
+Pętla z notebooków (KROK 3 w 04_complete_analysis_sliding_window.ipynb)
+liczyła modele po kolei, a dla każdego modelu w każdym foldzie od nowa
+uruchamiała SMOTE i dopasowywała StandardScaler - przy 4 modelach ten sam
+zbalansowany zbiór treningowy powstawał 4 razy. Tutaj:
+
+1. każdy fold przygotowywany jest raz (SMOTE tylko na zbiorze treningowym,
+   potem StandardScaler dopasowany do zbalansowanych danych - jak
+   `Pipeline([("scaler", ...), ("model", ...)])`) i współdzielony przez
+   wszystkie modele; z `cache_dir` przygotowane foldy trafiają też na dysk
+   (`joblib.Memory`) i kolejne uruchomienia ich nie przeliczają,
+2. zadania (model × fold) rozsyłane są do procesów (`joblib.Parallel`);
+   każde zadanie dostaje klon modelu, więc wyniki nie zależą od liczby
+   procesów ani kolejności ich wykonania.
+
+Wynik dla modelu ma klucze pętli z notebooka 04 (avg_f1_macro, std_f1_macro,
+fold_results, y_test, y_pred, report) oraz metryki z notebooka 06 (accuracy,
+balanced_accuracy, macro_f1, confusion_matrix, classification_report), a
+`build_analysis_results` składa z nich słownik w formacie
+`results/analysis_results.json` czytanym przez aplikację Streamlit.
+
+Użycie:
+    results, folds = run_loso_evaluation(X, y_encoded, groups, default_models(),
+                                         class_names=label_encoder.classes_, n_jobs=-1)
+    analysis_results = build_analysis_results(results, folds, y_encoded, label_encoder.classes_)
+    save_analysis_results(analysis_results, PROJECT_ROOT / "results" / "analysis_results.json")
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+from joblib import Memory, Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import (accuracy_score, balanced_accuracy_score, classification_report,
+                             confusion_matrix, f1_score)
+from sklearn.model_selection import GroupKFold, LeaveOneGroupOut
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+try:
+    from imblearn.over_sampling import SMOTE
+    SMOTE_AVAILABLE = True
+except ImportError:
+    SMOTE_AVAILABLE = False
+
+try:
+    from xgboost import XGBClassifier
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+RANDOM_STATE = 42
+
+# Maksymalne k_neighbors dla SMOTE (jak w notebookach)
+SMOTE_MAX_NEIGHBORS = 3
+
+
+def default_models(n_classes: int = 2, class_counts=None, random_state: int = RANDOM_STATE) -> dict:
+    """
+    Modele z notebooka 04 (RandomForest, SVM, LogisticRegression, XGBoost jeśli dostępny).
+
+    Args:
+        n_classes: liczba klas (objective i eval_metric XGBoost)
+        class_counts: liczność klas [klasa 0, klasa 1] - scale_pos_weight XGBoost przy 2 klasach
+    """
+    models = {
+        'RandomForest': RandomForestClassifier(
+            n_estimators=200, max_depth=8, random_state=random_state, class_weight='balanced'
+        ),
+        'SVM': SVC(kernel='rbf', probability=True, random_state=random_state, class_weight='balanced'),
+        'LogisticRegression': LogisticRegression(
+            max_iter=1000, random_state=random_state, class_weight='balanced'
+        ),
+    }
+    if XGBOOST_AVAILABLE:
+        scale_pos_weight = None
+        if n_classes == 2 and class_counts is not None:
+            scale_pos_weight = class_counts[0] / class_counts[1]
+        models['XGBoost'] = XGBClassifier(
+            n_estimators=200,
+            max_depth=6,
+            learning_rate=0.05,
+            random_state=random_state,
+            objective='binary:logistic' if n_classes == 2 else 'multi:softprob',
+            eval_metric='logloss' if n_classes == 2 else 'mlogloss',
+            scale_pos_weight=scale_pos_weight,
+        )
+    return models
+
+
+def fold_splits(groups, n_splits: int = None) -> list:
+    """
+    Podziały (train_idx, test_idx) po uczestnikach.
+
+    Bez `n_splits` - leave-one-subject-out (jeden fold na uczestnika), z
+    `n_splits` - GroupKFold jak w notebooku 04.
+    """
+    groups = np.asarray(groups)
+    splitter = LeaveOneGroupOut() if n_splits is None else GroupKFold(n_splits=n_splits)
+    placeholder = np.zeros(len(groups))
+    return list(splitter.split(placeholder, placeholder, groups))
+
+
+class PreparedFold:
+    """Fold po SMOTE i skalowaniu - wspólny dla wszystkich modeli."""
+
+    def __init__(self, fold, test_idx, X_train, y_train, X_test, scaler, train_counts,
+                 balanced_counts, test_subjects, smote_error=None):
+        self.fold = fold
+        self.test_idx = test_idx
+        self.X_train = X_train
+        self.y_train = y_train
+        self.X_test = X_test
+        self.scaler = scaler
+        self.train_counts = train_counts
+        self.balanced_counts = balanced_counts
+        self.test_subjects = test_subjects
+        self.smote_error = smote_error
+
+    def __repr__(self):
+        return (f"PreparedFold({self.fold}, train={len(self.y_train)}, test={len(self.test_idx)}, "
+                f"test_subjects={self.test_subjects})")
+
+    @property
+    def n_train_before_smote(self) -> int:
+        return int(sum(self.train_counts.values()))
+
+    @property
+    def n_train_after_smote(self) -> int:
+        return len(self.y_train)
+
+
+def _class_counts(y) -> dict:
+    values, counts = np.unique(y, return_counts=True)
+    return {int(value): int(count) for value, count in zip(values, counts)}
+
+
+def prepare_fold(X, y, groups, train_idx, test_idx, fold: int = 1, use_smote: bool = True,
+                 random_state: int = RANDOM_STATE) -> PreparedFold:
+    """
+    SMOTE na zbiorze treningowym foldu, potem StandardScaler dopasowany do zbalansowanych danych.
+
+    k_neighbors = min(3, liczność najmniejszej klasy - 1), jak w notebookach;
+    gdy SMOTE się nie powiedzie, fold trenowany jest na danych bez balansowania
+    (błąd zapisany w `smote_error`).
+    """
+    X_train, y_train = X[train_idx], y[train_idx]
+    X_train_bal, y_train_bal = X_train, y_train
+    train_counts = _class_counts(y_train)
+    smote_error = None
+
+    if use_smote and SMOTE_AVAILABLE:
+        try:
+            min_class_count = min(train_counts.values())
+            k_neighbors = min(SMOTE_MAX_NEIGHBORS, min_class_count - 1) if min_class_count > 1 else 1
+            if k_neighbors > 0:
+                smote = SMOTE(random_state=random_state, k_neighbors=k_neighbors)
+                X_train_bal, y_train_bal = smote.fit_resample(X_train, y_train)
+        except Exception as e:
+            smote_error = f"{type(e).__name__}: {e}"
+            X_train_bal, y_train_bal = X_train, y_train
+
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train_bal)
+    return PreparedFold(
+        fold=fold,
+        test_idx=np.asarray(test_idx),
+        X_train=X_train_scaled,
+        y_train=np.asarray(y_train_bal),
+        X_test=scaler.transform(X[test_idx]),
+        scaler=scaler,
+        train_counts=train_counts,
+        balanced_counts=_class_counts(y_train_bal),
+        test_subjects=sorted(np.unique(np.asarray(groups)[test_idx]).tolist()),
+        smote_error=smote_error,
+    )
+
+
+def prepare_folds(X, y, groups, splits, use_smote: bool = True, random_state: int = RANDOM_STATE,
+                  n_jobs: int = -1, cache_dir=None) -> list:
+    """
+    Przygotowuje wszystkie foldy (równolegle).
+
+    Args:
+        cache_dir: katalog cache `joblib.Memory` - foldy dla tych samych danych
+            i parametrów są wtedy czytane z dysku zamiast przeliczane
+    """
+    prepare = Memory(str(cache_dir), verbose=0).cache(prepare_fold) if cache_dir is not None else prepare_fold
+    X, y, groups = np.asarray(X), np.asarray(y), np.asarray(groups)
+    return Parallel(n_jobs=n_jobs)(
+        delayed(prepare)(X, y, groups, train_idx, test_idx, fold, use_smote, random_state)
+        for fold, (train_idx, test_idx) in enumerate(splits, start=1)
+    )
+
+
+def _fit_predict(model, fold: PreparedFold) -> np.ndarray:
+    estimator = clone(model)
+    estimator.fit(fold.X_train, fold.y_train)
+    return estimator.predict(fold.X_test)
+
+
+def _model_result(predictions, folds, y, labels, class_names) -> dict:
+    """Metryki modelu: per fold i z predykcji zebranych ze wszystkich foldów."""
+    fold_results = []
+    for fold, y_pred in zip(folds, predictions):
+        y_test = y[fold.test_idx]
+        fold_results.append({
+            'fold': fold.fold,
+            'test_subjects': fold.test_subjects,
+            'f1_macro': f1_score(y_test, y_pred, average='macro', zero_division=0),
+            'f1_weighted': f1_score(y_test, y_pred, average='weighted', zero_division=0),
+        })
+
+    all_y_test = np.concatenate([y[fold.test_idx] for fold in folds])
+    all_y_pred = np.concatenate(predictions)
+    report = classification_report(all_y_test, all_y_pred, labels=labels, target_names=class_names,
+                                   output_dict=True, zero_division=0)
+    f1_macro = [r['f1_macro'] for r in fold_results]
+    return {
+        'avg_f1_macro': np.mean(f1_macro),
+        'std_f1_macro': np.std(f1_macro),
+        'fold_results': fold_results,
+        'y_test': all_y_test,
+        'y_pred': all_y_pred,
+        'report': report,
+        'accuracy': accuracy_score(all_y_test, all_y_pred),
+        'balanced_accuracy': balanced_accuracy_score(all_y_test, all_y_pred),
+        'macro_f1': f1_score(all_y_test, all_y_pred, average='macro', zero_division=0),
+        'confusion_matrix': confusion_matrix(all_y_test, all_y_pred, labels=labels),
+        'classification_report': report,
+    }
+
+
+def run_loso_evaluation(X, y, groups, models: dict, n_splits: int = None, class_names=None,
+                        use_smote: bool = True, random_state: int = RANDOM_STATE, n_jobs: int = -1,
+                        cache_dir=None, verbose: bool = True):
+    """
+    Walidacja krzyżowa po uczestnikach dla wielu modeli naraz.
+
+    Parameters:
+        X: macierz cech okien (n_okien, n_cech)
+        y: etykiety zakodowane liczbami (np. z LabelEncoder)
+        groups: uczestnik każdego okna
+        models: dict nazwa -> niedopasowany estymator sklearn (klonowany w każdym zadaniu)
+        n_splits: None = leave-one-subject-out, liczba = GroupKFold
+        class_names: nazwy klas w kolejności kodów (np. label_encoder.classes_)
+        n_jobs: liczba procesów joblib (-1 = wszystkie rdzenie, 1 = bez puli)
+        cache_dir: katalog cache przygotowanych foldów (None = tylko w pamięci)
+
+    Returns:
+        (results, folds) - results: dict nazwa modelu -> metryki (klucze jak
+        `all_results` w notebooku 04 i `results` w notebooku 06), folds: lista PreparedFold
+    """
+    X, y, groups = np.asarray(X), np.asarray(y), np.asarray(groups)
+    if class_names is not None:
+        class_names = [str(name) for name in class_names]
+        labels = np.arange(len(class_names))
+    else:
+        labels = np.unique(y)
+        class_names = [str(label) for label in labels]
+    splits = fold_splits(groups, n_splits)
+
+    if verbose:
+        scheme = "leave-one-subject-out" if n_splits is None else f"GroupKFold({n_splits})"
+        print(f"  Walidacja: {scheme}, {len(splits)} foldów × {len(models)} modeli")
+    folds = prepare_folds(X, y, groups, splits, use_smote, random_state, n_jobs, cache_dir)
+    if verbose:
+        for fold in folds:
+            if fold.smote_error is not None:
+                print(f"  ⚠️ SMOTE nie powiódł się dla fold {fold.fold}: {fold.smote_error}")
+
+    jobs = [(name, fold) for name in models for fold in folds]
+    predictions = Parallel(n_jobs=n_jobs)(delayed(_fit_predict)(models[name], fold) for name, fold in jobs)
+
+    results = {}
+    for i, name in enumerate(models):
+        model_predictions = predictions[i * len(folds):(i + 1) * len(folds)]
+        results[name] = _model_result(model_predictions, folds, y, labels, class_names)
+        if verbose:
+            print(f"  ✅ {name}: macro F1 {results[name]['avg_f1_macro']:.3f} ± {results[name]['std_f1_macro']:.3f}")
+    return results, folds
+
+
+def _named_counts(counts: dict, class_names) -> dict:
+    return {class_names[code]: int(count) for code, count in sorted(counts.items(), key=lambda kv: -kv[1])}
+
+
+def _mean_counts(counts_per_fold) -> dict:
+    codes = sorted({code for counts in counts_per_fold for code in counts})
+    return {code: int(round(np.mean([counts.get(code, 0) for counts in counts_per_fold]))) for code in codes}
+
+
+def build_analysis_results(results: dict, folds: list, y, class_names) -> dict:
+    """
+    Słownik w formacie `results/analysis_results.json` (jak KROK 10 notebooka 06).
+
+    Przy walidacji krzyżowej zbiór treningowy jest inny w każdym foldzie, więc
+    liczności treningowe (przed/po SMOTE) to średnie po foldach, a zbiór
+    testowy to wszystkie okna (każde testowane dokładnie raz). Szczegóły
+    foldów zapisywane są w dodatkowym kluczu `cross_validation`.
+    """
+    class_names = [str(name) for name in class_names]
+    y = np.asarray(y)
+    n_features = folds[0].X_train.shape[1] if folds else 0
+    train_before = _mean_counts([fold.train_counts for fold in folds])
+    train_after = _mean_counts([fold.balanced_counts for fold in folds])
+    test_counts = _class_counts(np.concatenate([y[fold.test_idx] for fold in folds])) if folds else {}
+
+    analysis_results = {
+        'data_info': {
+            'n_train_before_smote': int(sum(train_before.values())),
+            'n_train_after_smote': int(sum(train_after.values())),
+            'n_test': int(sum(test_counts.values())),
+            'n_features': int(n_features),
+            'n_classes': len(class_names),
+            'classes': class_names,
+        },
+        'label_encoder_mapping': {label: code for code, label in enumerate(class_names)},
+        'class_distribution_before_smote': _named_counts(train_before, class_names),
+        'class_distribution_after_smote': _named_counts(train_after, class_names),
+        'class_distribution_test': _named_counts(test_counts, class_names),
+        'model_metrics': {},
+        'confusion_matrices': {},
+        'per_class_metrics': {},
+        'best_model': None,
+        'cross_validation': {
+            'n_folds': len(folds),
+            'test_subjects': [fold.test_subjects for fold in folds],
+            'fold_f1_macro': {},
+        },
+    }
+
+    for model_name, result in results.items():
+        analysis_results['model_metrics'][model_name] = {
+            'accuracy': float(result['accuracy']),
+            'balanced_accuracy': float(result['balanced_accuracy']),
+            'macro_f1': float(result['macro_f1']),
+        }
+        analysis_results['confusion_matrices'][model_name] = result['confusion_matrix'].tolist()
+        report = result['classification_report']
+        analysis_results['per_class_metrics'][model_name] = {
+            label: {
+                'precision': float(report[label]['precision']),
+                'recall': float(report[label]['recall']),
+                'f1_score': float(report[label]['f1-score']),
+                'support': int(report[label]['support']),
+            }
+            for label in class_names if label in report
+        }
+        analysis_results['cross_validation']['fold_f1_macro'][model_name] = [
+            float(r['f1_macro']) for r in result['fold_results']
+        ]
+
+    # Najlepszy model (według Balanced Accuracy)
+    if results:
+        best_model_name = max(results, key=lambda k: results[k]['balanced_accuracy'])
+        analysis_results['best_model'] = {'name': best_model_name,
+                                          **analysis_results['model_metrics'][best_model_name]}
+    return analysis_results
+
+
+def save_analysis_results(analysis_results: dict, path) -> Path:
+    """Zapisuje wyniki do JSON (jak notebook 06: indent=2, bez escapowania polskich znaków)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(analysis_results, f, indent=2, ensure_ascii=False)
+    return path
@@ -0,0 +1,202 @@
+"""
+Dostęp zero-copy do sygnałów RespiBAN (700 Hz) przez `np.memmap`.
+
+Każdy kanał z kolumnowego cache (`wesad_cache.py`) udostępniany jest jako
+tablica tylko do odczytu mapowana z pliku. Okna czasowe to widoki
+(`sliding_window_view`) bezpośrednio na mapowaniu, a zmiana częstotliwości
+próbkowania odbywa się kawałkami przez `scipy.signal.resample_poly`, więc
+szczytowe zużycie pamięci zależy od rozmiaru kawałka, a nie od długości sesji.
+
+Użycie:
+    store = MemmapSignalStore("S2", raw_root=RAW_ROOT)
+    ecg = store.channel("ECG")                       # np.memmap (n, 1), 700 Hz
+    windows = store.window_view("ECG", 5.0, 2.5)     # widok (okna, 1, próbki)
+    resp_32hz = store.resample("Resp", 32.0)         # kawałkami, bez FFT całej sesji
+"""
+
+import math
+from fractions import Fraction
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import resample_poly
+
+from wesad_cache import CACHE_ROOT, RAW_ROOT, channel_path, ensure_cached
+
+# Kolumny DataFrame dla kanałów RespiBAN (jak w 04_complete_analysis_sliding_window.ipynb)
+CHEST_COLUMNS = {
+    "ACC": ["chest_acc_x", "chest_acc_y", "chest_acc_z"],
+    "ECG": ["chest_ecg"],
+    "EMG": ["chest_emg"],
+    "EDA": ["chest_eda"],
+    "Temp": ["chest_temp"],
+    "Resp": ["chest_resp"],
+}
+
+TARGET_CHEST_FS = 32.0
+MAX_DURATION_S = 40 * 60
+
+# Domyślny rozmiar kawałka przy resamplingu (w sekundach sygnału źródłowego)
+CHUNK_SECONDS = 60.0
+
+
+def rational_factors(src_fs: float, target_fs: float, max_denominator: int = 1000):
+    """Zwraca (up, down) takie, że target_fs / src_fs ≈ up / down (np. 700 -> 32 Hz: 8/175)."""
+    ratio = Fraction(target_fs / src_fs).limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+
+def resample_chunked(array, src_fs: float, target_fs: float, chunk_seconds: float = CHUNK_SECONDS,
+                     out=None, dtype=np.float64, padtype: str = "constant") -> np.ndarray:
+    """
+    Polifazowa zmiana częstotliwości próbkowania wykonywana kawałkami.
+
+    Kawałki mają długość będącą wielokrotnością `down`, a każdy jest czytany
+    z zakładką równą połowie długości filtra FIR `resample_poly`, więc wynik
+    jest taki sam jak dla `resample_poly` na całym sygnale, ale w pamięci
+    znajduje się naraz tylko jeden kawałek wejścia.
+
+    Args:
+        array: tablica (n,) lub (n, kanały) - np. np.memmap
+        src_fs: częstotliwość źródłowa (Hz)
+        target_fs: częstotliwość docelowa (Hz)
+        chunk_seconds: długość kawałka w sekundach sygnału źródłowego
+        out: opcjonalna tablica wyjściowa (np. np.memmap) o długości ceil(n * up / down)
+        dtype: typ wyniku, gdy `out` nie jest podane
+        padtype: dopełnienie końców sesji w `resample_poly` ("constant" = zera,
+            "edge" = wartości brzegowe, bez opadania do zera na krańcach)
+
+    Returns:
+        tablica (m,) lub (m, kanały)
+    """
+    up, down = rational_factors(src_fs, target_fs)
+    n_in = len(array)
+    n_out = int(math.ceil(n_in * up / down))
+    out_shape = (n_out,) + tuple(array.shape[1:])
+    if out is None:
+        out = np.empty(out_shape, dtype=dtype)
+    elif out.shape != out_shape:
+        raise ValueError(f"Oczekiwano tablicy wyjściowej {out_shape}, otrzymano {out.shape}")
+    if n_in == 0:
+        return out
+    if up == down:
+        step = max(int(chunk_seconds * src_fs), 1)
+        for start in range(0, n_in, step):
+            out[start:start + step] = array[start:start + step]
+        return out
+
+    # Połowa długości filtra resample_poly (w próbkach wejścia), zaokrąglona do wielokrotności down
+    half_len = 10 * max(up, down)
+    pad = int(math.ceil(half_len / up)) + 1
+    pad = int(math.ceil(pad / down)) * down
+    chunk = max(int(chunk_seconds * src_fs) // down, 1) * down
+
+    for start in range(0, n_in, chunk):
+        stop = min(n_in, start + chunk)
+        lo = max(0, start - pad)
+        hi = min(n_in, stop + pad)
+        segment = np.asarray(array[lo:hi], dtype=np.float64)
+        resampled = resample_poly(segment, up, down, axis=0, padtype=padtype)
+        # Indeksy wyjścia odpowiadające [start, stop) - start i lo są wielokrotnościami down
+        skip = (start - lo) * up // down
+        out_start = start * up // down
+        out_stop = n_out if stop == n_in else stop * up // down
+        out[out_start:out_stop] = resampled[skip:skip + (out_stop - out_start)]
+    return out
+
+
+class MemmapSignalStore:
+    """
+    Magazyn sygnałów jednego subjecta oparty na mapowaniu plików .npy.
+
+    Kanały są otwierane leniwie jako `np.memmap` tylko do odczytu; żadna
+    metoda nie kopiuje całego kanału do pamięci.
+    """
+
+    def __init__(self, subject: str, device: str = "chest", raw_root: Path = RAW_ROOT,
+                 cache_root: Path = CACHE_ROOT):
+        self.subject = subject
+        self.device = device
+        self.cache_root = Path(cache_root)
+        meta = ensure_cached(subject, raw_root, cache_root)
+        self._info = meta["channels"].get(device, {})
+        self._maps = {}
+
+    @property
+    def channels(self) -> list:
+        return list(self._info)
+
+    def fs(self, name: str) -> float:
+        return float(self._info[name]["fs"])
+
+    def channel(self, name: str) -> np.memmap:
+        """Zwraca kanał jako np.memmap tylko do odczytu (bez kopiowania)."""
+        if name not in self._info:
+            raise KeyError(f"Brak kanału {self.device}/{name} dla {self.subject}")
+        if name not in self._maps:
+            path = channel_path(self.subject, self.device, name, self.cache_root)
+            self._maps[name] = np.load(path, mmap_mode="r")
+        return self._maps[name]
+
+    def window_view(self, name: str, window_s: float, step_s: float, start: int = 0,
+                    stop: int = None) -> np.ndarray:
+        """
+        Widok okien (okna, [kanały,] próbki) wprost na mapowaniu pliku.
+
+        Nic nie jest czytane z dysku, dopóki konkretne okno nie zostanie użyte.
+        """
+        fs = self.fs(name)
+        window = int(window_s * fs)
+        step = max(int(step_s * fs), 1)
+        data = self.channel(name)[start:stop]
+        if window == 0 or len(data) < window:
+            return np.empty((0,) + data.shape[1:] + (window,), dtype=data.dtype)
+        return sliding_window_view(data, window, axis=0)[::step]
+
+    def resample(self, name: str, target_fs: float, max_samples: int = None,
+                 chunk_seconds: float = CHUNK_SECONDS, out=None) -> np.ndarray:
+        """Resampling kanału kawałkami (opcjonalnie tylko pierwsze `max_samples` próbek)."""
+        data = self.channel(name)
+        if max_samples is not None:
+            data = data[:max_samples]
+        return resample_chunked(data, self.fs(name), target_fs, chunk_seconds=chunk_seconds, out=out)
+
+    def close(self):
+        """Zwalnia mapowania plików."""
+        self._maps.clear()
+
+
+def build_chest_dataframe(subject: str, session_start: pd.Timestamp, raw_root: Path = RAW_ROOT,
+                          cache_root: Path = CACHE_ROOT, target_fs: float = TARGET_CHEST_FS,
+                          max_duration_s: float = MAX_DURATION_S) -> pd.DataFrame:
+    """
+    Buduje DataFrame z sygnałami RespiBAN na siatce `target_fs` (domyślnie 32 Hz).
+
+    Zamiennik `build_chest_dataframe` z notebooków: zamiast wczytywać cały
+    pickle i robić FFT (`scipy.signal.resample`) na całej sesji, każdy kanał
+    czytany jest z mapowania i resamplowany kawałkami. Gdy nagranie jest
+    krótsze niż `max_duration_s`, brakujący koniec wypełniany jest NaN
+    (FFT rozciągało krótszy sygnał na całą siatkę).
+    """
+    store = MemmapSignalStore(subject, "chest", raw_root, cache_root)
+    target_len = int(max_duration_s * target_fs)
+    timestamps = session_start + pd.to_timedelta(np.arange(target_len) / target_fs, unit="s")
+    df = pd.DataFrame({"timestamp": timestamps})
+    for sensor_name, columns in CHEST_COLUMNS.items():
+        if sensor_name not in store.channels:
+            for col in columns:
+                df[col] = np.nan
+            continue
+        expected_len = int(store.fs(sensor_name) * max_duration_s)
+        resampled = store.resample(sensor_name, target_fs, max_samples=expected_len)
+        if resampled.ndim == 1:
+            resampled = resampled[:, None]
+        aligned = np.full((target_len, resampled.shape[1]), np.nan)
+        n = min(target_len, len(resampled))
+        aligned[:n] = resampled[:n]
+        for idx, col in enumerate(columns):
+            df[col] = aligned[:, idx]
+    store.close()
+    return df
@@ -0,0 +1,321 @@
+"""
+Wersjonowany pakiet modelu (scaler + klasyfikator + label encoder + schemat cech) i predykcja wsadowa.
+
+Notebooki zapisywały osobno `label_encoder.pkl`, `scaler.pkl` i
+`best_model_*.pkl`, bez listy cech w kolejności z treningu, a aplikacje
+Streamlit nie liczyły predykcji wcale (gotowa kolumna `regulation_class`
+albo `if selected_subject == "S2"`). Tutaj wszystkie elementy zapisywane są
+razem jako jedna wersja:
+
+    results/models/{nazwa}/{wersja}/bundle.joblib   # model, scaler, label encoder
+    results/models/{nazwa}/{wersja}/schema.json     # cechy, wartości do uzupełniania NaN, klasy
+    results/models/{nazwa}/LATEST                    # numer najnowszej wersji
+
+`ModelBundle.predict_batch` dopasowuje dowolną ramkę cech do schematu
+(NaN -> wartości z treningu), skaluje całą macierz naraz i zwraca klasę,
+pewność i prawdopodobieństwa dla wszystkich wierszy (osób albo okien)
+w jednym wywołaniu modelu. Brak kolumny ze schematu to `MissingFeaturesError`
+(`missing_features` pozwala sprawdzić to wcześniej) - uzupełnienie całej
+cechy medianą z treningu dawałoby pewnie wyglądające, ale puste predykcje.
+
+Model regulacji trenowany jest domyślnie tylko na parametrach reakcji
+(`REACTION_PARAMETERS`), które aplikacja Streamlit liczy z
+`regulacja_emocjonalna_dane.csv`; `--all-features` = wszystkie kolumny
+numeryczne `wesad_features_full.csv`.
+
+Użycie:
+    bundle = fit_model_bundle(X, y, RandomForestClassifier(n_estimators=100, random_state=42),
+                              name="regulation")
+    bundle.save()                                   # nowa wersja + LATEST
+    bundle = load_bundle("regulation")              # najnowsza wersja
+    predictions = bundle.predict_batch(features_df) # kolumny: prediction, confidence, proba_*
+
+lub z terminala (model regulacji z `wesad_features_full.csv`):
+    python wesad_model.py --features wesad_features_full.csv
+    python wesad_model.py --all-features
+"""
+
+import argparse
+import json
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+MODEL_ROOT = Path("results") / "models"
+BUNDLE_FILENAME = "bundle.joblib"
+SCHEMA_FILENAME = "schema.json"
+LATEST_FILENAME = "LATEST"
+
+# Model regulacji emocjonalnej (KROK 6-7 z wesad_full_pro_analysis.ipynb)
+REGULATION_MODEL = "regulation"
+REGULATION_TARGET = "regulation_class"
+REGULATION_EXCLUDED = ["regulation_score"]
+# Parametry reakcji z `regulacja_emocjonalna_dane.csv` (kolumny `{SYGNAŁ}_{parametr}` po pivocie)
+REACTION_PARAMETERS = ["latency_s", "peak_amplitude", "duration_s", "slope", "decay", "auc"]
+
+
+class MissingFeaturesError(ValueError):
+    """Ramka cech nie ma kolumn ze schematu modelu."""
+
+    def __init__(self, missing, n_features):
+        self.missing = list(missing)
+        super().__init__(f"Brak {len(self.missing)} z {n_features} cech modelu: {', '.join(self.missing)}")
+
+
+class ModelBundle:
+    """
+    Model gotowy do predykcji: schemat cech -> uzupełnienie NaN -> scaler -> klasyfikator -> etykiety.
+
+    `fill_values` to jedna wartość dla wszystkich cech albo dict cecha -> wartość
+    (np. mediany z treningu).
+    """
+
+    def __init__(self, model, scaler, label_encoder, feature_names, fill_values=0.0, name: str = "model",
+                 version: str = None, metadata: dict = None):
+        self.model = model
+        self.scaler = scaler
+        self.label_encoder = label_encoder
+        self.feature_names = list(feature_names)
+        if isinstance(fill_values, dict):
+            self.fill_values = np.array([fill_values.get(col, 0.0) for col in self.feature_names], dtype=np.float64)
+        else:
+            self.fill_values = np.full(len(self.feature_names), fill_values, dtype=np.float64)
+        self.name = name
+        self.version = version
+        self.metadata = dict(metadata or {})
+
+    def __repr__(self):
+        return (f"ModelBundle({self.name}, wersja={self.version}, model={type(self.model).__name__}, "
+                f"cechy={len(self.feature_names)}, klasy={self.classes})")
+
+    @property
+    def classes(self) -> list:
+        if self.label_encoder is None:
+            return np.asarray(self.model.classes_).tolist()
+        return [str(c) for c in self.label_encoder.classes_]
+
+    def missing_features(self, features_df: pd.DataFrame) -> list:
+        """Cechy schematu, których nie ma w kolumnach `features_df` (pusta lista = pełne pokrycie)."""
+        return [col for col in self.feature_names if col not in features_df.columns]
+
+    def feature_matrix(self, features_df: pd.DataFrame, scale: bool = True, allow_missing: bool = False) -> np.ndarray:
+        """
+        Cechy w kolejności schematu (NaN -> fill_values), po skalowaniu (`scale`).
+
+        Raises:
+            MissingFeaturesError: gdy brakuje kolumn schematu (chyba że `allow_missing`,
+                wtedy całe kolumny uzupełniane są fill_values)
+        """
+        missing_columns = self.missing_features(features_df)
+        if missing_columns and not allow_missing:
+            raise MissingFeaturesError(missing_columns, len(self.feature_names))
+        values = features_df.reindex(columns=self.feature_names).to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(values)
+        if missing.any():
+            values = np.where(missing, self.fill_values, values)
+        if scale and self.scaler is not None:
+            values = self.scaler.transform(_estimator_input(self.scaler, values, self.feature_names))
+        return values
+
+    def predict_batch(self, features_df: pd.DataFrame, allow_missing: bool = False) -> pd.DataFrame:
+        """
+        Predykcje dla wszystkich wierszy `features_df` jednym wywołaniem modelu.
+
+        Raises:
+            MissingFeaturesError: gdy brakuje kolumn schematu (patrz `feature_matrix`)
+
+        Returns:
+            DataFrame z indeksem `features_df`: `prediction` (etykieta),
+            `confidence` i `proba_{klasa}` (gdy model ma predict_proba)
+        """
+        predictions = pd.DataFrame(index=features_df.index)
+        if not len(features_df):
+            predictions['prediction'] = pd.Series(dtype=object)
+            return predictions
+
+        X = _estimator_input(self.model, self.feature_matrix(features_df, allow_missing=allow_missing),
+                             self.feature_names)
+        if hasattr(self.model, 'predict_proba'):
+            proba = self.model.predict_proba(X)
+            codes = self.model.classes_[np.argmax(proba, axis=1)]
+            predictions['prediction'] = self._decode(codes)
+            predictions['confidence'] = proba.max(axis=1)
+            for j, label in enumerate(self._decode(self.model.classes_)):
+                predictions[f'proba_{label}'] = proba[:, j]
+        else:
+            predictions['prediction'] = self._decode(self.model.predict(X))
+        return predictions
+
+    def _decode(self, codes) -> np.ndarray:
+        codes = np.asarray(codes)
+        if self.label_encoder is None:
+            return codes
+        return self.label_encoder.inverse_transform(codes.astype(np.int64))
+
+    def schema(self) -> dict:
+        return {
+            'name': self.name,
+            'version': self.version,
+            'model': type(self.model).__name__,
+            'feature_names': self.feature_names,
+            'fill_values': self.fill_values.tolist(),
+            'classes': self.classes,
+            'sklearn_version': sklearn.__version__,
+            'metadata': self.metadata,
+        }
+
+    def save(self, root: Path = MODEL_ROOT, version: str = None) -> Path:
+        """
+        Zapisuje pakiet jako nową wersję i ustawia ją jako najnowszą (LATEST).
+
+        Domyślna wersja to znacznik czasu z mikrosekundami; istniejąca wersja
+        nigdy nie jest nadpisywana.
+
+        Returns:
+            katalog wersji
+
+        Raises:
+            FileExistsError: gdy katalog wersji już istnieje
+        """
+        version = version or datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        model_dir = Path(root) / self.name
+        version_dir = model_dir / version
+        model_dir.mkdir(parents=True, exist_ok=True)
+        version_dir.mkdir()
+        self.version = version
+        joblib.dump({'model': self.model, 'scaler': self.scaler, 'label_encoder': self.label_encoder},
+                    version_dir / BUNDLE_FILENAME)
+        with open(version_dir / SCHEMA_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(self.schema(), f, indent=2, ensure_ascii=False)
+        # LATEST podmieniany atomowo - aplikacja nie przeczyta połowy zapisu
+        latest_tmp = model_dir / f"{LATEST_FILENAME}.tmp"
+        latest_tmp.write_text(self.version, encoding='utf-8')
+        latest_tmp.replace(model_dir / LATEST_FILENAME)
+        return version_dir
+
+
+def _estimator_input(estimator, values: np.ndarray, feature_names):
+    """DataFrame z nazwami cech, gdy estymator był trenowany na DataFrame (bez ostrzeżeń sklearn)."""
+    if hasattr(estimator, 'feature_names_in_'):
+        return pd.DataFrame(values, columns=feature_names)
+    return values
+
+
+def latest_version(name: str, root: Path = MODEL_ROOT):
+    """Numer najnowszej wersji modelu `name` albo None, gdy żadna nie została zapisana."""
+    latest = Path(root) / name / LATEST_FILENAME
+    if not latest.exists():
+        return None
+    return latest.read_text(encoding='utf-8').strip() or None
+
+
+def list_versions(name: str, root: Path = MODEL_ROOT) -> list:
+    """Zapisane wersje modelu `name` (od najstarszej)."""
+    model_dir = Path(root) / name
+    if not model_dir.exists():
+        return []
+    return sorted(p.name for p in model_dir.iterdir() if (p / BUNDLE_FILENAME).exists())
+
+
+def load_bundle(name: str, version: str = None, root: Path = MODEL_ROOT) -> ModelBundle:
+    """
+    Wczytuje pakiet modelu (domyślnie najnowszą wersję).
+
+    Raises:
+        FileNotFoundError: gdy model lub wersja nie istnieje
+    """
+    version = version or latest_version(name, root)
+    if version is None:
+        raise FileNotFoundError(f"Brak zapisanego modelu '{name}' w {Path(root).absolute()}")
+    version_dir = Path(root) / name / version
+    if not (version_dir / BUNDLE_FILENAME).exists():
+        raise FileNotFoundError(f"Brak wersji {version} modelu '{name}': {version_dir}")
+    parts = joblib.load(version_dir / BUNDLE_FILENAME)
+    with open(version_dir / SCHEMA_FILENAME, 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+    return ModelBundle(parts['model'], parts['scaler'], parts['label_encoder'], schema['feature_names'],
+                       fill_values=dict(zip(schema['feature_names'], schema['fill_values'])),
+                       name=name, version=version, metadata=schema.get('metadata'))
+
+
+def fit_model_bundle(X: pd.DataFrame, y, model, name: str = "model", fill_values='median',
+                     scale: bool = True, metadata: dict = None) -> ModelBundle:
+    """
+    Trenuje pakiet: uzupełnienie NaN, LabelEncoder, StandardScaler i model.
+
+    Parameters:
+        X: cechy (kolumny = schemat modelu)
+        y: etykiety tekstowe
+        fill_values: 'median' (mediany kolumn X, jak `ml_df.fillna(ml_df.median())`),
+            liczba albo dict cecha -> wartość
+    """
+    if isinstance(fill_values, str) and fill_values == 'median':
+        fill_values = X.median(numeric_only=True).fillna(0.0).to_dict()
+    bundle = ModelBundle(model, StandardScaler() if scale else None, LabelEncoder(), X.columns,
+                         fill_values=fill_values, name=name, metadata=metadata)
+    values = X.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = np.where(np.isnan(values), bundle.fill_values, values)
+    if bundle.scaler is not None:
+        values = bundle.scaler.fit_transform(values)
+    y_encoded = bundle.label_encoder.fit_transform(np.asarray(y).astype(str))
+    model.fit(values, y_encoded)
+    bundle.metadata.setdefault('n_train', int(len(y_encoded)))
+    return bundle
+
+
+def regulation_training_set(pivot_df: pd.DataFrame, reaction_only: bool = True):
+    """
+    (X, y) dla modelu regulacji z tabeli `wesad_features_full.csv` - jak `ml_df` w KROK 6.
+
+    Cechy to kolumny numeryczne bez `regulation_score` i kolumn z samymi NaN;
+    przy `reaction_only` tylko `{SYGNAŁ}_{parametr}` dla `REACTION_PARAMETERS`
+    (to, co aplikacja regulacji ma w swoich danych).
+    """
+    labelled = pivot_df[pivot_df[REGULATION_TARGET].notna()]
+    X = labelled.select_dtypes(include=[np.number]).dropna(axis=1, how='all')
+    X = X.drop(columns=REGULATION_EXCLUDED, errors='ignore')
+    if reaction_only:
+        X = X[[col for col in X.columns if col.split('_', 1)[-1] in REACTION_PARAMETERS]]
+    return X, labelled[REGULATION_TARGET].astype(str)
+
+
+def train_regulation_model(pivot_df: pd.DataFrame, random_state: int = 42, root: Path = MODEL_ROOT,
+                           reaction_only: bool = True, verbose: bool = True) -> ModelBundle:
+    """
+    Trenuje (RandomForest jak w KROK 7) i zapisuje nową wersję modelu regulacji.
+
+    W metadanych zapisywane są osoby ze zbioru treningowego (`subjects`) -
+    predykcje dla nich są in-sample.
+    """
+    X, y = regulation_training_set(pivot_df, reaction_only=reaction_only)
+    subjects = pivot_df.loc[X.index, 'subject'].tolist()
+    bundle = fit_model_bundle(X, y, RandomForestClassifier(n_estimators=100, random_state=random_state),
+                              name=REGULATION_MODEL,
+                              metadata={'subjects': subjects, 'reaction_only': reaction_only})
+    version_dir = bundle.save(root)
+    if verbose:
+        print(f"✅ Model {REGULATION_MODEL} (wersja {bundle.version}, {len(bundle.feature_names)} cech, "
+              f"klasy: {', '.join(bundle.classes)}) zapisany do: {version_dir}")
+    return bundle
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trening i zapis modelu regulacji emocjonalnej")
+    parser.add_argument("--features", type=Path, default=Path("wesad_features_full.csv"))
+    parser.add_argument("--model-root", type=Path, default=MODEL_ROOT)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--all-features", action="store_true",
+                        help="wszystkie cechy numeryczne zamiast parametrów reakcji (REACTION_PARAMETERS)")
+    args = parser.parse_args(argv)
+    train_regulation_model(pd.read_csv(args.features), random_state=args.seed, root=args.model_root,
+                           reaction_only=not args.all_features)
+
+
+if __name__ == "__main__":
+    main()
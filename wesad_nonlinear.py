@@ -0,0 +1,435 @@
+"""
+Cechy nieliniowe (wykładnik Lyapunova, rytmiczność, EMD) na zdecymowanych segmentach - równolegle, z cache.
+
+W analiza_pobudzenia_hamowania.ipynb `compute_lyapunov_exponent` wołał
+`nolds.lyap_r` (macierz odległości wszystkich par wektorów - O(n²) pamięci
+i czasu), `compute_rhythmicity` liczył autokorelację przez
+`np.correlate(..., 'full')` (O(n²)), a EMD (PyEMD) szło na pełnym sygnale.
+Tutaj:
+
+- sygnał jest decymowany z filtrem antyaliasingowym (`decimate_signal` z
+  `wesad_stationarity.py`) i dzielony na segmenty o ograniczonej długości
+  (`segment_s`, najwyżej `max_segments` równomiernie rozłożonych w sesji);
+  każdy segment jest detrendowany i standaryzowany (jak `eda_series` w KROK 8),
+- wykładnik Lyapunova liczony jest metodą Rosensteina jak `nolds.lyap_r`,
+  ale najbliższych sąsiadów szuka drzewo KD (`scipy.spatial.cKDTree`),
+- autokorelacja przez FFT, EMD z PyEMD (opcjonalnie) na segmencie,
+- zadania (subject × sygnał) trafiają do puli procesów
+  (`ProcessPoolExecutor`, jak w `wesad_pipeline.py`), a wyniki (mediany po
+  segmentach) zapisywane są jako JSON - ponowne uruchomienie to odczyt z dysku.
+
+Struktura cache:
+    {root}/{subject}/{sygnał}-{klucz}.json
+
+Użycie w notebooku:
+    from wesad_nonlinear import run_nonlinear_features
+    nonlinear_df = run_nonlinear_features({s: {'eda': d['eda']} for s, d in subjects_data.items()})
+
+lub z terminala (sygnały z kolumnowego cache `wesad_cache.py`):
+    python wesad_nonlinear.py --raw-root "/sciezka/do/WESAD" S2 S3 S4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import signal as spsignal
+from scipy.signal import find_peaks
+from scipy.spatial import cKDTree
+
+from wesad_cache import CACHE_ROOT, RAW_ROOT
+from wesad_stationarity import (SIGNAL_FS, array_fingerprint, clean_series, decimate_signal, json_ready,
+                                load_cohort_signals, segment_bounds)
+
+# EMD (Empirical Mode Decomposition) - opcjonalnie
+try:
+    from PyEMD import EMD
+    EMD_AVAILABLE = True
+except ImportError:
+    EMD_AVAILABLE = False
+
+NONLINEAR_ROOT = Path("results") / "nonlinear"
+FEATURES_VERSION = 1
+
+# Segmenty
+TARGET_FS = 4.0
+SEGMENT_S = 300.0
+MAX_SEGMENTS = 12
+MIN_SEGMENT_SAMPLES = 50  # jak minimum dla nolds.lyap_r w notebooku
+
+# Rosenstein (parametry jak w wywołaniu nolds.lyap_r w notebooku / domyślne nolds)
+LYAP_EMB_DIM = 10
+LYAP_MIN_TSEP = 2
+LYAP_TRAJECTORY_LEN = 20
+LYAP_MIN_NEIGHBORS = 20
+
+# Rytmiczność (jak compute_rhythmicity)
+AUTOCORR_MAX_LAG = 100
+AUTOCORR_PEAK_HEIGHT = 0.3
+
+EMD_MAX_IMFS = 5
+
+FEATURE_COLUMNS = (
+    ['lyapunov_exponent', 'autocorr_max_lag1', 'dominant_period_s', 'dominant_freq_hz', 'emd_n_imfs']
+    + [f'emd_imf{k}_{name}' for k in range(1, EMD_MAX_IMFS + 1) for name in ('energy_ratio', 'freq_hz')]
+)
+
+
+def autocorrelation(x) -> np.ndarray:
+    """
+    Autokorelacja dla opóźnień 0..n-1 przez FFT, znormalizowana do r[0] = 1.
+
+    Równa `np.correlate(x, x, 'full')[n-1:] / r[0]` (bez odejmowania średniej).
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    nfft = 1 << (2 * n - 1).bit_length()
+    spectrum = np.fft.rfft(x, nfft)
+    r = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, nfft)[:n]
+    return r / r[0]
+
+
+def compute_rhythmicity(signal, sampling_hz=4.0):
+    """
+    Oblicza rytmiczność sygnału (autocorrelation, częstotliwość mikro-oscylacji).
+    """
+    x = np.array(signal, dtype=np.float64)
+    autocorr = autocorrelation(x)
+
+    # Znajdź pierwszy peak w autocorrelation (okres dominujący)
+    dominant_period = np.nan
+    dominant_freq = np.nan
+    if len(autocorr) > 10:
+        peaks, _ = find_peaks(autocorr[1:min(AUTOCORR_MAX_LAG, len(autocorr))], height=AUTOCORR_PEAK_HEIGHT)
+        if len(peaks) > 0:
+            dominant_period = (peaks[0] + 1) / sampling_hz  # w sekundach
+            dominant_freq = 1.0 / dominant_period
+
+    return {
+        'autocorr_max_lag1': autocorr[1] if len(autocorr) > 1 else np.nan,
+        'dominant_period_s': dominant_period,
+        'dominant_freq_hz': dominant_freq
+    }
+
+
+def embedding_lag(x, emb_dim: int = LYAP_EMB_DIM, min_tsep: int = LYAP_MIN_TSEP,
+                  trajectory_len: int = LYAP_TRAJECTORY_LEN, min_neighbors: int = LYAP_MIN_NEIGHBORS) -> int:
+    """
+    Opóźnienie zanurzenia jak w `nolds.lyap_r`: pierwsze, dla którego autokorelacja spada
+    poniżej 1 - 1/e albo po którym zostałoby mniej niż `min_neighbors` wektorów do porównań.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    n = len(x)
+    if n < 2:
+        return 1
+    lags = np.arange(1, n)
+    min_len = (emb_dim - 1) * lags + trajectory_len + 2 * min_tsep + 1
+    stop = (autocorrelation(x)[1:] < 1.0 - 1.0 / np.e) | (n - min_len < min_neighbors)
+    return int(lags[np.argmax(stop)]) if stop.any() else n - 1
+
+
+def _nearest_neighbours(orbit: np.ndarray, min_tsep: int) -> np.ndarray:
+    """
+    Najbliższy sąsiad każdego wektora z pominięciem sąsiadów w czasie (|i - j| <= min_tsep).
+
+    Drzewo KD zwraca k najbliższych; wektory, dla których wszystkie k są
+    zbyt blisko w czasie, odpytywane są ponownie z podwojonym k.
+    """
+    n = len(orbit)
+    tree = cKDTree(orbit)
+    neighbours = np.full(n, -1, dtype=np.int64)
+    pending = np.arange(n)
+    k = min(2 * min_tsep + 2, n)
+    while len(pending):
+        _, idx = tree.query(orbit[pending], k=k)
+        idx = idx.reshape(len(pending), -1)
+        valid = (np.abs(idx - pending[:, None]) > min_tsep) & (idx < n)
+        found = valid.any(axis=1)
+        neighbours[pending[found]] = idx[found, np.argmax(valid[found], axis=1)]
+        pending = pending[~found]
+        if k >= n:
+            break
+        k = min(2 * k, n)
+    return neighbours
+
+
+def lyapunov_r(x, emb_dim: int = LYAP_EMB_DIM, lag: int = None, min_tsep: int = LYAP_MIN_TSEP,
+               trajectory_len: int = LYAP_TRAJECTORY_LEN, tau: float = 1.0) -> float:
+    """
+    Największy wykładnik Lyapunova metodą Rosensteina (jak `nolds.lyap_r` z fit='poly').
+
+    Parameters:
+        emb_dim: wymiar zanurzenia
+        lag: opóźnienie zanurzenia (None = `embedding_lag`)
+        min_tsep: minimalna odległość w czasie (w wektorach) między sąsiadami
+        trajectory_len: liczba kroków śledzenia dywergencji
+        tau: odstęp między próbkami (1 = wynik na próbkę)
+
+    Returns:
+        nachylenie średniego log-dystansu od kroku, podzielone przez `tau` (NaN, gdy za mało danych)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if lag is None:
+        lag = embedding_lag(x, emb_dim, min_tsep, trajectory_len)
+    span = (emb_dim - 1) * lag + 1
+    if len(x) < span + trajectory_len:
+        return np.nan
+    orbit = sliding_window_view(x, span)[:, ::lag]
+    ntraj = len(orbit) - trajectory_len + 1
+    if ntraj < 2 * min_tsep + 2:
+        return np.nan
+
+    neighbours = _nearest_neighbours(orbit[:ntraj], min_tsep)
+    origins = np.flatnonzero(neighbours >= 0)
+    if not len(origins):
+        return np.nan
+    partners = neighbours[origins]
+
+    div_traj = np.full(trajectory_len, np.nan)
+    for k in range(trajectory_len):
+        distances = np.linalg.norm(orbit[origins + k] - orbit[partners + k], axis=1)
+        distances = distances[distances > 0]
+        if len(distances):
+            div_traj[k] = np.mean(np.log(distances))
+    steps = np.arange(trajectory_len)
+    finite = np.isfinite(div_traj)
+    if finite.sum() < 2:
+        return np.nan
+    slope = np.polyfit(steps[finite], div_traj[finite], 1)[0]
+    return float(slope / tau)
+
+
+def compute_lyapunov_exponent(signal):
+    """
+    Oblicza wykładnik Lyapunova (miara chaotyczności systemu).
+    """
+    x = np.array(signal, dtype=np.float64)
+    if len(x) < MIN_SEGMENT_SAMPLES:
+        return np.nan
+    try:
+        return lyapunov_r(x, min_tsep=LYAP_MIN_TSEP, tau=1)
+    except Exception:
+        return np.nan
+
+
+def emd_features(x, sampling_hz: float, max_imfs: int = EMD_MAX_IMFS) -> dict:
+    """
+    Cechy EMD segmentu: liczba IMF, udział energii i średnia częstotliwość każdej IMF.
+
+    Częstotliwość IMF to liczba przejść przez zero / (2 × czas trwania).
+    Residuum (trend) jest pomijane. Bez PyEMD wszystkie wartości to NaN.
+    """
+    features = {'emd_n_imfs': np.nan}
+    for k in range(1, max_imfs + 1):
+        features[f'emd_imf{k}_energy_ratio'] = np.nan
+        features[f'emd_imf{k}_freq_hz'] = np.nan
+    if not EMD_AVAILABLE or len(x) <= MIN_SEGMENT_SAMPLES:
+        return features
+    try:
+        imfs = EMD()(np.asarray(x, dtype=np.float64), max_imf=max_imfs)
+    except Exception:
+        return features
+
+    imfs = imfs[:-1] if len(imfs) > 1 else imfs  # ostatni wiersz to residuum
+    imfs = imfs[:max_imfs]
+    energy = np.sum(imfs ** 2, axis=1)
+    total = energy.sum()
+    crossings = np.count_nonzero(np.diff(np.signbit(imfs), axis=1), axis=1)
+    duration_s = len(x) / sampling_hz
+    features['emd_n_imfs'] = float(len(imfs))
+    for k in range(len(imfs)):
+        features[f'emd_imf{k + 1}_energy_ratio'] = float(energy[k] / total) if total > 0 else np.nan
+        features[f'emd_imf{k + 1}_freq_hz'] = float(crossings[k] / (2.0 * duration_s))
+    return features
+
+
+def select_segments(n_samples: int, fs: float, segment_s: float = SEGMENT_S,
+                    max_segments: int = MAX_SEGMENTS) -> list:
+    """Segmenty [start, end) o długości `segment_s`; przy nadmiarze `max_segments` równomiernie z całej sesji."""
+    bounds = segment_bounds(n_samples, fs, segment_s)
+    if max_segments is not None and len(bounds) > max_segments:
+        picks = np.unique(np.round(np.linspace(0, len(bounds) - 1, max_segments)).astype(np.int64))
+        bounds = [bounds[i] for i in picks]
+    return bounds
+
+
+def segment_features(x, sampling_hz: float, emd: bool = True) -> dict:
+    """Cechy nieliniowe jednego segmentu (po detrendzie i standaryzacji)."""
+    x = spsignal.detrend(np.asarray(x, dtype=np.float64))
+    std = x.std()
+    x = x / std if std > 0 else x
+    features = {'lyapunov_exponent': compute_lyapunov_exponent(x), **compute_rhythmicity(x, sampling_hz)}
+    if emd:
+        features.update(emd_features(x, sampling_hz))
+    return features
+
+
+def _run_signal(args):
+    """
+    Zadanie workera: (szereg, fs, segmenty, emd) -> mediany cech po segmentach.
+    """
+    series, fs, bounds, emd = args
+    rows = [segment_features(series[start:end], fs, emd) for start, end in bounds
+            if end - start >= MIN_SEGMENT_SAMPLES]
+    summary = {'n_segments': len(rows), 'fs': fs}
+    if not rows:
+        summary.update({column: np.nan for column in FEATURE_COLUMNS})
+        return summary
+    table = pd.DataFrame(rows).reindex(columns=FEATURE_COLUMNS)
+    summary.update({column: float(value) for column, value in table.median(skipna=True).items()})
+    return summary
+
+
+def nonlinear_config(target_fs: float, segment_s: float, max_segments: int, emd: bool) -> dict:
+    """Parametry liczenia cech (część klucza w cache)."""
+    return {
+        'version': FEATURES_VERSION,
+        'target_fs': target_fs,
+        'segment_s': segment_s,
+        'max_segments': max_segments,
+        'lyapunov': [LYAP_EMB_DIM, LYAP_MIN_TSEP, LYAP_TRAJECTORY_LEN],
+        'emd': [EMD_MAX_IMFS] if emd and EMD_AVAILABLE else None,
+    }
+
+
+def result_key(subject: str, signal: str, config: dict, fingerprint: str) -> str:
+    """Klucz wyniku (SHA-1 z subjecta, sygnału, parametrów i odcisku danych)."""
+    payload = {'subject': subject, 'signal': signal, 'config': config, 'data': fingerprint}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class NonlinearCache:
+    """Cechy nieliniowe (subject × sygnał) na dysku, po jednym pliku JSON na klucz."""
+
+    def __init__(self, root=NONLINEAR_ROOT):
+        self.root = Path(root)
+
+    def _path(self, subject: str, signal: str, key: str) -> Path:
+        return self.root / subject / f"{signal}-{key}.json"
+
+    def get(self, subject: str, signal: str, key: str):
+        """Słownik cech albo None, gdy wyniku nie ma w cache."""
+        path = self._path(subject, signal, key)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as handle:
+            features = json.load(handle)['features']
+        return {name: np.nan if value is None else value for name, value in features.items()}
+
+    def put(self, subject: str, signal: str, key: str, features: dict):
+        """Zapisuje wynik atomowo (plik tymczasowy + os.replace)."""
+        path = self._path(subject, signal, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            # NaN zapisywane jako null
+            json.dump({'subject': subject, 'signal': signal, 'key': key,
+                       'features': json_ready(features)}, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def run_nonlinear_features(all_signals: dict, sampling_rates: dict = None, signals=('eda',),
+                           target_fs: float = TARGET_FS, segment_s: float = SEGMENT_S,
+                           max_segments: int = MAX_SEGMENTS, emd: bool = True, fingerprints: dict = None,
+                           n_workers: int = None, cache_root=NONLINEAR_ROOT, verbose: bool = True) -> pd.DataFrame:
+    """
+    Cechy nieliniowe dla wszystkich osób i wybranych sygnałów.
+
+    Parameters:
+        all_signals: {subject: {sygnał: tablica}}
+        sampling_rates: sygnał -> fs (domyślnie SIGNAL_FS; brak wpisu = 1 Hz)
+        signals: które sygnały liczyć (None = wszystkie z `all_signals`)
+        target_fs: decymacja z filtrem antyaliasingowym (None = bez decymacji)
+        segment_s, max_segments: długość i maksymalna liczba segmentów
+        emd: czy liczyć cechy EMD (wymaga PyEMD)
+        fingerprints: {(subject, sygnał): odcisk danych}; bez wpisu liczony SHA-1 danych
+        n_workers: liczba procesów (None = liczba rdzeni, 1 = bez puli procesów)
+        cache_root: katalog cache wyników (None = bez cache)
+
+    Returns:
+        DataFrame z wierszem na (subject, sygnał): `lyapunov_exponent`,
+        `autocorr_max_lag1`, `dominant_period_s`, `dominant_freq_hz`, `emd_*`
+        (mediany po segmentach), `n_segments`, `fs`
+    """
+    if emd and not EMD_AVAILABLE and verbose:
+        print("⚠️ PyEMD nie jest dostępne - cechy EMD będą NaN (pip install EMD-signal)")
+    sampling_rates = SIGNAL_FS if sampling_rates is None else sampling_rates
+    fingerprints = fingerprints or {}
+    config = nonlinear_config(target_fs, segment_s, max_segments, emd)
+    cache = NonlinearCache(cache_root) if cache_root is not None else None
+
+    jobs, results, order = [], {}, []
+    for subject, subject_signals in all_signals.items():
+        for signal_name, signal_data in subject_signals.items():
+            if signals is not None and signal_name not in signals:
+                continue
+            if signal_data is None or len(signal_data) == 0:
+                continue
+            order.append((subject, signal_name))
+            fingerprint = fingerprints.get((subject, signal_name)) or array_fingerprint(signal_data)
+            key = result_key(subject, signal_name, config, fingerprint)
+            cached = cache.get(subject, signal_name, key) if cache is not None else None
+            if cached is not None:
+                results[(subject, signal_name)] = cached
+                continue
+            fs = float(sampling_rates.get(signal_name, 1.0))
+            series, new_fs = decimate_signal(clean_series(signal_data), fs, target_fs)
+            bounds = select_segments(len(series), new_fs, segment_s, max_segments)
+            jobs.append(((subject, signal_name, key), (series, new_fs, bounds, emd and EMD_AVAILABLE)))
+
+    if jobs:
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = max(1, min(n_workers, len(jobs)))
+        tasks = [task for _, task in jobs]
+        if n_workers == 1:
+            outputs = [_run_signal(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                outputs = list(executor.map(_run_signal, tasks))
+        for (subject, signal_name, key), features in zip([job for job, _ in jobs], outputs):
+            results[(subject, signal_name)] = features
+            if cache is not None:
+                cache.put(subject, signal_name, key, features)
+    if verbose:
+        print(f"✅ Cechy nieliniowe: {len(order)} sygnałów, policzono {len(jobs)}, z cache {len(order) - len(jobs)}")
+
+    rows = [{'subject': subject, 'signal': signal_name, **results[(subject, signal_name)]}
+            for subject, signal_name in order]
+    return pd.DataFrame(rows, columns=['subject', 'signal', *FEATURE_COLUMNS, 'n_segments', 'fs'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cechy nieliniowe (Lyapunov, rytmiczność, EMD) dla osób WESAD")
+    parser.add_argument("subjects", nargs="+", help="np. S2 S3 S4")
+    parser.add_argument("--raw-root", type=Path, default=RAW_ROOT)
+    parser.add_argument("--cache-root", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--signals", nargs="+", default=['eda'])
+    parser.add_argument("--target-fs", type=float, default=TARGET_FS, help="decymacja do tej częstotliwości (0 = bez)")
+    parser.add_argument("--segment-s", type=float, default=SEGMENT_S)
+    parser.add_argument("--max-segments", type=int, default=MAX_SEGMENTS)
+    parser.add_argument("--no-emd", action="store_true", help="pomiń EMD")
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--results-root", type=Path, default=NONLINEAR_ROOT)
+    parser.add_argument("--output", type=Path, default=Path("results") / "nonlinear_features.csv")
+    args = parser.parse_args(argv)
+
+    all_signals, fingerprints = load_cohort_signals(args.subjects, args.raw_root, args.cache_root, args.signals)
+    features_df = run_nonlinear_features(
+        all_signals, signals=args.signals, target_fs=args.target_fs or None, segment_s=args.segment_s,
+        max_segments=args.max_segments, emd=not args.no_emd, fingerprints=fingerprints,
+        n_workers=args.workers, cache_root=args.results_root
+    )
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    features_df.to_csv(args.output, index=False)
+    print(f"✅ Zapisano do: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Równoległa ekstrakcja cech per subject (KROK 4-6 z wesad_full_pro_analysis.ipynb).
+
+Subjecty są od siebie niezależne, więc każdy trafia do osobnego procesu
+(`ProcessPoolExecutor`). Do procesu przekazywany jest tylko identyfikator
+subjecta i ścieżki - sygnały worker czyta sam z kolumnowego cache
+(`wesad_cache.py`, pliki .npy mapowane w pamięci), a z powrotem wraca
+lista słowników z cechami. Wyniki łączone są w kolejności z listy
+subjectów, więc `wesad_features_full.csv` jest identyczny niezależnie
+od liczby procesów.
+
+Z magazynem cech (`wesad_feature_store.py`, domyślnie włączony) worker
+liczy tylko nieaktualne bloki (subject × sygnał), a resztę czyta z dysku.
+
+Użycie:
+    from wesad_pipeline import run_feature_pipeline
+    pivot_df = run_feature_pipeline(SELECTED_SUBJECTS, raw_root=RAW_ROOT, n_workers=4)
+
+lub z terminala:
+    python wesad_pipeline.py --raw-root "/sciezka/do/WESAD" --workers 4 S2 S3 S4
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from wesad_cache import CACHE_ROOT, RAW_ROOT, ensure_cached, load_channel
+from wesad_feature_store import FEATURE_STORE_ROOT, SIGNALS, FeatureStore, block_key
+from wesad_features import build_feature_table, extract_signal_features
+from wesad_labels import load_label_index
+
+OUTPUT_CSV = Path("wesad_features_full.csv")
+
+
+def load_subject_signals(subject, raw_root=RAW_ROOT, cache_root=CACHE_ROOT, channels=SIGNALS):
+    """
+    Wczytuje sygnały nadgarstka i indeksy faz jednej osoby z cache.
+
+    Parameters:
+        channels: które kanały wczytać (pozostałe nie są w ogóle czytane z dysku)
+
+    Returns:
+        dict z kluczami 'eda', 'bvp', 'temp', 'phase_indices' (jak `subjects_data` w notebooku;
+        'phase_indices' to `wesad_labels.LabelIndex`)
+    """
+    signals = {}
+    for key, channel in (('eda', 'EDA'), ('bvp', 'BVP'), ('temp', 'TEMP')):
+        if channel not in channels:
+            signals[key] = np.array([])
+            continue
+        try:
+            array, _ = load_channel(subject, 'wrist', channel, raw_root, cache_root)
+            signals[key] = np.asarray(array, dtype=np.float64).flatten()
+        except KeyError:
+            signals[key] = np.array([])
+    try:
+        # Odcinki etykiet (wesad_labels) zamiast np.where na wektorze 700 Hz
+        signals['phase_indices'] = load_label_index(subject, raw_root, cache_root)
+    except KeyError:
+        signals['phase_indices'] = None
+    return signals
+
+
+def _extract_subject(args):
+    """
+    Zadanie workera: (subject, raw_root, cache_root, store_root) -> (subject, wiersze, przeliczone, błąd).
+
+    Przy `store_root` liczone są tylko sygnały bez aktualnego bloku w magazynie.
+    """
+    subject, raw_root, cache_root, store_root = args
+    try:
+        source = ensure_cached(subject, raw_root, cache_root).get('source')
+        store = FeatureStore(store_root) if store_root is not None else None
+        stale = store.stale_signals(subject, source) if store is not None else list(SIGNALS)
+
+        rows = {}
+        if stale:
+            data = load_subject_signals(subject, raw_root, cache_root, channels=stale)
+            for signal in stale:
+                row = extract_signal_features(subject, signal, data[signal.lower()], data['phase_indices'])
+                rows[signal] = row
+                if store is not None:
+                    store.put(subject, signal, block_key(subject, signal, source), row)
+        if store is not None:
+            for signal in SIGNALS:
+                if signal not in rows:
+                    rows[signal] = store.get(subject, signal, block_key(subject, signal, source))[1]
+
+        ordered = [rows[signal] for signal in SIGNALS if rows.get(signal) is not None]
+        return subject, ordered, stale, None
+    except Exception as e:
+        return subject, [], [], f"{type(e).__name__}: {e}"
+
+
+def extract_features_parallel(subjects, raw_root=RAW_ROOT, cache_root=CACHE_ROOT, n_workers=None,
+                              store_root=FEATURE_STORE_ROOT, verbose=True):
+    """
+    Ekstrahuje cechy dla wielu osób równolegle.
+
+    Parameters:
+        subjects: lista subjectów, np. ["S2", "S3"]
+        n_workers: liczba procesów (None = liczba rdzeni, 1 = bez puli procesów)
+        store_root: katalog magazynu cech (None = zawsze licz od zera)
+
+    Returns:
+        lista słowników z cechami (jak `all_features` w notebooku), w kolejności `subjects`
+    """
+    subjects = list(subjects)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(subjects)))
+    store_root = Path(store_root) if store_root is not None else None
+    tasks = [(subject, Path(raw_root), Path(cache_root), store_root) for subject in subjects]
+
+    if n_workers == 1:
+        results = [_extract_subject(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            # map zachowuje kolejność zadań - deterministyczne scalanie
+            results = list(executor.map(_extract_subject, tasks))
+
+    all_features = []
+    for subject, rows, recomputed, error in results:
+        if error is not None:
+            if verbose:
+                print(f"  ❌ Błąd podczas przetwarzania {subject}: {error}")
+            continue
+        if verbose:
+            status = f"przeliczono {', '.join(recomputed)}" if recomputed else "z magazynu cech"
+            print(f"  ✅ {subject}: {len(rows)} wierszy cech ({status})")
+        all_features.extend(rows)
+    return all_features
+
+
+def run_feature_pipeline(subjects, raw_root=RAW_ROOT, cache_root=CACHE_ROOT, n_workers=None,
+                         store_root=FEATURE_STORE_ROOT, output_csv=OUTPUT_CSV, verbose=True):
+    """
+    Pełny pipeline: ekstrakcja cech (równolegle) -> pivot -> `wesad_features_full.csv`.
+
+    Returns:
+        pivot_df w schemacie `wesad_features_full.csv`
+    """
+    all_features = extract_features_parallel(
+        subjects, raw_root=raw_root, cache_root=cache_root, n_workers=n_workers,
+        store_root=store_root, verbose=verbose
+    )
+    if not all_features:
+        raise RuntimeError("Brak wyekstrahowanych cech - sprawdź ścieżki do danych.")
+    pivot_df = build_feature_table(all_features)
+    if output_csv is not None:
+        pivot_df.to_csv(output_csv, index=False)
+        if verbose:
+            print(f"✅ Zapisano do: {output_csv}")
+    return pivot_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Równoległa ekstrakcja cech WESAD")
+    parser.add_argument("subjects", nargs="+", help="np. S2 S3 S4")
+    parser.add_argument("--raw-root", type=Path, default=RAW_ROOT)
+    parser.add_argument("--cache-root", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--store-root", type=Path, default=FEATURE_STORE_ROOT)
+    parser.add_argument("--no-store", action="store_true", help="licz wszystkie cechy od zera")
+    parser.add_argument("--output", type=Path, default=OUTPUT_CSV)
+    args = parser.parse_args(argv)
+    run_feature_pipeline(args.subjects, raw_root=args.raw_root, cache_root=args.cache_root,
+                         n_workers=args.workers, store_root=None if args.no_store else args.store_root,
+                         output_csv=args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Filtracja i preprocessing sygnałów WESAD (KROK 2 z wesad_full_pro_analysis.ipynb).
+
+Funkcje przeniesione z notebooka bez zmian w zachowaniu, żeby można je było
+importować w procesach roboczych pipeline'u (`wesad_pipeline.py`).
+
+Filtry projektowane są raz w postaci SOS (`design_sos`, cache) i stosowane
+przez `sosfiltfilt` na całym bloku próbki × kanały; `StreamingFilter`
+filtruje przyczynowo kawałkami ze stanem `zi`.
+
+Czyszczenie artefaktów jest wektorowe (`np.maximum.accumulate` zamiast pętli
+po próbkach), a `detect_artifacts_robust` / `ArtifactCleaner` wykrywają
+artefakty lokalnie (mediana/MAD per blok), więc działają też na strumieniu.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+
+# Parametry filtracji
+EDA_LOWPASS_HZ = 1.0
+BVP_LOWPASS_HZ = 4.0
+BVP_BANDPASS_LOW = 0.5
+BVP_BANDPASS_HIGH = 8.0
+
+# Parametry baseline
+BASELINE_DURATION_S = 30
+
+# Parametry wykrywania artefaktów
+ARTIFACT_THRESHOLD_SD = 5.0  # 5 SD = artefakt
+ROBUST_WINDOW_S = 10.0  # blok dla mediany/MAD
+ARTIFACT_CHUNK_S = 600.0  # kawałek sygnału przetwarzany naraz
+MAD_TO_SD = 1.4826
+
+
+def butter_lowpass(cutoff, fs, order=4):
+    """Tworzy filtr Butterworth low-pass"""
+    nyquist = 0.5 * fs
+    normal_cutoff = cutoff / nyquist
+    b, a = butter(order, normal_cutoff, btype='low', analog=False)
+    return b, a
+
+def butter_bandpass(lowcut, highcut, fs, order=4):
+    """Tworzy filtr Butterworth band-pass"""
+    nyquist = 0.5 * fs
+    low = lowcut / nyquist
+    high = highcut / nyquist
+    b, a = butter(order, [low, high], btype='band', analog=False)
+    return b, a
+
+@lru_cache(maxsize=64)
+def _design_sos(btype, cutoff, fs, order):
+    nyquist = 0.5 * fs
+    if isinstance(cutoff, tuple):
+        wn = [c / nyquist for c in cutoff]
+    else:
+        wn = cutoff / nyquist
+    sos = butter(order, wn, btype=btype, analog=False, output='sos')
+    sos.flags.writeable = False  # chroni współdzieloną kopię z cache
+    return sos
+
+def design_sos(btype, cutoff, fs, order=4):
+    """
+    Filtr Butterwortha w postaci SOS, zapamiętany po (typ, odcięcie, fs, rząd).
+
+    Args:
+        btype: 'low', 'high' lub 'band'
+        cutoff: częstotliwość odcięcia (Hz) lub (low, high) dla 'band'
+    """
+    if np.ndim(cutoff):
+        cutoff = tuple(float(c) for c in cutoff)
+    else:
+        cutoff = float(cutoff)
+    return _design_sos(btype, cutoff, float(fs), int(order)).copy()
+
+def zero_phase_filter(signals, btype, cutoff, fs, order=4, axis=0):
+    """
+    Filtracja zerofazowa (`sosfiltfilt`) całego bloku naraz.
+
+    `signals` może być sygnałem 1-D albo macierzą (próbki × kanały) -
+    wszystkie kanały filtrowane są jednym wywołaniem wzdłuż `axis`.
+    """
+    sos = design_sos(btype, cutoff, fs, order)
+    return sosfiltfilt(sos, signals, axis=axis)
+
+class StreamingFilter:
+    """
+    Przyczynowa filtracja kawałkami (`sosfilt` ze stanem `zi`).
+
+    Wynik dla sygnału podanego w kawałkach jest taki sam jak `sosfilt` na
+    całości. Stan startowy ustawiany jest na pierwszej próbce (jak przy
+    stanie ustalonym), żeby nie było skoku na początku strumienia.
+    """
+
+    def __init__(self, btype, cutoff, fs, order=4):
+        self.sos = design_sos(btype, cutoff, fs, order)
+        self._zi = None
+
+    def process(self, chunk, axis=0):
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.shape[axis] == 0:
+            return chunk
+        if self._zi is None:
+            zi = sosfilt_zi(self.sos)  # (sekcje, 2)
+            first = np.take(chunk, 0, axis=axis)
+            shape = [zi.shape[0]] + [1] * chunk.ndim
+            shape[axis + 1] = 2
+            self._zi = zi.reshape(shape) * np.expand_dims(first, axis=(0, axis + 1))
+        filtered, self._zi = sosfilt(self.sos, chunk, axis=axis, zi=self._zi)
+        return filtered
+
+    def reset(self):
+        self._zi = None
+
+def lowpass_filter(signal, cutoff_hz, sampling_hz, order=4):
+    """Aplikuje filtr low-pass do sygnału (1-D lub próbki × kanały)"""
+    if len(signal) < order * 3:
+        return signal
+    try:
+        return zero_phase_filter(signal, 'low', cutoff_hz, sampling_hz, order)
+    except Exception:
+        return signal
+
+def bandpass_filter(signal, lowcut_hz, highcut_hz, sampling_hz, order=4):
+    """Aplikuje filtr band-pass do sygnału (1-D lub próbki × kanały)"""
+    if len(signal) < order * 3:
+        return signal
+    try:
+        return zero_phase_filter(signal, 'band', (lowcut_hz, highcut_hz), sampling_hz, order)
+    except Exception:
+        return signal
+
+def moving_average(signal, window_size):
+    """
+    Średnia krocząca jak `np.convolve(signal, ones(w) / w, mode='same')`, ale w O(n).
+
+    Suma okna to różnica sum skumulowanych na jego krańcach, więc koszt nie
+    zależy od `window_size` (okno 10 s tonic EDA). Sygnał jest centrowany przed
+    sumowaniem (mniejszy błąd zaokrągleń na długich sesjach), a okna
+    z wartościami nieskończonymi/NaN dają NaN - jak przy splocie.
+    """
+    values = np.asarray(signal, dtype=np.float64)
+    n = len(values)
+    finite = np.isfinite(values)
+    all_finite = finite.all()
+    offset = float(values[finite].mean()) if finite.any() else 0.0
+    centered = values - offset if all_finite else np.where(finite, values - offset, 0.0)
+    cumulative = np.concatenate([[0.0], np.cumsum(centered)])
+    positions = np.arange(n)
+    hi = np.minimum(n, positions + (window_size - 1) // 2 + 1)
+    lo = np.maximum(0, positions - window_size // 2)
+    # Brzegi jak w trybie 'same': brakujące próbki liczone jako zera
+    smoothed = (cumulative[hi] - cumulative[lo] + offset * (hi - lo)) / window_size
+    if not all_finite:
+        bad = np.concatenate([[0], np.cumsum(~finite)])
+        smoothed[bad[hi] - bad[lo] > 0] = np.nan
+    return smoothed
+
+def smooth_signal(signal, window_size=5):
+    """Wygładza sygnał używając moving average"""
+    if len(signal) < window_size:
+        return signal
+    return moving_average(signal, window_size)
+
+def compute_baseline(signal, baseline_duration_s, sampling_hz):
+    """Oblicza baseline (średnia i SD) z pierwszych N sekund sygnału"""
+    baseline_samples = int(baseline_duration_s * sampling_hz)
+    baseline_samples = min(baseline_samples, len(signal))
+    
+    if baseline_samples == 0:
+        return np.nan, np.nan, np.array([])
+    
+    baseline_segment = np.asarray(signal[:baseline_samples])
+    baseline_mean = float(np.mean(baseline_segment))
+    baseline_std = float(np.std(baseline_segment))
+    baseline_indices = np.arange(baseline_samples)
+    
+    return baseline_mean, baseline_std, baseline_indices
+
+def correct_baseline(signal, baseline_mean, normalize=False, baseline_std=None):
+    """Korekta sygnału względem baseline"""
+    corrected = signal - baseline_mean
+    if normalize and baseline_std is not None and baseline_std > 0:
+        corrected = corrected / baseline_std
+    return corrected
+
+def detect_artifacts(signal, threshold_sd=5.0):
+    """Wykrywa artefakty w sygnale (duże skoki, wartości nierealistyczne)"""
+    signal_array = np.asarray(signal)
+    mean_val = np.mean(signal_array)
+    std_val = np.std(signal_array)
+    if std_val == 0:
+        return np.zeros(len(signal_array), dtype=bool)
+    artifact_mask = np.abs(signal_array - mean_val) > (threshold_sd * std_val)
+    return artifact_mask
+
+def forward_fill(signal, artifact_mask, initial=np.nan):
+    """
+    Zastępuje próbki z maską ostatnią poprawną wartością (bez pętli po próbkach).
+
+    Indeks ostatniej poprawnej próbki to `np.maximum.accumulate` po indeksach
+    z wyzerowanymi (-1) pozycjami artefaktów. Artefakty przed pierwszą
+    poprawną próbką dostają `initial` (np. ostatnią wartość poprzedniego kawałka).
+    """
+    values = np.asarray(signal)
+    if not np.issubdtype(values.dtype, np.floating):
+        values = values.astype(np.float64)
+    mask = np.asarray(artifact_mask, dtype=bool)
+    idx = np.where(mask, -1, np.arange(len(values)))
+    np.maximum.accumulate(idx, out=idx)
+    filled = values[np.maximum(idx, 0)]
+    filled[idx < 0] = initial
+    return filled
+
+def backward_fill(signal):
+    """Wypełnia NaN następną poprawną wartością (jak `pd.Series.bfill`)."""
+    values = np.asarray(signal)
+    n = len(values)
+    idx = np.where(np.isnan(values), n, np.arange(n))
+    idx = np.minimum.accumulate(idx[::-1])[::-1]
+    filled = np.append(values, np.nan)[idx]
+    return filled.astype(values.dtype, copy=False)
+
+def interpolate_gaps(signal, artifact_mask=None):
+    """
+    Interpolacja liniowa NaN i próbek z maską (jak `pd.Series.interpolate()`).
+
+    NaN na początku zostają, końcowe przyjmują ostatnią poprawną wartość.
+    """
+    values = np.asarray(signal)
+    values = values.copy() if np.issubdtype(values.dtype, np.floating) else values.astype(np.float64)
+    if artifact_mask is not None:
+        values[np.asarray(artifact_mask, dtype=bool)] = np.nan
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return values
+    positions = np.arange(len(values))
+    valid = ~missing
+    values[missing] = np.interp(positions[missing], positions[valid], values[valid])
+    values[:np.argmax(valid)] = np.nan
+    return values
+
+def remove_artifacts(signal, artifact_mask, method='forward_fill'):
+    """Usuwa artefakty z sygnału"""
+    cleaned = np.asarray(signal).copy()
+    if method == 'forward_fill':
+        cleaned = backward_fill(forward_fill(cleaned, artifact_mask))
+    elif method == 'interpolate':
+        cleaned = interpolate_gaps(cleaned, artifact_mask)
+    return cleaned
+
+def detect_artifacts_robust(signal, sampling_hz, window_s=ROBUST_WINDOW_S, threshold_sd=ARTIFACT_THRESHOLD_SD,
+                            chunk_s=ARTIFACT_CHUNK_S):
+    """
+    Wykrywa artefakty względem lokalnej mediany i MAD zamiast globalnej średniej/SD.
+
+    Sygnał dzielony jest na bloki `window_s` sekund; próbka jest artefaktem,
+    gdy |x - mediana bloku| > threshold_sd × 1.4826 × MAD bloku (1.4826·MAD ≈ SD
+    dla rozkładu normalnego). Bloki są niezależne, więc sygnał przetwarzany
+    jest kawałkami po `chunk_s` sekund (ograniczona pamięć), a wynik jest
+    taki sam jak dla `ArtifactCleaner` karmionego strumieniem.
+
+    Returns:
+        maska bool (True = artefakt)
+    """
+    values = np.asarray(signal, dtype=np.float64)
+    block = max(int(window_s * sampling_hz), 1)
+    chunk = max(int(chunk_s * sampling_hz) // block, 1) * block
+    mask = np.zeros(len(values), dtype=bool)
+    for start in range(0, len(values), chunk):
+        mask[start:start + chunk] = _robust_block_mask(values[start:start + chunk], block, threshold_sd)
+    return mask
+
+def _robust_block_mask(values, block, threshold_sd):
+    """Maska artefaktów dla kolejnych bloków `block` próbek (ostatni może być krótszy)."""
+    mask = np.zeros(len(values), dtype=bool)
+    n_full = len(values) // block * block
+    parts = [(0, n_full, values[:n_full].reshape(-1, block))]
+    if n_full < len(values):
+        parts.append((n_full, len(values), values[n_full:].reshape(1, -1)))
+    for start, stop, blocks in parts:
+        if blocks.size == 0:
+            continue
+        median = np.nanmedian(blocks, axis=1, keepdims=True)
+        deviation = np.abs(blocks - median)
+        mad = MAD_TO_SD * np.nanmedian(deviation, axis=1, keepdims=True)
+        with np.errstate(invalid='ignore'):
+            mask[start:stop] = ((deviation > threshold_sd * mad) & (mad > 0)).ravel()
+    return mask
+
+class ArtifactCleaner:
+    """
+    Strumieniowe czyszczenie artefaktów: detekcja mediana/MAD per blok + forward fill.
+
+    `push(chunk)` zwraca oczyszczone próbki wszystkich pełnych bloków
+    (opóźnienie co najwyżej jeden blok), `flush()` - resztę. Forward fill
+    przenosi ostatnią poprawną wartość między kawałkami.
+    """
+
+    def __init__(self, sampling_hz, window_s=ROBUST_WINDOW_S, threshold_sd=ARTIFACT_THRESHOLD_SD):
+        self.block = max(int(window_s * sampling_hz), 1)
+        self.threshold_sd = threshold_sd
+        self._pending = np.empty(0)
+        self._last_valid = np.nan
+
+    def _clean(self, values):
+        mask = _robust_block_mask(values, self.block, self.threshold_sd)
+        cleaned = forward_fill(values, mask, initial=self._last_valid)
+        if (~mask).any():
+            self._last_valid = values[~mask][-1]
+        return cleaned
+
+    def push(self, chunk):
+        values = np.concatenate([self._pending, np.asarray(chunk, dtype=np.float64).ravel()])
+        n_full = len(values) // self.block * self.block
+        self._pending = values[n_full:]
+        return self._clean(values[:n_full])
+
+    def flush(self):
+        values, self._pending = self._pending, np.empty(0)
+        return self._clean(values)
+
+def unify_signal_length(signals_dict, target_length=None):
+    """Ujednolica długość sygnałów"""
+    lengths = [len(sig) for sig in signals_dict.values() if len(sig) > 0]
+    if len(lengths) == 0:
+        return signals_dict, 0
+    if target_length is None:
+        target_length = min(lengths)
+    unified = {}
+    for key, signal in signals_dict.items():
+        signal_array = np.asarray(signal)
+        if len(signal_array) > target_length:
+            unified[key] = signal_array[:target_length]
+        elif len(signal_array) < target_length:
+            last_val = signal_array[-1] if len(signal_array) > 0 else 0
+            extended = np.pad(signal_array, (0, target_length - len(signal_array)), 
+                            mode='constant', constant_values=last_val)
+            unified[key] = extended
+        else:
+            unified[key] = signal_array
+    return unified, target_length
@@ -0,0 +1,380 @@
+"""
+Przyrostowe statystyki okna przesuwnego (push/pop w O(1) na próbkę).
+
+Cechy z 07_klasyfikacja_emocji_timeseries.ipynb (`compute_rms`,
+`compute_kurtosis`, `compute_skewness`, `compute_rmssd`, `compute_slope`)
+liczone są tam od zera dla każdego okna, mimo że kolejne okna dzielą
+większość próbek. `RollingStats` przechowuje zamiast tego sumy bieżące:
+
+- momenty centralne M2, M3, M4 i średnią (scalanie/odejmowanie bloków wzorami
+  Pébaya, czyli uogólnienie Welforda na całe kawałki próbek),
+- sumę kwadratów kolejnych różnic (RMSSD),
+- sumy Σy i Σi·y do nachylenia prostej najmniejszych kwadratów.
+
+Dołożenie lub usunięcie k próbek kosztuje O(k), więc okno przesuwane
+o `step` kosztuje O(step) zamiast O(window). Co `refresh_every` usuniętych
+próbek sumy są przeliczane dokładnie z bufora, żeby błąd zaokrągleń się
+nie kumulował.
+
+Użycie:
+    stats = RollingStats(capacity=WINDOW_SIZE)
+    stats.push(signal[:WINDOW_SIZE])
+    stats.push(signal[WINDOW_SIZE:WINDOW_SIZE + STEP_SIZE])   # najstarsze wypadają same
+    stats.kurtosis(), stats.rmssd(), stats.slope()
+
+    features_df = rolling_window_features(signal, WINDOW_SIZE, STEP_SIZE)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Cechy liczone przez RollingStats (nazwy jak w extract_features_from_window)
+ROLLING_FEATURES = ('mean', 'std', 'rms', 'kurtosis', 'skewness', 'rmssd', 'slope')
+
+# Odchylenie poniżej tego progu (względem |średniej|) traktowane jest jak zero
+_ZERO_STD_RTOL = 1e-12
+
+
+class RingBuffer:
+    """Bufor pierścieniowy o stałej pojemności na tablicy numpy."""
+
+    def __init__(self, capacity: int, dtype=np.float64):
+        self.capacity = max(int(capacity), 1)
+        self._data = np.zeros(self.capacity, dtype=dtype)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index: int):
+        """Próbka na pozycji `index` licząc od najstarszej (ujemne od najnowszej)."""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("RingBuffer index out of range")
+        return self._data[(self._start + index) % self.capacity]
+
+    @property
+    def full(self) -> bool:
+        return self._size == self.capacity
+
+    def push(self, values) -> np.ndarray:
+        """
+        Dopisuje próbki i zwraca próbki wypchnięte z bufora (najstarsze).
+
+        Działa wektorowo - koszt zależy od liczby nowych próbek.
+        """
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        if len(values) >= self.capacity:
+            evicted = np.concatenate([self.values(), values[:-self.capacity]])
+            self._data[:] = values[-self.capacity:]
+            self._start = 0
+            self._size = self.capacity
+            return evicted
+
+        n_evict = max(0, self._size + len(values) - self.capacity)
+        evicted = self._take(self._start, n_evict)
+        end = (self._start + self._size) % self.capacity
+        first = min(len(values), self.capacity - end)
+        self._data[end:end + first] = values[:first]
+        self._data[:len(values) - first] = values[first:]
+        self._start = (self._start + n_evict) % self.capacity
+        self._size = min(self.capacity, self._size + len(values))
+        return evicted
+
+    def pop(self, count: int = 1) -> np.ndarray:
+        """Usuwa i zwraca `count` najstarszych próbek."""
+        count = min(int(count), self._size)
+        popped = self._take(self._start, count)
+        self._start = (self._start + count) % self.capacity
+        self._size -= count
+        return popped
+
+    def _take(self, start: int, count: int) -> np.ndarray:
+        idx = (start + np.arange(count)) % self.capacity
+        return self._data[idx]
+
+    def values(self) -> np.ndarray:
+        """Zawartość bufora od najstarszej próbki (kopia)."""
+        return self._take(self._start, self._size)
+
+    def last(self, count: int) -> np.ndarray:
+        count = min(count, self._size)
+        return self._take((self._start + self._size - count) % self.capacity, count)
+
+
+def _block_moments(values: np.ndarray):
+    """(n, średnia, M2, M3, M4) bloku próbek - sumy liczone względem średniej bloku."""
+    n = len(values)
+    mean = values.mean()
+    d = values - mean
+    d2 = d * d
+    return n, mean, d2.sum(), (d2 * d).sum(), (d2 * d2).sum()
+
+
+class RollingStats:
+    """
+    Statystyki ostatnich `capacity` próbek aktualizowane przy push/pop.
+
+    Wartości zgodne z funkcjami z notebooka 07 (populacyjne std, skośność
+    i kurtoza nadwyżkowa jak `scipy.stats` z bias=True, RMSSD z `np.diff`,
+    nachylenie jak `np.polyfit(..., 1)[0]`). Próbki NaN należy odfiltrować
+    przed `push`.
+    """
+
+    def __init__(self, capacity: int, refresh_every: int = None):
+        self.buffer = RingBuffer(capacity)
+        self.refresh_every = refresh_every or self.buffer.capacity
+        self._popped_since_refresh = 0
+        self._reset()
+
+    def _reset(self):
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = self._m3 = self._m4 = 0.0
+        self._sum_diff2 = 0.0
+        # Σ(y - shift) i Σ i·(y - shift), i = 0..n-1 od najstarszej próbki
+        self._shift = 0.0
+        self._sum_y = 0.0
+        self._sum_iy = 0.0
+
+    def __len__(self):
+        return self.n
+
+    # ------------------------------------------------------------------ push/pop
+    def push(self, values) -> np.ndarray:
+        """Dokłada próbki; przy pełnym buforze najstarsze są usuwane. Zwraca usunięte próbki."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return values
+        overflow = self.n + len(values) - self.buffer.capacity
+        evicted = self.pop(min(overflow, self.n)) if overflow > 0 else np.empty(0)
+        if len(values) > self.buffer.capacity:
+            # Starsze próbki nowego kawałka i tak nie zmieszczą się w oknie
+            evicted = np.concatenate([evicted, values[:-self.buffer.capacity]])
+            values = values[-self.buffer.capacity:]
+
+        if self.n == 0:
+            self._shift = float(values[0])
+        else:
+            self._sum_diff2 += (values[0] - self.buffer[-1]) ** 2
+        self._sum_diff2 += float(np.sum(np.diff(values) ** 2))
+        shifted = values - self._shift
+        self._sum_iy += float(np.dot(np.arange(self.n, self.n + len(values)), shifted))
+        self._sum_y += float(shifted.sum())
+        self._merge(*_block_moments(values))
+        self.buffer.push(values)
+        return evicted
+
+    def pop(self, count: int = 1) -> np.ndarray:
+        """Usuwa `count` najstarszych próbek i zwraca je."""
+        popped = self.buffer.pop(count)
+        k = len(popped)
+        if k == 0:
+            return popped
+        if len(self.buffer) == 0:
+            self._reset()
+            return popped
+
+        self._sum_diff2 -= float(np.sum(np.diff(popped) ** 2))
+        self._sum_diff2 -= (self.buffer[0] - popped[-1]) ** 2
+        shifted = popped - self._shift
+        self._sum_y -= float(shifted.sum())
+        self._sum_iy -= float(np.dot(np.arange(k), shifted))
+        # Pozostałe próbki przesuwają się o k pozycji w stronę początku okna
+        self._sum_iy -= k * self._sum_y
+        self._unmerge(*_block_moments(popped))
+
+        self._popped_since_refresh += k
+        if self._popped_since_refresh >= self.refresh_every:
+            self.refresh()
+        return popped
+
+    def refresh(self):
+        """Przelicza wszystkie sumy dokładnie z zawartości bufora."""
+        values = self.buffer.values()
+        self._reset()
+        self._popped_since_refresh = 0
+        if len(values) == 0:
+            return
+        self._shift = float(values[0])
+        shifted = values - self._shift
+        self._sum_y = float(shifted.sum())
+        self._sum_iy = float(np.dot(np.arange(len(values)), shifted))
+        self._sum_diff2 = float(np.sum(np.diff(values) ** 2))
+        self.n, self._mean, self._m2, self._m3, self._m4 = _block_moments(values)
+
+    def _merge(self, nb, mb, m2b, m3b, m4b):
+        na = self.n
+        if na == 0:
+            self.n, self._mean, self._m2, self._m3, self._m4 = nb, mb, m2b, m3b, m4b
+            return
+        n = na + nb
+        delta = mb - self._mean
+        dn = delta / n
+        m2a, m3a = self._m2, self._m3
+        self._m4 += (m4b + delta * dn ** 3 * na * nb * (na * na - na * nb + nb * nb)
+                     + 6 * dn * dn * (na * na * m2b + nb * nb * m2a) + 4 * dn * (na * m3b - nb * m3a))
+        self._m3 += m3b + delta * dn * dn * na * nb * (na - nb) + 3 * dn * (na * m2b - nb * m2a)
+        self._m2 += m2b + delta * dn * na * nb
+        self._mean += nb * dn
+        self.n = n
+
+    def _unmerge(self, nb, mb, m2b, m3b, m4b):
+        """Odwrotność `_merge`: usuwa blok (nb, mb, ...) z bieżących momentów."""
+        n = self.n
+        na = n - nb
+        ma = (n * self._mean - nb * mb) / na
+        delta = mb - ma
+        dn = delta / n
+        m2a = self._m2 - m2b - delta * dn * na * nb
+        m3a = self._m3 - m3b - delta * dn * dn * na * nb * (na - nb) - 3 * dn * (na * m2b - nb * m2a)
+        m4a = (self._m4 - m4b - delta * dn ** 3 * na * nb * (na * na - na * nb + nb * nb)
+               - 6 * dn * dn * (na * na * m2b + nb * nb * m2a) - 4 * dn * (na * m3b - nb * m3a))
+        self.n, self._mean, self._m2, self._m3, self._m4 = na, ma, max(m2a, 0.0), m3a, max(m4a, 0.0)
+
+    # ------------------------------------------------------------------ statystyki
+    def _is_constant(self) -> bool:
+        var = self._m2 / self.n
+        return var <= (_ZERO_STD_RTOL * max(abs(self._mean), 1.0)) ** 2
+
+    def mean(self) -> float:
+        return float(self._mean) if self.n else np.nan
+
+    def var(self) -> float:
+        return float(self._m2 / self.n) if self.n else np.nan
+
+    def std(self) -> float:
+        if self.n < 2:
+            return 0.0 if self.n else np.nan
+        return float(np.sqrt(self._m2 / self.n))
+
+    def rms(self) -> float:
+        """Jak compute_rms: sqrt(mean(y²)) = sqrt(var + mean²)."""
+        if not self.n:
+            return np.nan
+        return float(np.sqrt(self._m2 / self.n + self._mean * self._mean))
+
+    def skewness(self) -> float:
+        """Jak compute_skewness (0.0 dla < 3 próbek lub stałego sygnału)."""
+        if self.n < 3 or self._is_constant():
+            return 0.0
+        return float((self._m3 / self.n) / (self._m2 / self.n) ** 1.5)
+
+    def kurtosis(self) -> float:
+        """Jak compute_kurtosis - kurtoza nadwyżkowa (0.0 dla < 4 próbek lub stałego sygnału)."""
+        if self.n < 4 or self._is_constant():
+            return 0.0
+        return float(self.n * self._m4 / (self._m2 * self._m2) - 3.0)
+
+    def rmssd(self) -> float:
+        """Jak compute_rmssd: sqrt(mean(diff(y)²))."""
+        if self.n < 2:
+            return 0.0
+        return float(np.sqrt(max(self._sum_diff2, 0.0) / (self.n - 1)))
+
+    def slope(self) -> float:
+        """Jak compute_slope: nachylenie prostej MNK dla x = 0..n-1."""
+        n = self.n
+        if n < 2:
+            return 0.0
+        sum_i = n * (n - 1) / 2.0
+        denom = n * n * (n * n - 1) / 12.0  # n·Σi² - (Σi)²
+        return float((n * self._sum_iy - sum_i * self._sum_y) / denom)
+
+    def snapshot(self) -> dict:
+        """Wszystkie cechy z ROLLING_FEATURES."""
+        return {name: getattr(self, name)() for name in ROLLING_FEATURES}
+
+
+def rolling_window_features(signal, window: int, step: int, prefix: str = None) -> pd.DataFrame:
+    """
+    Cechy z ROLLING_FEATURES dla okien [start, start + window) co `step` próbek.
+
+    Zamiast liczyć każde okno od zera, kolejne okna powstają przez push
+    `step` nowych próbek do `RollingStats` (najstarsze wypadają same).
+    Sygnał nie może zawierać NaN.
+
+    Args:
+        signal: sygnał 1-D
+        window: rozmiar okna (próbki)
+        step: krok (próbki)
+        prefix: opcjonalny prefiks kolumn, np. 'chest_ecg' -> 'chest_ecg_kurtosis'
+
+    Returns:
+        DataFrame z kolumnami window_start, window_end i cechami
+    """
+    signal = np.asarray(signal, dtype=np.float64).ravel()
+    starts = np.arange(0, len(signal) - window + 1, step) if len(signal) >= window else np.array([], int)
+    stats = RollingStats(window)
+    rows = []
+    pushed = 0
+    for start in starts:
+        stats.push(signal[max(pushed, start):start + window])
+        pushed = start + window
+        rows.append(stats.snapshot())
+
+    columns = [f"{prefix}_{name}" if prefix else name for name in ROLLING_FEATURES]
+    features = pd.DataFrame(rows, columns=list(ROLLING_FEATURES))
+    features.columns = columns
+    features.insert(0, 'window_start', starts)
+    features.insert(1, 'window_end', starts + window)
+    return features
+
+
+# Cechy okna jak w extract_features_from_window (07_klasyfikacja_emocji_timeseries.ipynb)
+WINDOW_FEATURES = ('mean', 'std', 'min', 'max', 'range', 'rms', 'kurtosis', 'skewness', 'rmssd', 'slope')
+
+
+def _window_extremes(signal: np.ndarray, starts: np.ndarray, window: int):
+    """Minimum i maksimum okien [start, start + window) bez NaN."""
+    if not len(starts):
+        return np.empty(0), np.empty(0)
+    view = np.lib.stride_tricks.sliding_window_view(signal, window)[starts]
+    return view.min(axis=1), view.max(axis=1)
+
+
+def window_feature_table(frame: pd.DataFrame, window: int, step: int, columns=None) -> pd.DataFrame:
+    """
+    Cechy WINDOW_FEATURES wszystkich kolumn dla okien co `step` próbek.
+
+    Wynik odpowiada pętli z `extract_features_from_window` w notebooku 07
+    (kolumny `{kolumna}_{cecha}` w tej samej kolejności). Kolumny bez NaN
+    liczone są przyrostowo (`rolling_window_features`, min/max na widoku
+    okien); w kolumnach z NaN każde okno liczone jest z próbek bez NaN
+    (okno złożone z samych NaN daje zera, jak w notebooku).
+
+    Returns:
+        DataFrame z cechami oraz window_start, window_end
+    """
+    columns = list(frame.columns) if columns is None else list(columns)
+    n = len(frame)
+    starts = np.arange(0, n - window + 1, step) if n >= window else np.array([], dtype=np.int64)
+    features = {}
+    for col in columns:
+        signal = frame[col].to_numpy(dtype=np.float64)
+        if np.isfinite(signal).all():
+            rolling = rolling_window_features(signal, window, step)
+            minimum, maximum = _window_extremes(signal, starts, window)
+            values = {name: rolling[name].to_numpy() for name in ROLLING_FEATURES}
+            values.update({'min': minimum, 'max': maximum, 'range': maximum - minimum})
+        else:
+            values = {name: np.zeros(len(starts)) for name in WINDOW_FEATURES}
+            for row, start in enumerate(starts):
+                clean = signal[start:start + window]
+                clean = clean[~np.isnan(clean)]
+                if not len(clean):
+                    continue
+                stats = RollingStats(window)
+                stats.push(clean)
+                for name, value in stats.snapshot().items():
+                    values[name][row] = value
+                values['min'][row], values['max'][row] = clean.min(), clean.max()
+                values['range'][row] = values['max'][row] - values['min'][row]
+        for name in WINDOW_FEATURES:
+            features[f"{col}_{name}"] = values[name]
+    result = pd.DataFrame(features, index=pd.RangeIndex(len(starts)))
+    result['window_start'] = starts
+    result['window_end'] = starts + window
+    return result
@@ -0,0 +1,314 @@
+"""
+Wektorowa segmentacja sliding window dla zsynchronizowanych danych WESAD.
+
+Zastępuje pętlę po oknach z notebooków 04/05 (maska boolowska na całym
+DataFrame dla każdego okna). Granice okien wyznaczane są raz przez
+`np.searchsorted` na siatce czasu z `resample_uniform`, a statystyki
+(mean/std/min/max/range/RMSSD/slope/resp_rate) liczone są dla wszystkich
+okien i kanałów jednocześnie na widoku `sliding_window_view`.
+
+Opcjonalnie (`scr_features=True`) dochodzą cechy SCR z `wesad_eda`:
+rozkład tonic/phasic i detekcja reakcji raz na całym EDA osoby, a potem
+przypisanie reakcji do okien, a `spectral_features=True` dodaje częstotliwość
+oddechu i entropię widma z `wesad_spectral` (Welch PSD wszystkich okien naraz).
+
+Użycie w notebooku:
+    from wesad_segmentation import sliding_window_segmentation
+    segmented = sliding_window_segmentation(combined, WINDOW_SIZE_SECONDS, STEP_SECONDS)
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from wesad_eda import eda_window_features
+from wesad_spectral import respiration_features
+
+# Mapowanie faz do klas (jak w 04_complete_analysis_sliding_window.ipynb)
+PHASE_TO_CLASS = {
+    "Base": "baseline",
+    "Medi 1": "baseline",
+    "Medi 2": "baseline",
+    "TSST": "stress",
+    "sRead": "stress",
+    "fRead": "stress",
+    "Fun": "amusement",
+}
+
+# Kolumny, dla których liczymy średnią (i odchylenie dla STD_COLUMNS)
+MEAN_COLUMNS = ['eda', 'hr', 'temp', 'acc_mag', 'chest_eda', 'chest_temp', 'chest_resp', 'chest_ecg']
+STD_COLUMNS = ['eda', 'hr', 'acc_mag', 'chest_resp']
+
+# Maksymalna liczba próbek (okna × długość) materializowana naraz
+MAX_BLOCK_SAMPLES = 4_000_000
+
+
+def window_bounds(timestamps_ns: np.ndarray, window_size_ns: int, step_ns: int, n_windows: int):
+    """
+    Wyznacza granice okien [start, end) jako indeksy wierszy.
+
+    Args:
+        timestamps_ns: posortowane znaczniki czasu (int64, nanosekundy)
+        window_size_ns: rozmiar okna w nanosekundach
+        step_ns: krok okna w nanosekundach
+        n_windows: liczba okien
+
+    Returns:
+        (window_starts_ns, start_idx, end_idx)
+    """
+    n_windows = max(int(n_windows), 0)
+    window_starts = timestamps_ns[0] + np.arange(n_windows, dtype=np.int64) * step_ns
+    start_idx = np.searchsorted(timestamps_ns, window_starts, side='left')
+    end_idx = np.searchsorted(timestamps_ns, window_starts + window_size_ns, side='left')
+    return window_starts, start_idx, end_idx
+
+
+def _iter_window_blocks(start_idx: np.ndarray, lengths: np.ndarray):
+    """
+    Grupuje okna po długości i dzieli na bloki o ograniczonym rozmiarze.
+
+    Na jednolitej siatce czasu występują 1-2 różne długości okien, więc
+    każdą grupę można policzyć jednym wywołaniem na widoku strided.
+    """
+    for length in np.unique(lengths):
+        positions = np.flatnonzero(lengths == length)
+        block = max(1, MAX_BLOCK_SAMPLES // max(int(length), 1))
+        for offset in range(0, len(positions), block):
+            yield int(length), positions[offset:offset + block]
+
+
+def _gather(values: np.ndarray, starts: np.ndarray, length: int) -> np.ndarray:
+    """Zwraca macierz (okna × length) z widoku strided bez pętli Pythona."""
+    return sliding_window_view(values, length)[starts]
+
+
+def _rmssd_rows(block: np.ndarray) -> np.ndarray:
+    """RMSSD dla wierszy bez NaN (identycznie jak compute_rmssd)."""
+    if block.shape[1] < 2:
+        return np.full(block.shape[0], np.nan)
+    diffs = np.diff(block, axis=1)
+    return np.sqrt(np.mean(diffs ** 2, axis=1))
+
+
+def _rmssd_single(values: np.ndarray) -> float:
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return np.nan
+    diffs = np.diff(values)
+    return float(np.sqrt(np.mean(diffs ** 2)))
+
+
+def _slope_rows(times: np.ndarray, block: np.ndarray) -> np.ndarray:
+    """Nachylenie regresji liniowej (najmniejsze kwadraty) dla każdego wiersza."""
+    if block.shape[1] < 2:
+        return np.full(block.shape[0], np.nan)
+    t_centered = times - times.mean(axis=1, keepdims=True)
+    y_centered = block - block.mean(axis=1, keepdims=True)
+    denom = np.sum(t_centered ** 2, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.sum(t_centered * y_centered, axis=1) / denom
+
+
+def _resp_rate_single(values: np.ndarray, duration: float) -> float:
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return np.nan
+    centered = values - np.nanmedian(values)
+    zero_crossings = np.count_nonzero(np.diff(np.signbit(centered)))
+    breaths_per_second = zero_crossings / 2.0 / duration if duration > 0 else 0.0
+    return float(breaths_per_second * 60.0)
+
+
+def _resp_rate_rows(block: np.ndarray, durations: np.ndarray) -> np.ndarray:
+    """Częstość oddechu z przejść przez zero (jak compute_respiration_rate)."""
+    result = np.full(block.shape[0], np.nan)
+    if block.shape[1] < 2:
+        return result
+    has_nan = np.isnan(block).any(axis=1)
+    clean = ~has_nan
+    if clean.any():
+        rows = block[clean]
+        centered = rows - np.median(rows, axis=1, keepdims=True)
+        crossings = np.count_nonzero(np.diff(np.signbit(centered), axis=1), axis=1)
+        dur = durations[clean]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bps = np.where(dur > 0, crossings / 2.0 / dur, 0.0)
+        result[clean] = bps * 60.0
+    for row in np.flatnonzero(has_nan):
+        result[row] = _resp_rate_single(block[row], durations[row])
+    return result
+
+
+def compute_window_features(values: dict, times_s: np.ndarray, start_idx: np.ndarray,
+                            end_idx: np.ndarray) -> dict:
+    """
+    Liczy cechy okien dla wszystkich okien i kanałów naraz.
+
+    Args:
+        values: słownik kolumna -> tablica float64 (wspólna oś czasu)
+        times_s: czas każdego wiersza w sekundach
+        start_idx, end_idx: granice okien (indeksy wierszy, end wyłączny)
+
+    Returns:
+        dict nazwa_cechy -> tablica (jedna wartość na okno)
+    """
+    n_windows = len(start_idx)
+    lengths = end_idx - start_idx
+    features = {}
+
+    def out(name):
+        if name not in features:
+            features[name] = np.full(n_windows, np.nan)
+        return features[name]
+
+    # Nazwy kolumn wynikowych w kolejności jak w pętli z notebooka
+    for col in MEAN_COLUMNS:
+        if col in values:
+            out(f'{col}_mean')
+            if col in STD_COLUMNS:
+                out(f'{col}_std')
+    if 'hr' in values:
+        out('hr_rmssd')
+        out('hr_range')
+    if 'eda' in values:
+        out('eda_range')
+        out('eda_slope')
+    if 'chest_resp' in values:
+        out('resp_rate')
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        for length, positions in _iter_window_blocks(start_idx, lengths):
+            starts = start_idx[positions]
+            for col in MEAN_COLUMNS:
+                if col not in values:
+                    continue
+                block = _gather(values[col], starts, length)
+                features[f'{col}_mean'][positions] = np.nanmean(block, axis=1)
+                if col in STD_COLUMNS:
+                    features[f'{col}_std'][positions] = np.nanstd(block, axis=1, ddof=1)
+
+            if 'hr' in values:
+                block = _gather(values['hr'], starts, length)
+                rmssd = _rmssd_rows(block)
+                nan_rows = np.isnan(block).any(axis=1)
+                for row in np.flatnonzero(nan_rows):
+                    rmssd[row] = _rmssd_single(block[row])
+                features['hr_rmssd'][positions] = rmssd
+                features['hr_range'][positions] = np.nanmax(block, axis=1) - np.nanmin(block, axis=1)
+
+            if 'eda' in values:
+                block = _gather(values['eda'], starts, length)
+                times = _gather(times_s, starts, length)
+                times = times - times[:, :1]
+                features['eda_range'][positions] = np.nanmax(block, axis=1) - np.nanmin(block, axis=1)
+                features['eda_slope'][positions] = _slope_rows(times, block)
+
+            if 'chest_resp' in values:
+                block = _gather(values['chest_resp'], starts, length)
+                durations = times_s[starts + length - 1] - times_s[starts]
+                features['resp_rate'][positions] = _resp_rate_rows(block, durations)
+
+    return features
+
+
+def sliding_window_segmentation(df: pd.DataFrame, window_size_seconds: float, step_seconds: float,
+                                phase_to_class: dict = None, verbose: bool = True,
+                                scr_features: bool = False, spectral_features: bool = False) -> pd.DataFrame:
+    """
+    Segmentacja sliding window z overlapem (wersja wektorowa).
+
+    Zwraca tę samą tabelę cech co pętla z 04_complete_analysis_sliding_window.ipynb:
+    okno i zaczyna się w `t0 + i * step`, obejmuje wiersze z [start, start + window),
+    puste okna są pomijane, a okna bez etykiety ('unknown') odfiltrowane.
+
+    Args:
+        df: DataFrame z zsynchronizowanymi danymi (kolumna 'timestamp')
+        window_size_seconds: Rozmiar okna w sekundach (np. 5.0)
+        step_seconds: Krok przesunięcia okna w sekundach (np. 2.5 dla 50% overlap)
+        phase_to_class: mapowanie faz protokołu na klasy (domyślnie PHASE_TO_CLASS)
+        verbose: czy wypisywać podsumowanie segmentacji
+        scr_features: czy dodać cechy tonic/SCR okien (`eda_window_features`)
+        spectral_features: czy dodać cechy widmowe oddechu (`respiration_features`:
+            resp_freq_hz, resp_rate_bpm, resp_spectral_entropy)
+
+    Returns:
+        DataFrame z jedną obserwacją per okno
+    """
+    if df.empty or 'timestamp' not in df.columns:
+        return pd.DataFrame()
+    if phase_to_class is None:
+        phase_to_class = PHASE_TO_CLASS
+
+    df_sorted = df.sort_values('timestamp', kind='stable')
+    timestamps = pd.DatetimeIndex(df_sorted['timestamp'])
+    timestamps_ns = timestamps.as_unit('ns').asi8
+
+    window_size = pd.Timedelta(seconds=window_size_seconds)
+    step_size = pd.Timedelta(seconds=step_seconds)
+    total_duration = timestamps[-1] - timestamps[0]
+    n_windows = int((total_duration - window_size) / step_size) + 1
+
+    if verbose:
+        print(f"  Długość sygnału: {total_duration.total_seconds():.1f} sekund")
+        print(f"  Rozmiar okna: {window_size_seconds} sekund")
+        print(f"  Krok: {step_seconds} sekund")
+        print(f"  Liczba okien: {n_windows}")
+
+    window_starts, start_idx, end_idx = window_bounds(
+        timestamps_ns, window_size.value, step_size.value, n_windows
+    )
+
+    # Puste okna są pomijane (jak `continue` w pętli)
+    non_empty = end_idx > start_idx
+    window_starts = window_starts[non_empty]
+    start_idx = start_idx[non_empty]
+    end_idx = end_idx[non_empty]
+
+    if len(start_idx) == 0:
+        return pd.DataFrame()
+
+    times_s = (timestamps_ns - timestamps_ns[0]) / 1e9
+    values = {
+        col: df_sorted[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        for col in MEAN_COLUMNS if col in df_sorted.columns
+    }
+    result_df = pd.DataFrame(compute_window_features(values, times_s, start_idx, end_idx))
+    # Częstotliwość siatki czasu (jednolitej po resample_uniform)
+    fs = 1.0 / float(np.median(np.diff(times_s))) if len(times_s) > 1 else None
+    if scr_features and 'eda' in values and fs is not None:
+        eda_features = eda_window_features(values['eda'], fs, start_idx, end_idx)
+        result_df = pd.concat([result_df, eda_features], axis=1)
+    if spectral_features and 'chest_resp' in values and fs is not None:
+        resp_features = respiration_features(values['chest_resp'], fs, start_idx, end_idx)
+        result_df = pd.concat([result_df, resp_features], axis=1)
+
+    # Metadane
+    tz = timestamps.tz
+    starts_index = pd.to_datetime(window_starts, unit='ns', utc=tz is not None)
+    if tz is not None:
+        starts_index = starts_index.tz_convert(tz)
+    ends_index = starts_index + window_size
+    result_df['timestamp'] = starts_index
+    result_df['window_start'] = starts_index
+    result_df['window_end'] = ends_index
+
+    # Phase i label (z pierwszego punktu w oknie)
+    if 'phase' in df_sorted.columns:
+        phases = df_sorted['phase'].to_numpy()[start_idx]
+        result_df['phase'] = phases
+        result_df['label'] = [phase_to_class.get(phase, 'unknown') for phase in phases]
+    else:
+        result_df['phase'] = 'unknown'
+        result_df['label'] = 'unknown'
+
+    # Subject (z pierwszego punktu)
+    if 'subject' in df_sorted.columns:
+        result_df['subject'] = df_sorted['subject'].to_numpy()[start_idx]
+
+    # Filtruj okna bez label
+    result_df = result_df[result_df['label'] != 'unknown'].copy()
+
+    return result_df
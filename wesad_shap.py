@@ -0,0 +1,284 @@
+"""
+Magazyn wyjaśnień SHAP liczonych z góry dla zapisanych modeli (`wesad_model.py`).
+
+Notebooki liczyły `shap_values` interaktywnie na próbce `X_test_sample` i
+tylko je rysowały, więc aplikacje Streamlit nie miały czego pokazać, a
+ponowne liczenie TreeExplainer przy każdym wyświetleniu trwałoby minuty.
+Tutaj wartości SHAP dla wszystkich wierszy (osób albo okien) liczone są raz,
+równolegle w kawałkach wierszy (`joblib.Parallel`), i zapisywane per wersja
+modelu:
+
+    results/shap/{model}/{wersja}/values.npy   # float32 (wyjścia, cechy, wiersze)
+    results/shap/{model}/{wersja}/data.npy     # float32 (cechy, wiersze) - wartości cech
+    results/shap/{model}/{wersja}/meta.json    # cechy, wyjścia (klasy), wiersze, base values, średnie |SHAP|
+
+Układ kolumnowy (cecha = ciągły blok wierszy) pozwala czytać pojedynczą
+cechę dla całej kohorty albo pojedynczy wiersz bez wczytywania reszty
+(`np.load(mmap_mode='r')`), a globalna ważność cech (średnie |SHAP|) jest
+gotowa w `meta.json`. Nowa wersja modelu to nowy katalog, więc wyjaśnienia
+nigdy nie są mieszane między wersjami.
+
+Użycie:
+    store = precompute_shap(load_bundle("regulation"), features_df.set_index("subject"))
+    store = load_shap_store("regulation")               # najnowsza wersja modelu
+    store.explain_row("S2", output="dobra")              # wkłady cech jednego wiersza
+    store.global_importance("dobra")                     # średnie |SHAP| per cecha
+
+lub z terminala:
+    python wesad_shap.py --features wesad_features_full.csv --workers 4
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from wesad_model import MODEL_ROOT, REGULATION_MODEL, latest_version, load_bundle
+
+# shap importowany dopiero w workerach - aplikacja czytająca magazyn go nie ładuje
+SHAP_AVAILABLE = importlib.util.find_spec("shap") is not None
+
+SHAP_ROOT = Path("results") / "shap"
+VALUES_FILENAME = "values.npy"
+DATA_FILENAME = "data.npy"
+META_FILENAME = "meta.json"
+
+# Wierszy na zadanie TreeExplainer
+CHUNK_ROWS = 256
+
+
+def shap_store_path(name: str, version: str, root: Path = SHAP_ROOT) -> Path:
+    return Path(root) / name / version
+
+
+def _as_outputs(values) -> np.ndarray:
+    """Wynik `shap_values` (lista klas / (n, f, k) / (n, f)) -> float32 (k, f, n)."""
+    if isinstance(values, list):
+        values = np.stack(values, axis=-1)
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim == 2:
+        values = values[:, :, None]
+    return values.transpose(2, 1, 0)
+
+
+def _explain_chunk(model, X_chunk: np.ndarray):
+    import shap
+
+    explainer = shap.TreeExplainer(model)
+    values = explainer.shap_values(X_chunk, check_additivity=False)
+    return _as_outputs(values), np.atleast_1d(np.asarray(explainer.expected_value, dtype=np.float64))
+
+
+def _output_names(bundle, n_outputs: int) -> list:
+    """Nazwy wyjść SHAP: klasy modelu, a przy jednym wyjściu (log-odds) - klasa pozytywna."""
+    classes = [str(c) for c in bundle._decode(bundle.model.classes_)]
+    if n_outputs == len(classes):
+        return classes
+    if n_outputs == 1 and len(classes) == 2:
+        return classes[1:]
+    return [f"output_{k}" for k in range(n_outputs)]
+
+
+def precompute_shap(bundle, features_df: pd.DataFrame, root: Path = SHAP_ROOT, chunk_rows: int = CHUNK_ROWS,
+                    n_jobs: int = -1, verbose: bool = True) -> 'ShapStore':
+    """
+    Liczy wartości SHAP (TreeExplainer) dla wszystkich wierszy `features_df` i zapisuje je dla wersji modelu.
+
+    Parameters:
+        bundle: zapisany ModelBundle (model drzewiasty; wersja wyznacza katalog magazynu)
+        features_df: cechy, indeks = identyfikatory wierszy (np. subject albo okno)
+        chunk_rows: wierszy na jedno zadanie równoległe
+        n_jobs: liczba procesów joblib (1 = bez puli)
+
+    Raises:
+        ImportError: gdy shap nie jest zainstalowany
+        ValueError: gdy model nie ma wersji (niezapisany) albo brak wierszy
+    """
+    if not SHAP_AVAILABLE:
+        raise ImportError("SHAP nie jest zainstalowany. Zainstaluj: pip install shap")
+    if bundle.version is None:
+        raise ValueError("Model nie ma wersji - zapisz go najpierw (bundle.save())")
+    n_rows = len(features_df)
+    if n_rows == 0:
+        raise ValueError("Brak wierszy do wyjaśnienia")
+
+    X = bundle.feature_matrix(features_df)
+    data = bundle.feature_matrix(features_df, scale=False).astype(np.float32)
+    chunks = [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+    # Zapis do katalogu tymczasowego i podmiana na końcu - czytelnik nie zobaczy połowy magazynu
+    target = shap_store_path(bundle.name, bundle.version, root)
+    tmp_dir = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    values = None
+    base_values = None
+    abs_sum = None
+    results = Parallel(n_jobs=min(n_jobs, len(chunks)) if n_jobs > 0 else n_jobs, return_as="generator")(
+        delayed(_explain_chunk)(bundle.model, X[start:stop]) for start, stop in chunks
+    )
+    for (start, stop), (chunk_values, chunk_base) in zip(chunks, results):
+        if values is None:
+            shape = (chunk_values.shape[0], chunk_values.shape[1], n_rows)
+            values = np.lib.format.open_memmap(tmp_dir / VALUES_FILENAME, mode='w+', dtype=np.float32, shape=shape)
+            abs_sum = np.zeros(shape[:2], dtype=np.float64)
+            base_values = chunk_base
+        values[:, :, start:stop] = chunk_values
+        abs_sum += np.abs(chunk_values).sum(axis=2, dtype=np.float64)
+    values.flush()
+    del values
+
+    np.save(tmp_dir / DATA_FILENAME, np.ascontiguousarray(data.T))
+    outputs = _output_names(bundle, abs_sum.shape[0])
+    meta = {
+        'model': bundle.name,
+        'version': bundle.version,
+        'feature_names': bundle.feature_names,
+        'outputs': outputs,
+        'row_ids': [str(row) for row in features_df.index],
+        'base_values': np.broadcast_to(base_values, len(outputs)).tolist(),
+        'mean_abs': (abs_sum / n_rows).tolist(),
+    }
+    with open(tmp_dir / META_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(target, ignore_errors=True)
+    tmp_dir.replace(target)
+    if verbose:
+        print(f"✅ SHAP: {n_rows} wierszy × {len(bundle.feature_names)} cech × {len(outputs)} wyjść "
+              f"(model {bundle.name}, wersja {bundle.version}) zapisane do: {target}")
+    return ShapStore(target)
+
+
+class ShapStore:
+    """Wartości SHAP jednej wersji modelu; tablice mapowane z dysku dopiero przy pierwszym odczycie."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / META_FILENAME, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.model = meta['model']
+        self.version = meta['version']
+        self.feature_names = meta['feature_names']
+        self.outputs = meta['outputs']
+        self.row_ids = meta['row_ids']
+        self.base_values = np.asarray(meta['base_values'])
+        self.mean_abs = np.asarray(meta['mean_abs'])
+        self._positions = {row: i for i, row in enumerate(self.row_ids)}
+        self._values = None
+        self._data = None
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def __contains__(self, row):
+        return str(row) in self._positions
+
+    def __repr__(self):
+        return (f"ShapStore({self.model}, wersja={self.version}, wiersze={len(self)}, "
+                f"cechy={len(self.feature_names)}, wyjścia={self.outputs})")
+
+    @property
+    def values(self) -> np.ndarray:
+        """(wyjścia, cechy, wiersze) float32, mapowane z dysku."""
+        if self._values is None:
+            self._values = np.load(self.path / VALUES_FILENAME, mmap_mode='r')
+        return self._values
+
+    @property
+    def data(self) -> np.ndarray:
+        """(cechy, wiersze) float32 - wartości cech (przed skalowaniem), mapowane z dysku."""
+        if self._data is None:
+            self._data = np.load(self.path / DATA_FILENAME, mmap_mode='r')
+        return self._data
+
+    def output_index(self, output=None) -> int:
+        """Numer wyjścia po nazwie klasy (domyślnie ostatnie - klasa pozytywna przy 2 klasach)."""
+        if output is None:
+            return len(self.outputs) - 1
+        if isinstance(output, (int, np.integer)):
+            return int(output)
+        return self.outputs.index(str(output))
+
+    def row_position(self, row) -> int:
+        """
+        Raises:
+            KeyError: gdy wiersza nie ma w magazynie
+        """
+        return self._positions[str(row)]
+
+    def base_value(self, output=None) -> float:
+        return float(self.base_values[self.output_index(output)])
+
+    def explain_row(self, row, output=None, top: int = None) -> pd.DataFrame:
+        """
+        Wkłady cech jednego wiersza (do wykresu waterfall), malejąco po |SHAP|.
+
+        Returns:
+            DataFrame: feature, value (wartość cechy), shap; attrs['base_value']
+        """
+        position = self.row_position(row)
+        frame = pd.DataFrame({
+            'feature': self.feature_names,
+            'value': np.asarray(self.data[:, position]),
+            'shap': np.asarray(self.values[self.output_index(output), :, position]),
+        })
+        frame = frame.reindex(frame['shap'].abs().sort_values(ascending=False).index)
+        if top is not None:
+            frame = frame.head(top)
+        frame = frame.reset_index(drop=True)
+        frame.attrs['base_value'] = self.base_value(output)
+        return frame
+
+    def feature_values(self, feature: str, output=None):
+        """(SHAP, wartości cechy) dla wszystkich wierszy - ciągły odczyt jednej kolumny."""
+        j = self.feature_names.index(feature)
+        return np.asarray(self.values[self.output_index(output), j]), np.asarray(self.data[j])
+
+    def global_importance(self, output=None) -> pd.Series:
+        """Średnie |SHAP| per cecha (z meta.json, bez czytania wartości), malejąco."""
+        importance = pd.Series(self.mean_abs[self.output_index(output)], index=self.feature_names)
+        return importance.sort_values(ascending=False)
+
+
+def load_shap_store(name: str, version: str = None, root: Path = SHAP_ROOT,
+                    model_root: Path = MODEL_ROOT) -> ShapStore:
+    """
+    Magazyn SHAP dla wersji modelu (domyślnie najnowszej zapisanej w `model_root`).
+
+    Raises:
+        FileNotFoundError: gdy model albo wyjaśnienia dla tej wersji nie istnieją
+    """
+    version = version or latest_version(name, model_root)
+    if version is None:
+        raise FileNotFoundError(f"Brak zapisanego modelu '{name}' w {Path(model_root).absolute()}")
+    path = shap_store_path(name, version, root)
+    if not (path / META_FILENAME).exists():
+        raise FileNotFoundError(f"Brak wyjaśnień SHAP dla modelu '{name}' w wersji {version}: {path}")
+    return ShapStore(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wyjaśnienia SHAP dla zapisanego modelu")
+    parser.add_argument("--features", type=Path, default=Path("wesad_features_full.csv"))
+    parser.add_argument("--model", default=REGULATION_MODEL)
+    parser.add_argument("--version", default=None, help="wersja modelu (domyślnie najnowsza)")
+    parser.add_argument("--index", default="subject", help="kolumna z identyfikatorami wierszy")
+    parser.add_argument("--model-root", type=Path, default=MODEL_ROOT)
+    parser.add_argument("--shap-root", type=Path, default=SHAP_ROOT)
+    parser.add_argument("--workers", type=int, default=-1, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    args = parser.parse_args(argv)
+    bundle = load_bundle(args.model, args.version, root=args.model_root)
+    features_df = pd.read_csv(args.features).set_index(args.index)
+    precompute_shap(bundle, features_df, root=args.shap_root, n_jobs=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Cechy spektralne dla wszystkich okien naraz: Welch PSD jednym `rfft`, pasma VLF/LF/HF, częstotliwość oddechu, entropia.
+
+`compute_spectral_hrv` (analiza_pobudzenia_hamowania.ipynb) liczył
+`scipy.signal.welch` dla jednego szeregu, a częstość oddechu w
+segmentacji okien brała się z przejść przez zero w każdym oknie osobno.
+Tutaj:
+
+- okna kanału układane są w tablicę (okna × segmenty Welcha × nperseg)
+  przez `sliding_window_view`, a periodogramy wszystkich segmentów liczone
+  są jednym `np.fft.rfft` (okno Hanna, detrend 'constant', gęstość
+  jednostronna - jak domyślny `welch`),
+- przy nakładających się oknach (`reuse_segments`), gdy krok okien jest
+  wielokrotnością kroku segmentów, każdy segment FFT liczony jest raz dla
+  całego sygnału, a PSD okna to średnia jego segmentów
+  (`np.add.reduceat`),
+- moc w pasmach (całka trapezowa), częstotliwość dominująca w paśmie
+  (z interpolacją paraboliczną szczytu) i
+  znormalizowana entropia spektralna liczone są na macierzy (okna × częstotliwości).
+
+Użycie:
+    freqs, psd = welch_batch(resp, fs, start_idx, length)          # PSD wszystkich okien
+    respiration_features(resp, fs, start_idx, end_idx)              # resp_freq_hz, resp_rate_bpm, ...
+    compute_spectral_hrv(rr_intervals, sampling_hz=1.0)             # jak w notebooku (VLF/LF/HF, LF/HF)
+"""
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Pasma częstotliwości dla HRV:
+# VLF: 0-0.04 Hz, LF: 0.04-0.15 Hz (sympatyczny), HF: 0.15-0.4 Hz (parasympatyczny)
+HRV_BANDS = {'vlf': (0.0, 0.04), 'lf': (0.04, 0.15), 'hf': (0.15, 0.4)}
+
+# Oddech: 0.1-0.7 Hz (6-42 oddechów na minutę)
+RESP_BAND = (0.1, 0.7)
+
+# Segment Welcha dla oddechu w sekundach (rozdzielczość 1/16 Hz ≈ 4 oddechy/min);
+# 128 próbek przy 32 Hz dawałoby 0.25 Hz = 15 oddechów/min
+RESP_SEGMENT_S = 16.0
+
+WELCH_NPERSEG = 128
+
+# Maksymalna liczba próbek (segmenty × nperseg) materializowana naraz
+MAX_BLOCK_SAMPLES = 4_000_000
+
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def _hann(nperseg: int) -> np.ndarray:
+    """Okno Hanna w wersji okresowej (jak `scipy.signal.get_window('hann', nperseg)`)."""
+    if nperseg == 1:
+        return np.ones(1)
+    return 0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(nperseg) / nperseg)
+
+
+def _periodograms(x: np.ndarray, frame_starts: np.ndarray, nperseg: int, fs: float) -> np.ndarray:
+    """Jednostronna gęstość mocy segmentów x[s:s + nperseg] (wiersze) - jedno `rfft` na blok."""
+    window = _hann(nperseg)
+    scale = 1.0 / (fs * np.sum(window ** 2))
+    frames_view = sliding_window_view(x, nperseg)
+    result = np.empty((len(frame_starts), nperseg // 2 + 1))
+    block = max(1, MAX_BLOCK_SAMPLES // nperseg)
+    for offset in range(0, len(frame_starts), block):
+        frames = frames_view[frame_starts[offset:offset + block]]
+        frames = (frames - frames.mean(axis=1, keepdims=True)) * window
+        spectrum = np.fft.rfft(frames, axis=1)
+        result[offset:offset + block] = (spectrum.real ** 2 + spectrum.imag ** 2) * scale
+    if nperseg % 2:
+        result[:, 1:] *= 2
+    else:
+        result[:, 1:-1] *= 2
+    return result
+
+
+def welch_batch(signal, fs: float, starts, length: int, nperseg: int = None, noverlap: int = None,
+                reuse_segments: bool = True):
+    """
+    Welch PSD dla wszystkich okien x[start:start + length] naraz.
+
+    Parameters:
+        signal: sygnał (1D)
+        fs: częstotliwość próbkowania
+        starts: początki okien (indeksy próbek)
+        length: długość każdego okna (w próbkach)
+        nperseg: długość segmentu (domyślnie min(WELCH_NPERSEG, length))
+        noverlap: nakładanie segmentów (domyślnie nperseg // 2)
+        reuse_segments: czy liczyć wspólne segmenty nakładających się okien raz
+
+    Returns:
+        (freqs, psd) - psd ma kształt (okna × częstotliwości); jak `scipy.signal.welch`
+        z oknem Hanna, detrend='constant', scaling='density'
+    """
+    x = np.asarray(signal, dtype=np.float64)
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1)
+    length = int(length)
+    nperseg = min(WELCH_NPERSEG, length) if nperseg is None else min(int(nperseg), length)
+    noverlap = nperseg // 2 if noverlap is None else int(noverlap)
+    freqs = np.fft.rfftfreq(nperseg, d=1.0 / fs)
+    if not len(starts) or nperseg < 1:
+        return freqs, np.empty((len(starts), len(freqs)))
+
+    step = nperseg - noverlap
+    n_segments = (length - nperseg) // step + 1
+    offsets = starts - starts.min()
+    # Wszystkie segmenty na wspólnej siatce - opłaca się, gdy okna dzielą segmenty
+    grid_size = int(offsets.max()) // step + n_segments
+    if reuse_segments and not np.any(offsets % step) and grid_size < len(starts) * n_segments:
+        grid = _periodograms(x, starts.min() + step * np.arange(grid_size), nperseg, fs)
+        first = offsets // step
+        bounds = np.empty(2 * len(starts), dtype=np.int64)
+        bounds[0::2] = first
+        bounds[1::2] = first + n_segments
+        # Wartownik: reduceat wymaga indeksów < liczby wierszy
+        grid = np.vstack([grid, np.zeros((1, grid.shape[1]))])
+        psd = np.add.reduceat(grid, bounds, axis=0)[0::2] / n_segments
+    else:
+        frame_starts = (starts[:, None] + step * np.arange(n_segments)).reshape(-1)
+        psd = _periodograms(x, frame_starts, nperseg, fs).reshape(len(starts), n_segments, -1).mean(axis=1)
+    return freqs, psd
+
+
+def band_powers(freqs: np.ndarray, psd: np.ndarray, bands: dict = None) -> dict:
+    """Moc w pasmach [lo, hi) (całka trapezowa) dla każdego wiersza PSD: nazwa -> tablica."""
+    bands = HRV_BANDS if bands is None else bands
+    psd = np.atleast_2d(psd)
+    powers = {}
+    for name, (lo, hi) in bands.items():
+        mask = (freqs >= lo) & (freqs < hi)
+        powers[name] = _trapezoid(psd[:, mask], freqs[mask], axis=1)
+    return powers
+
+
+def dominant_frequency(freqs: np.ndarray, psd: np.ndarray, band: tuple = None, interpolate: bool = True) -> np.ndarray:
+    """
+    Częstotliwość o największej mocy w paśmie [lo, hi] (NaN, gdy pasmo puste albo PSD bez mocy).
+
+    `interpolate` dopasowuje parabolę do log-mocy szczytu i sąsiadów - dokładność
+    poniżej rozdzielczości fs / nperseg (ważne dla krótkich okien oddechu).
+    """
+    psd = np.atleast_2d(psd)
+    mask = np.ones(len(freqs), dtype=bool) if band is None else (freqs >= band[0]) & (freqs <= band[1])
+    if not mask.any():
+        return np.full(len(psd), np.nan)
+    in_band = np.where(np.isfinite(psd), psd, -np.inf)
+    in_band[:, ~mask] = -np.inf
+    peak = np.argmax(in_band, axis=1)
+    rows = np.arange(len(psd))
+    valid = np.isfinite(psd[:, mask]).all(axis=1) & (in_band[rows, peak] > 0)
+    result = freqs[peak].astype(np.float64)
+    if interpolate and len(freqs) > 2:
+        # Sąsiedzi spoza pasma też są dozwoleni - szczyt na brzegu pasma
+        inner = (peak > 0) & (peak < len(freqs) - 1)
+        left = psd[rows, np.clip(peak - 1, 0, None)]
+        right = psd[rows, np.clip(peak + 1, None, len(freqs) - 1)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            l, c, r = np.log(left), np.log(psd[rows, peak]), np.log(right)
+            denom = l - 2 * c + r
+            shift = np.where(inner & np.isfinite(denom) & (denom < 0), 0.5 * (l - r) / denom, 0.0)
+        result += np.clip(shift, -0.5, 0.5) * (freqs[1] - freqs[0])
+    return np.where(valid, result, np.nan)
+
+
+def spectral_entropy(psd: np.ndarray, freqs: np.ndarray = None, band: tuple = None) -> np.ndarray:
+    """
+    Znormalizowana entropia Shannona widma (0 = jeden prążek, 1 = widmo płaskie).
+
+    PSD traktowana jest jak rozkład prawdopodobieństwa po częstotliwościach (w paśmie `band`).
+    """
+    psd = np.atleast_2d(psd)
+    if band is not None:
+        psd = psd[:, (freqs >= band[0]) & (freqs <= band[1])]
+    n_bins = psd.shape[1]
+    if n_bins < 2:
+        return np.full(len(psd), np.nan)
+    total = psd.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = psd / total
+        terms = np.where(p > 0, p * np.log(p), 0.0)
+        entropy = -terms.sum(axis=1) / np.log(n_bins)
+    return np.where(total[:, 0] > 0, entropy, np.nan)
+
+
+def hrv_band_features(freqs: np.ndarray, psd: np.ndarray) -> pd.DataFrame:
+    """VLF/LF/HF, moc całkowita, jednostki znormalizowane i LF/HF dla każdego wiersza PSD."""
+    powers = band_powers(freqs, psd, HRV_BANDS)
+    lf, hf = powers['lf'], powers['hf']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lf_nu = np.where(lf + hf > 0, lf / (lf + hf) * 100, np.nan)
+        hf_nu = np.where(lf + hf > 0, hf / (lf + hf) * 100, np.nan)
+        lf_hf_ratio = np.where(hf > 0, lf / hf, np.nan)
+    return pd.DataFrame({
+        'vlf_power': powers['vlf'],
+        'lf_power': lf,
+        'hf_power': hf,
+        'total_power': powers['vlf'] + lf + hf,
+        'lf_nu': lf_nu,  # Normalized units
+        'hf_nu': hf_nu,
+        'lf_hf_ratio': lf_hf_ratio,
+    })
+
+
+def compute_spectral_hrv(rr_intervals, sampling_hz=1.0):
+    """
+    Oblicza spektralną gęstość mocy dla HRV i wyciąga pasma LF/HF.
+
+    Parameters:
+        rr_intervals: interwały R-R w sekundach
+        sampling_hz: częstotliwość próbkowania (dla RR zwykle 1 Hz)
+
+    Returns:
+        spectral_metrics: słownik z metrykami spektralnymi
+    """
+    rr = np.asarray(rr_intervals, dtype=np.float64)
+    if len(rr) < WELCH_NPERSEG:
+        return None
+    frequencies, psd = welch_batch(rr, sampling_hz, [0], len(rr), nperseg=min(WELCH_NPERSEG, len(rr) // 2))
+    metrics = {name: float(values[0]) for name, values in hrv_band_features(frequencies, psd).items()}
+    metrics['frequencies'] = frequencies
+    metrics['psd'] = psd[0]
+    return metrics
+
+
+def spectral_window_features(signal, fs: float, start_idx, end_idx, bands: dict = None,
+                             dominant_band: tuple = None, prefix: str = '', nperseg: int = None,
+                             noverlap: int = None, reuse_segments: bool = True) -> pd.DataFrame:
+    """
+    Moc w pasmach, częstotliwość dominująca i entropia spektralna dla okien [start, end).
+
+    Okna grupowane są po długości (na jednolitej siatce czasu 1-2 długości),
+    a każda grupa liczona jednym `welch_batch`.
+
+    Returns:
+        DataFrame (jedno okno = jeden wiersz): `{prefix}{pasmo}_power`,
+        `{prefix}dominant_freq_hz`, `{prefix}spectral_entropy`
+    """
+    start_idx = np.asarray(start_idx, dtype=np.int64)
+    lengths = np.asarray(end_idx, dtype=np.int64) - start_idx
+    bands = bands or {}
+    columns = [f'{prefix}{name}_power' for name in bands] + [f'{prefix}dominant_freq_hz',
+                                                              f'{prefix}spectral_entropy']
+    features = {column: np.full(len(start_idx), np.nan) for column in columns}
+    for length in np.unique(lengths):
+        positions = np.flatnonzero(lengths == length)
+        if length < 2:
+            continue
+        freqs, psd = welch_batch(signal, fs, start_idx[positions], int(length), nperseg, noverlap, reuse_segments)
+        for name, power in band_powers(freqs, psd, bands).items():
+            features[f'{prefix}{name}_power'][positions] = power
+        features[f'{prefix}dominant_freq_hz'][positions] = dominant_frequency(freqs, psd, dominant_band)
+        features[f'{prefix}spectral_entropy'][positions] = spectral_entropy(psd, freqs, dominant_band)
+    return pd.DataFrame(features, columns=columns)
+
+
+def respiration_features(resp, fs: float, start_idx, end_idx, nperseg: int = None,
+                         reuse_segments: bool = True) -> pd.DataFrame:
+    """
+    Częstotliwość oddechu (szczyt PSD w RESP_BAND) i entropia widma oddechu dla okien.
+
+    Parameters:
+        nperseg: długość segmentu Welcha (domyślnie RESP_SEGMENT_S sekund, nie dłużej niż okno)
+
+    Returns:
+        DataFrame: resp_freq_hz, resp_rate_bpm, resp_spectral_entropy
+    """
+    if nperseg is None:
+        nperseg = max(1, int(round(RESP_SEGMENT_S * fs)))
+    features = spectral_window_features(resp, fs, start_idx, end_idx, dominant_band=RESP_BAND, prefix='resp_',
+                                        nperseg=nperseg, reuse_segments=reuse_segments)
+    return pd.DataFrame({
+        'resp_freq_hz': features['resp_dominant_freq_hz'],
+        'resp_rate_bpm': features['resp_dominant_freq_hz'] * 60.0,
+        'resp_spectral_entropy': features['resp_spectral_entropy'],
+    })
@@ -0,0 +1,469 @@
+"""
+Testy stacjonarności (ADF/KPSS) dla wielu osób i sygnałów - równolegle, z decymacją i cache wyników.
+
+W testy_stacjonarnosci.ipynb `perform_adf_test` i `perform_kpss_test`
+uruchamiane były szeregowo w pętli subject × sygnał na surowym sygnale
+(albo jego pierwszych `MAX_SAMPLES` próbkach). ADF na kanale 700 Hz
+z milionami próbek trwa minuty. Tutaj:
+
+- sygnał jest czyszczony z NaN/inf, opcjonalnie decymowany z filtrem
+  antyaliasingowym (`target_fs`: zerofazowy Butterworth + co q-ta próbka)
+  i dzielony na segmenty (`segment_s`, `step_s`) testowane osobno,
+- zadania (subject × sygnał × test) trafiają do puli procesów
+  (`ProcessPoolExecutor`, jak w `wesad_pipeline.py`); do workera
+  przekazywany jest już zdecymowany sygnał,
+- wynik każdego zadania zapisywany jest jako JSON pod kluczem z (subject,
+  sygnał, preprocessing, test i jego parametry, odcisk danych), więc
+  ponowne uruchomienie całej baterii to tylko odczyt z dysku.
+
+Struktura cache:
+    {root}/{subject}/{sygnał}-{test}-{klucz}.json
+
+Użycie w notebooku:
+    from wesad_stationarity import run_stationarity_tests
+    results_df = run_stationarity_tests(all_signals, target_fs=4.0, segment_s=300)
+
+lub z terminala (sygnały z kolumnowego cache `wesad_cache.py`):
+    python wesad_stationarity.py --raw-root "/sciezka/do/WESAD" --target-fs 4 S2 S3 S4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from wesad_cache import CACHE_ROOT, RAW_ROOT, ensure_cached, load_channel
+from wesad_preprocessing import zero_phase_filter
+
+try:
+    from statsmodels.tsa.stattools import adfuller, kpss
+    STATSMODELS_AVAILABLE = True
+except ImportError:
+    STATSMODELS_AVAILABLE = False
+
+STATIONARITY_ROOT = Path("results") / "stationarity"
+
+# Poziom istotności i minimalna długość szeregu (jak w notebooku)
+ALPHA = 0.05
+MIN_SAMPLES = 10
+
+# Filtr antyaliasingowy: odcięcie jako ułamek nowej częstotliwości Nyquista
+ANTIALIAS_CUTOFF = 0.8
+ANTIALIAS_ORDER = 4
+
+TESTS = ('adf', 'kpss')
+DEFAULT_TEST_PARAMS = {
+    'adf': {'maxlag': None, 'autolag': 'AIC'},
+    'kpss': {'regression': 'c', 'nlags': 'auto'},
+}
+
+# Częstotliwości sygnałów: nazwy z `all_signals` w notebooku (nadgarstek) i kanały RespiBAN
+SIGNAL_FS = {
+    'acc': 32.0, 'acc_x': 32.0, 'acc_y': 32.0, 'acc_z': 32.0,
+    'bvp': 64.0, 'eda': 4.0, 'temp': 4.0,
+    'chest_ecg': 700.0, 'chest_emg': 700.0,
+    'chest_eda': 700.0, 'chest_resp': 700.0, 'chest_temp': 700.0,
+}
+
+# Kanały z cache: nazwa sygnału -> (urządzenie, kanał, kolumna dla kanałów wielowymiarowych)
+CACHE_CHANNELS = {
+    'acc_x': ('wrist', 'ACC', 0), 'acc_y': ('wrist', 'ACC', 1), 'acc_z': ('wrist', 'ACC', 2),
+    'bvp': ('wrist', 'BVP', None), 'eda': ('wrist', 'EDA', None), 'temp': ('wrist', 'TEMP', None),
+    'chest_ecg': ('chest', 'ECG', None), 'chest_emg': ('chest', 'EMG', None),
+    'chest_eda': ('chest', 'EDA', None), 'chest_resp': ('chest', 'Resp', None),
+    'chest_temp': ('chest', 'Temp', None),
+}
+
+
+def clean_series(series) -> np.ndarray:
+    """Wartości skończone jako float64 (jak `dropna()` / maska isnan|isinf w notebooku)."""
+    values = np.asarray(series, dtype=np.float64).ravel()
+    finite = np.isfinite(values)
+    return values if finite.all() else values[finite]
+
+
+def _failed(error: str) -> dict:
+    return {'statistic': np.nan, 'pvalue': np.nan, 'is_stationary': False, 'error': error}
+
+
+def perform_adf_test(series, signal_name="", maxlag=None, autolag='AIC'):
+    """
+    Przeprowadza test Augmented Dickey-Fuller (ADF)
+
+    H₀: Szereg ma unit root (nie jest stacjonarny)
+    H₁: Szereg jest stacjonarny
+
+    Returns:
+        dict: Wyniki testu (statistic, pvalue, is_stationary)
+    """
+    series_clean = clean_series(series)
+    if len(series_clean) < MIN_SAMPLES:
+        return _failed('Za mało danych')
+    try:
+        result = adfuller(series_clean, maxlag=maxlag, autolag=autolag)
+        # Szereg jest stacjonarny jeśli p-value < 0.05
+        return {
+            'statistic': float(result[0]),
+            'pvalue': float(result[1]),
+            'critical_values': {k: float(v) for k, v in result[4].items()},
+            'is_stationary': bool(result[1] < ALPHA),
+            'error': None
+        }
+    except Exception as e:
+        return _failed(str(e))
+
+
+def perform_kpss_test(series, signal_name="", regression='c', nlags='auto'):
+    """
+    Przeprowadza test KPSS
+
+    H₀: Szereg jest stacjonarny
+    H₁: Szereg nie jest stacjonarny
+
+    Returns:
+        dict: Wyniki testu (statistic, pvalue, is_stationary)
+    """
+    series_clean = clean_series(series)
+    if len(series_clean) < MIN_SAMPLES:
+        return _failed('Za mało danych')
+    try:
+        with warnings.catch_warnings():
+            # p-value poza tablicą KPSS (InterpolationWarning) - wartość graniczna jest poprawna
+            warnings.simplefilter('ignore')
+            result = kpss(series_clean, regression=regression, nlags=nlags)
+        # Szereg jest stacjonarny jeśli p-value > 0.05 (nie odrzucamy H₀)
+        return {
+            'statistic': float(result[0]),
+            'pvalue': float(result[1]),
+            'critical_values': {k: float(v) for k, v in result[3].items()},
+            'is_stationary': bool(result[1] > ALPHA),
+            'error': None
+        }
+    except Exception as e:
+        return _failed(str(e))
+
+
+TEST_FUNCTIONS = {'adf': perform_adf_test, 'kpss': perform_kpss_test}
+
+
+def decimation_factor(fs: float, target_fs: float = None) -> int:
+    """Współczynnik decymacji q = floor(fs / target_fs) (1 = bez decymacji)."""
+    if target_fs is None or target_fs <= 0:
+        return 1
+    return max(int(fs // target_fs), 1)
+
+
+def decimate_signal(signal, fs: float, target_fs: float = None):
+    """
+    Decymacja z filtrem antyaliasingowym do częstotliwości nie niższej niż `target_fs`.
+
+    Współczynnik q = floor(fs / target_fs); przed wzięciem co q-tej próbki
+    sygnał filtrowany jest zerofazowo dolnoprzepustowo (80% nowej
+    częstotliwości Nyquista).
+
+    Returns:
+        (sygnał, fs po decymacji)
+    """
+    values = np.asarray(signal, dtype=np.float64)
+    q = decimation_factor(fs, target_fs)
+    if q == 1:
+        return values, float(fs)
+    new_fs = fs / q
+    if len(values) > 3 * ANTIALIAS_ORDER * 2:
+        values = zero_phase_filter(values, 'low', ANTIALIAS_CUTOFF * new_fs / 2.0, fs, order=ANTIALIAS_ORDER)
+    return np.ascontiguousarray(values[::q]), float(new_fs)
+
+
+def prepare_series(signal, fs: float, target_fs: float = None, max_samples: int = None):
+    """
+    Szereg do testów: wartości skończone -> decymacja -> pierwsze `max_samples` próbek.
+
+    Returns:
+        (sygnał, fs po decymacji)
+    """
+    values, new_fs = decimate_signal(clean_series(signal), fs, target_fs)
+    if max_samples is not None and len(values) > max_samples:
+        values = values[:max_samples]
+    return values, new_fs
+
+
+def segment_bounds(n_samples: int, fs: float, segment_s: float = None, step_s: float = None) -> list:
+    """
+    Granice segmentów [start, end) testowanych osobno.
+
+    Bez `segment_s` cały szereg jest jednym segmentem; `step_s` domyślnie
+    równy `segment_s` (segmenty bez nakładania). Krótka końcówka jest pomijana.
+    """
+    if segment_s is None:
+        return [(0, n_samples)]
+    length = max(int(round(segment_s * fs)), 1)
+    step = max(int(round((step_s or segment_s) * fs)), 1)
+    if n_samples < length:
+        return [(0, n_samples)]
+    return [(start, start + length) for start in range(0, n_samples - length + 1, step)]
+
+
+def preprocessing_config(target_fs: float = None, max_samples: int = None, segment_s: float = None,
+                         step_s: float = None) -> dict:
+    """Parametry przygotowania szeregu (część klucza w cache)."""
+    return {
+        'target_fs': target_fs,
+        'max_samples': max_samples,
+        'segment_s': segment_s,
+        'step_s': step_s,
+        'antialias': [ANTIALIAS_CUTOFF, ANTIALIAS_ORDER],
+        'min_samples': MIN_SAMPLES,
+        'alpha': ALPHA,
+    }
+
+
+def array_fingerprint(signal) -> str:
+    """Odcisk danych sygnału (SHA-1 z kształtu, typu i bajtów)."""
+    values = np.ascontiguousarray(signal)
+    digest = hashlib.sha1(f"{values.shape}{values.dtype}".encode('utf-8'))
+    digest.update(memoryview(values).cast('B'))
+    return digest.hexdigest()
+
+
+def result_key(subject: str, signal: str, test: str, preprocessing: dict, test_params: dict,
+               fingerprint: str) -> str:
+    """Klucz wyniku (SHA-1 z subjecta, sygnału, preprocessingu, testu, parametrów i odcisku danych)."""
+    payload = {
+        'subject': subject,
+        'signal': signal,
+        'test': test,
+        'preprocessing': preprocessing,
+        'test_params': test_params,
+        'data': fingerprint,
+    }
+    encoded = json.dumps(payload, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+class StationarityCache:
+    """Wyniki testów (subject × sygnał × test) na dysku, po jednym pliku JSON na klucz."""
+
+    def __init__(self, root=STATIONARITY_ROOT):
+        self.root = Path(root)
+
+    def _path(self, subject: str, signal: str, test: str, key: str) -> Path:
+        return self.root / subject / f"{signal}-{test}-{key}.json"
+
+    def get(self, subject: str, signal: str, test: str, key: str):
+        """Lista wyników segmentów albo None, gdy wyniku nie ma w cache."""
+        path = self._path(subject, signal, test, key)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as handle:
+            return json.load(handle)['segments']
+
+    def put(self, subject: str, signal: str, test: str, key: str, segments: list):
+        """Zapisuje wynik atomowo (plik tymczasowy + os.replace)."""
+        path = self._path(subject, signal, test, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            # NaN zapisywane jako null
+            json.dump({'subject': subject, 'signal': signal, 'test': test, 'key': key,
+                       'segments': json_ready(segments)}, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def json_ready(value):
+    """Zagnieżdżone wyniki gotowe do JSON (NaN -> null)."""
+    if isinstance(value, dict):
+        return {k: json_ready(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_ready(v) for v in value]
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _run_test(args):
+    """
+    Zadanie workera: (test, parametry, szereg, fs, segmenty) -> lista wyników segmentów.
+    """
+    test, params, series, fs, bounds = args
+    function = TEST_FUNCTIONS[test]
+    segments = []
+    for start, end in bounds:
+        result = function(series[start:end], **params)
+        result['start_s'] = start / fs
+        result['n_samples'] = int(end - start)
+        segments.append(result)
+    return segments
+
+
+def _combine(adf: dict, kpss_result: dict):
+    """Werdykt jak w notebooku: oba testy zgodne -> True/False, sprzeczne albo błąd -> None (niepewny)."""
+    if adf is None or kpss_result is None or adf.get('error') is not None or kpss_result.get('error') is not None:
+        return None
+    if adf['is_stationary'] != kpss_result['is_stationary']:
+        return None
+    return bool(adf['is_stationary'] and kpss_result['is_stationary'])
+
+
+def run_stationarity_tests(all_signals: dict, sampling_rates: dict = None, tests=TESTS, target_fs: float = None,
+                           max_samples: int = None, segment_s: float = None, step_s: float = None,
+                           test_params: dict = None, fingerprints: dict = None, n_workers: int = None,
+                           cache_root=STATIONARITY_ROOT, verbose: bool = True) -> pd.DataFrame:
+    """
+    Bateria testów stacjonarności dla wszystkich osób i sygnałów.
+
+    Parameters:
+        all_signals: {subject: {sygnał: tablica}} (jak w notebooku)
+        sampling_rates: sygnał -> fs (domyślnie SIGNAL_FS; brak wpisu = 1 Hz)
+        tests: które testy uruchomić ('adf', 'kpss')
+        target_fs: decymacja z filtrem antyaliasingowym (None = bez decymacji)
+        max_samples: limit długości po decymacji (jak MAX_SAMPLES w notebooku)
+        segment_s, step_s: test osobno dla segmentów o długości `segment_s` sekund
+        test_params: nadpisania parametrów testów, np. {'kpss': {'regression': 'ct'}}
+        fingerprints: {(subject, sygnał): odcisk danych}; bez wpisu liczony SHA-1 danych
+        n_workers: liczba procesów (None = liczba rdzeni, 1 = bez puli procesów)
+        cache_root: katalog cache wyników (None = bez cache)
+
+    Returns:
+        DataFrame z wierszem na (subject, sygnał, segment): kolumny z notebooka
+        (`adf_pvalue`, `kpss_pvalue`, `is_stationary`, ...) plus `segment`, `segment_start_s`, `fs`
+    """
+    if not STATSMODELS_AVAILABLE:
+        raise ImportError("Testy stacjonarności wymagają statsmodels (pip install statsmodels)")
+    sampling_rates = SIGNAL_FS if sampling_rates is None else sampling_rates
+    fingerprints = fingerprints or {}
+    params = {test: {**DEFAULT_TEST_PARAMS[test], **(test_params or {}).get(test, {})} for test in tests}
+    preprocessing = preprocessing_config(target_fs, max_samples, segment_s, step_s)
+    cache = StationarityCache(cache_root) if cache_root is not None else None
+
+    # Szeregi przygotowywane są tylko dla zadań, których nie ma w cache
+    jobs, results, meta = [], {}, []
+    for subject, signals in all_signals.items():
+        for signal_name, signal_data in signals.items():
+            if signal_data is None or len(signal_data) == 0:
+                continue
+            fs = float(sampling_rates.get(signal_name, 1.0))
+            fingerprint = fingerprints.get((subject, signal_name)) or array_fingerprint(signal_data)
+            keys = {test: result_key(subject, signal_name, test, preprocessing, params[test], fingerprint)
+                    for test in tests}
+            prepared = None
+            for test in tests:
+                cached = cache.get(subject, signal_name, test, keys[test]) if cache is not None else None
+                if cached is not None:
+                    results[(subject, signal_name, test)] = cached
+                    continue
+                if prepared is None:
+                    series, new_fs = prepare_series(signal_data, fs, target_fs, max_samples)
+                    prepared = (series, new_fs, segment_bounds(len(series), new_fs, segment_s, step_s))
+                jobs.append(((subject, signal_name, test, keys[test]),
+                             (test, params[test], prepared[0], prepared[1], prepared[2])))
+            meta.append((subject, signal_name, fs / decimation_factor(fs, target_fs)))
+
+    if jobs:
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        n_workers = max(1, min(n_workers, len(jobs)))
+        tasks = [task for _, task in jobs]
+        if n_workers == 1:
+            outputs = [_run_test(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                outputs = list(executor.map(_run_test, tasks))
+        for (subject, signal_name, test, key), segments in zip([job for job, _ in jobs], outputs):
+            results[(subject, signal_name, test)] = segments
+            if cache is not None:
+                cache.put(subject, signal_name, test, key, segments)
+    if verbose:
+        total = len(meta) * len(tests)
+        print(f"✅ Testy stacjonarności: {total} zadań, policzono {len(jobs)}, z cache {total - len(jobs)}")
+
+    rows = []
+    for subject, signal_name, new_fs in meta:
+        per_test = {test: results[(subject, signal_name, test)] for test in tests}
+        n_segments = max(len(segments) for segments in per_test.values())
+        for i in range(n_segments):
+            segment = {test: (segments[i] if i < len(segments) else None) for test, segments in per_test.items()}
+            any_result = next(r for r in segment.values() if r is not None)
+            row = {
+                'subject': subject,
+                'signal': signal_name,
+                'segment': i,
+                'segment_start_s': any_result['start_s'],
+                'fs': new_fs,
+                'n_samples': any_result['n_samples'],
+            }
+            for test in tests:
+                result = segment[test] or {}
+                row[f'{test}_statistic'] = _nan(result.get('statistic'))
+                row[f'{test}_pvalue'] = _nan(result.get('pvalue'))
+                row[f'{test}_stationary'] = result.get('is_stationary')
+            if 'adf' in tests and 'kpss' in tests:
+                row['is_stationary'] = _combine(segment['adf'], segment['kpss'])
+            for test in tests:
+                row[f'{test}_error'] = (segment[test] or {}).get('error')
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def _nan(value):
+    return np.nan if value is None else value
+
+
+def load_cohort_signals(subjects, raw_root=RAW_ROOT, cache_root=CACHE_ROOT, signals=None):
+    """
+    Sygnały wielu osób z kolumnowego cache (tablice mapowane z plików .npy).
+
+    Returns:
+        (all_signals, fingerprints) - odciski z podpisu pliku źródłowego, więc
+        ponowne uruchomienie nie czyta ani nie haszuje danych
+    """
+    signals = list(CACHE_CHANNELS) if signals is None else list(signals)
+    all_signals, fingerprints = {}, {}
+    for subject in subjects:
+        source = ensure_cached(subject, raw_root, cache_root).get('source') or {}
+        token = source.get('sha1') or f"{source.get('mtime_ns')}-{source.get('size')}"
+        all_signals[subject] = {}
+        for name in signals:
+            device, channel, column = CACHE_CHANNELS[name]
+            try:
+                array, _ = load_channel(subject, device, channel, raw_root, cache_root)
+            except KeyError:
+                continue
+            all_signals[subject][name] = array[:, column] if column is not None else array.reshape(-1)
+            fingerprints[(subject, name)] = f"{token}:{device}/{channel}/{column}"
+    return all_signals, fingerprints
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Testy stacjonarności ADF/KPSS dla osób WESAD")
+    parser.add_argument("subjects", nargs="+", help="np. S2 S3 S4")
+    parser.add_argument("--raw-root", type=Path, default=RAW_ROOT)
+    parser.add_argument("--cache-root", type=Path, default=CACHE_ROOT)
+    parser.add_argument("--signals", nargs="+", default=None, choices=sorted(CACHE_CHANNELS))
+    parser.add_argument("--target-fs", type=float, default=4.0, help="decymacja do tej częstotliwości (0 = bez)")
+    parser.add_argument("--max-samples", type=int, default=None)
+    parser.add_argument("--segment-s", type=float, default=None)
+    parser.add_argument("--step-s", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="liczba procesów (domyślnie wszystkie rdzenie)")
+    parser.add_argument("--results-root", type=Path, default=STATIONARITY_ROOT)
+    parser.add_argument("--output", type=Path, default=Path("results") / "stationarity_tests.csv")
+    args = parser.parse_args(argv)
+
+    all_signals, fingerprints = load_cohort_signals(args.subjects, args.raw_root, args.cache_root, args.signals)
+    results_df = run_stationarity_tests(
+        all_signals, target_fs=args.target_fs or None, max_samples=args.max_samples,
+        segment_s=args.segment_s, step_s=args.step_s, fingerprints=fingerprints,
+        n_workers=args.workers, cache_root=args.results_root
+    )
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    results_df.to_csv(args.output, index=False)
+    print(f"✅ Zapisano do: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
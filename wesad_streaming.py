@@ -0,0 +1,222 @@
+"""
+Strumieniowe liczenie parametrów stresu z odtwarzanej sesji (BVP 64 Hz, TEMP 4 Hz).
+
+Próbki trafiają do buforów pierścieniowych kawałkami (tak jak przychodziłyby
+z opaski), a HR_mean / HRV_RMSSD / HRV_SDNN / TEMP_mean aktualizowane są
+przyrostowo (`wesad_rolling.RollingStats`) - nowe uderzenia serca dodają się
+do sum bieżących, a najstarsze wypadają z okna, więc koszt odświeżenia zależy
+od liczby nowych próbek, nie od długości okna.
+
+Użycie (np. w streamlit_stress_demo.py):
+    session = load_e4_session(Path(".../S2/S2_E4_Data"))
+    replay = SessionReplayer(session, speedup=10.0)
+    monitor = StreamingStressMonitor(session["BVP"].fs, session["TEMP"].fs)
+    chunks = replay.advance(0.5)        # 0.5 s czasu rzeczywistego
+    monitor.push(chunks)
+    monitor.snapshot()                  # {'HR_mean': ..., 'HRV_RMSSD': ..., ...}
+"""
+
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from wesad_e4 import load_e4_subject
+from wesad_preprocessing import BVP_BANDPASS_HIGH, BVP_BANDPASS_LOW, StreamingFilter
+from wesad_rolling import RingBuffer, RollingStats
+
+# Okno, z którego liczone są parametry (sekundy sygnału)
+DEFAULT_WINDOW_S = 60.0
+
+# Fizjologiczny zakres interwałów RR (30-200 bpm), jak w extract_bvp_hrv_features
+RR_MIN_S = 0.3
+RR_MAX_S = 2.0
+
+# Ile sekund po kandydacie na pik czekamy z decyzją (sąsiednie piki, prawa podstawa prominencji)
+PEAK_LOOKAHEAD_S = 1.0
+
+
+def load_e4_session(subject_path: Path, sensors=("BVP", "TEMP")) -> dict:
+    """Wczytuje wybrane sensory sesji E4 z katalogu subjecta (`wesad_e4.E4Signal`)."""
+    return load_e4_subject(Path(subject_path), sensors=sensors, include_ibi=False)
+
+
+class RollingRR:
+    """
+    Interwały RR z ostatnich `window_s` sekund.
+
+    Sumy bieżące trzyma `RollingStats` (średnia, M2, suma kwadratów kolejnych
+    różnic), więc HR, SDNN i RMSSD są dostępne w O(1); tutaj pilnowany jest
+    tylko czas wypadania interwałów z okna.
+    """
+
+    def __init__(self, window_s: float = DEFAULT_WINDOW_S):
+        self.window_s = window_s
+        self._times = deque()  # czas_piku_s każdego RR w oknie
+        self.stats = RollingStats(int(window_s / RR_MIN_S) + 2)
+
+    def __len__(self):
+        return len(self._times)
+
+    def push(self, peak_time: float, rr: float):
+        self._times.append(peak_time)
+        evicted = self.stats.push([rr])
+        for _ in range(len(evicted)):
+            self._times.popleft()
+        self.expire(peak_time)
+
+    def expire(self, now: float):
+        """Usuwa interwały starsze niż `window_s` względem `now`."""
+        count = 0
+        while self._times and self._times[0] < now - self.window_s:
+            self._times.popleft()
+            count += 1
+        if count:
+            self.stats.pop(count)
+
+    def hr_mean(self) -> float:
+        return 60.0 / self.stats.mean() if len(self) else np.nan
+
+    def sdnn_ms(self) -> float:
+        return self.stats.std() * 1000.0 if len(self) >= 2 else np.nan
+
+    def rmssd_ms(self) -> float:
+        return self.stats.rmssd() * 1000.0 if len(self) >= 2 else np.nan
+
+
+class StreamingPeakDetector:
+    """
+    Detekcja uderzeń serca w BVP na bieżąco.
+
+    Każdy kawałek przechodzi przez filtr pasmowy BVP (`StreamingFilter`,
+    0.5-8 Hz). Piki wyznacza `find_peaks(distance=..., prominence=...)` na
+    buforze ostatnich `history_s` sekund przefiltrowanego sygnału, z
+    prominencją `k_std` × odchylenie bufora - jak w `extract_bvp_hrv_features`.
+    Pik jest zatwierdzany dopiero po `lookahead_s` sekundach (co najmniej
+    `min_distance_s`), gdy znane są już sąsiednie piki w odległości
+    `min_distance` i prawa podstawa prominencji; z pików bliższych niż
+    `min_distance` zostaje najbardziej wyeksponowany. Opóźnienie detekcji
+    to `lookahead_s` plus opóźnienie grupowe filtru przyczynowego.
+    """
+
+    def __init__(self, fs: float, history_s: float = 10.0, k_std: float = 0.5,
+                 min_distance_s: float = RR_MIN_S, lookahead_s: float = PEAK_LOOKAHEAD_S,
+                 band=(BVP_BANDPASS_LOW, BVP_BANDPASS_HIGH)):
+        self.fs = fs
+        self.k_std = k_std
+        self.min_distance = max(int(fs * min_distance_s), 1)
+        self.lookahead = max(int(fs * lookahead_s), self.min_distance)
+        # Podstawy prominencji szukane w ±lookahead od piku (wlen jak w find_peaks)
+        self.wlen = 2 * self.lookahead + 1
+        self.filter = StreamingFilter('band', band, fs) if band is not None else None
+        self.history = RingBuffer(max(int(history_s * fs), self.wlen + self.min_distance))
+        self._n_seen = 0
+        self._decided = 0  # próbki < _decided są już rozstrzygnięte
+        self.last_peak = None
+
+    def push(self, samples) -> np.ndarray:
+        """Przetwarza kawałek próbek; zwraca indeksy (globalne) nowo zatwierdzonych pików."""
+        samples = np.asarray(samples, dtype=np.float64).ravel()
+        # Bufor musi pomieścić kontekst nierozstrzygniętych próbek - długie kawałki dzielone są na części
+        piece = max(self.history.capacity - self.wlen - self.min_distance, 1)
+        if len(samples) > piece:
+            parts = [self.push(samples[i:i + piece]) for i in range(0, len(samples), piece)]
+            return np.concatenate(parts)
+        if len(samples) == 0:
+            return np.empty(0, dtype=np.int64)
+        if self.filter is not None:
+            samples = self.filter.process(samples)
+        self.history.push(samples)
+        self._n_seen += len(samples)
+
+        settled_end = self._n_seen - self.lookahead
+        if settled_end <= self._decided:
+            return np.empty(0, dtype=np.int64)
+        hist = self.history.values()
+        hist_start = self._n_seen - len(hist)
+        # Lewy kontekst: podstawy prominencji i piki, które mogłyby wygrać w odległości min_distance
+        offset = max(self._decided - self.lookahead - self.min_distance, hist_start)
+        segment = hist[offset - hist_start:]
+        candidates, _ = find_peaks(segment, distance=self.min_distance,
+                                   prominence=self.k_std * hist.std(), wlen=self.wlen)
+        candidates = candidates + offset
+        candidates = candidates[(candidates >= self._decided) & (candidates < settled_end)]
+
+        peaks = []
+        for idx in candidates:
+            if self.last_peak is None or idx - self.last_peak >= self.min_distance:
+                peaks.append(idx)
+                self.last_peak = idx
+        self._decided = settled_end
+        return np.asarray(peaks, dtype=np.int64)
+
+
+class StreamingStressMonitor:
+    """Przyrostowe HR_mean / HRV_RMSSD / HRV_SDNN / TEMP_mean z kawałków BVP i TEMP."""
+
+    def __init__(self, fs_bvp: float, fs_temp: float, window_s: float = DEFAULT_WINDOW_S):
+        self.fs_bvp = fs_bvp
+        self.fs_temp = fs_temp
+        self.detector = StreamingPeakDetector(fs_bvp)
+        self.rr = RollingRR(window_s)
+        self.temp = RollingStats(int(window_s * fs_temp))
+        self.n_bvp = 0
+        self._prev_peak = None
+
+    def push_bvp(self, samples):
+        for peak in self.detector.push(samples):
+            peak_time = peak / self.fs_bvp
+            if self._prev_peak is not None:
+                rr = peak_time - self._prev_peak
+                if RR_MIN_S <= rr <= RR_MAX_S:
+                    self.rr.push(peak_time, rr)
+            self._prev_peak = peak_time
+        self.n_bvp += len(samples)
+        self.rr.expire(self.n_bvp / self.fs_bvp)
+
+    def push_temp(self, samples):
+        self.temp.push(samples)
+
+    def push(self, chunks: dict):
+        """Przyjmuje słownik {'BVP': próbki, 'TEMP': próbki} z `SessionReplayer.advance`."""
+        if "BVP" in chunks:
+            self.push_bvp(chunks["BVP"])
+        if "TEMP" in chunks:
+            self.push_temp(chunks["TEMP"])
+
+    def snapshot(self) -> dict:
+        return {
+            "HR_mean": self.rr.hr_mean(),
+            "HRV_RMSSD": self.rr.rmssd_ms(),
+            "HRV_SDNN": self.rr.sdnn_ms(),
+            "TEMP_mean": self.temp.mean(),
+        }
+
+
+class SessionReplayer:
+    """Odtwarza nagraną sesję kawałkami, z przyspieszeniem `speedup`."""
+
+    def __init__(self, session: dict, speedup: float = 1.0):
+        self.session = session
+        self.speedup = speedup
+        self.position_s = 0.0
+        self._cursor = {name: 0 for name in session}
+
+    @property
+    def duration_s(self) -> float:
+        return min(len(s.values) / s.fs for s in self.session.values())
+
+    @property
+    def finished(self) -> bool:
+        return self.position_s >= self.duration_s
+
+    def advance(self, wall_seconds: float) -> dict:
+        """Zwraca próbki każdego sensora przypadające na `wall_seconds` czasu rzeczywistego."""
+        self.position_s = min(self.position_s + wall_seconds * self.speedup, self.duration_s)
+        chunks = {}
+        for name, stream in self.session.items():
+            end = int(self.position_s * stream.fs)
+            chunks[name] = stream.values[self._cursor[name]:end]
+            self._cursor[name] = end
+        return chunks